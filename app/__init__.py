@@ -2,7 +2,8 @@ from flask import Flask
 from flask_login import LoginManager
 from flask_socketio import SocketIO
 from config import config
-from app.models import db, User
+from app.models import db, User, add_missing_columns
+from app.executor import in_pool_worker
 import os
 
 login_manager = LoginManager()
@@ -34,11 +35,28 @@ def create_app(config_name='development'):
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
+    from app.leaderboard import leaderboard_cache
+    leaderboard_cache.init_app(app)
+    from app.executor import evaluation_executor
+    evaluation_executor.init_app(app)
+    from app.password_blocklist import password_blocklist
+    password_blocklist.init_app(app)
+    from app.password_strength import strength_estimator
+    strength_estimator.init_app(app)
+    from app.write_behind import write_behind
+    write_behind.init_app(app)
+    from app.session_cache import coop_sessions
+    coop_sessions.init_app(app)
     # If a Redis URL is provided, use it as the message queue for Socket.IO
     message_queue = None
     if app.config.get('REDIS_URL'):
         message_queue = app.config.get('REDIS_URL')
     socketio.init_app(app, cors_allowed_origins="*", message_queue=message_queue)
+    # Live coop state shared by every worker when Redis is available
+    from app.session_state import open_session_store
+    socketio.session_store = open_session_store(
+        app.config.get('SESSION_STATE_URL') or app.config.get('REDIS_URL'),
+        ttl=app.config.get('SESSION_STATE_TTL', 6 * 3600))
 
     # Configure login manager
     login_manager.login_view = 'auth.login'
@@ -49,9 +67,25 @@ def create_app(config_name='development'):
     def load_user(user_id):
         return User.query.get(user_id)
 
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Create database tables (not in grading pool workers, which import
+    # the app again)
+    if not in_pool_worker():
+        with app.app_context():
+            db.create_all()
+            try:
+                for column in add_missing_columns():
+                    print(f"Added column {column}")
+            except Exception as e:
+                print(f"Adding new columns failed: {e}")
+            # Existing databases start with empty leaderboard aggregates
+            from app.leaderboard import backfill_user_scores
+            try:
+                written = backfill_user_scores()
+                if written:
+                    print(f"Backfilled {written} leaderboard aggregate and rollup rows")
+            except Exception as e:
+                db.session.rollback()
+                print(f"Leaderboard backfill failed: {e}")
 
     # Register blueprints
     from app.routes import auth_bp, main_bp, challenges_bp, admin_bp, api_bp
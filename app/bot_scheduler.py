@@ -0,0 +1,114 @@
+"""
+Bot Scheduler
+Drives every coop bot from one background task. Bots wait in a heap ordered
+by the time of their next turn; the task sleeps until the earliest one is
+due and starts that turn, so idle bots cost nothing but a heap entry. A
+bot's next turn is scheduled when its current one finishes, after the bot's
+reaction delay, so turns of one bot never overlap. The challenge a bot
+plays is resolved once when it is added.
+"""
+import heapq
+import itertools
+import time
+from flask import current_app
+from app.bot_ai import BotAI
+
+
+class BotTurn:
+    """One bot in one session and its per-game state"""
+
+    def __init__(self, session_code, bot_id, bot_name, challenge_type, bot):
+        self.session_code = session_code
+        self.bot_id = bot_id
+        self.bot_name = bot_name
+        self.challenge_type = challenge_type
+        self.bot = bot
+        self.state = {'bot_step': 0}
+        self.cancelled = False
+
+
+class BotScheduler:
+    """Runs the turns of all bots across all sessions from a heap of due times"""
+
+    def __init__(self, tick=0.5):
+        # Longest sleep between heap checks, so a newly added bot waits at most this long
+        self.tick = tick
+        self.socketio = None
+        self.play_turn = None
+        self._app = None
+        self._heap = []  # (due monotonic time, tie-breaker, BotTurn)
+        self._order = itertools.count()
+        self._bots = {}  # session_code -> [BotTurn]
+        self._running = False
+        self.turns = 0
+
+    def init_socketio(self, socketio, play_turn):
+        """
+        ``play_turn(session_code, bot_id, bot_name, payload)`` plays one bot
+        action and returns False once the session is over.
+        """
+        self.socketio = socketio
+        self.play_turn = play_turn
+
+    def add(self, session_code, bot_id, bot_name, challenge_type, difficulty='medium', role='attacker'):
+        """Start playing a bot in ``session_code``; its first turn follows its reaction delay"""
+        if self._app is None:
+            self._app = current_app._get_current_object()
+            self.tick = self._app.config.get('BOT_SCHEDULER_TICK', self.tick)
+        entry = BotTurn(session_code, bot_id, bot_name, challenge_type, BotAI(difficulty=difficulty, role=role))
+        self._bots.setdefault(session_code, []).append(entry)
+        self._schedule(entry)
+        return entry
+
+    def cancel(self, session_code):
+        """Stop every bot in ``session_code``; a turn already running still finishes"""
+        for entry in self._bots.pop(session_code, []):
+            entry.cancelled = True
+
+    def _schedule(self, entry):
+        due = time.monotonic() + entry.bot.get_reaction_delay()
+        heapq.heappush(self._heap, (due, next(self._order), entry))
+        if not self._running:
+            self._running = True
+            self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        while self._heap:
+            due, _, entry = self._heap[0]
+            wait = due - time.monotonic()
+            if wait > 0:
+                self.socketio.sleep(min(wait, self.tick))
+                continue
+            heapq.heappop(self._heap)
+            if not entry.cancelled:
+                self.socketio.start_background_task(self._play, entry)
+        self._running = False
+
+    def _play(self, entry):
+        keep_playing = True
+        try:
+            with self._app.app_context():
+                action = entry.bot.get_next_action(entry.challenge_type, entry.state)
+                keep_playing = self.play_turn(entry.session_code, entry.bot_id, entry.bot_name,
+                                              action.get('description', ''))
+            entry.state['bot_step'] += 1
+            self.turns += 1
+        except Exception as e:
+            print(f"Bot turn failed in session {entry.session_code}: {e}")
+        if entry.cancelled:
+            return
+        if keep_playing:
+            self._schedule(entry)
+        else:
+            self.cancel(entry.session_code)
+
+    def stats(self):
+        return {
+            'sessions': len(self._bots),
+            'scheduled': sum(1 for _, _, entry in self._heap if not entry.cancelled),
+            'turns': self.turns
+        }
+
+
+# Global instance
+bot_scheduler = BotScheduler()
@@ -0,0 +1,142 @@
+"""
+Cache Backends
+Small key/value caches shared by features that memoize expensive reads:
+an in-process LRU (default) and an optional Redis backend used when
+REDIS_URL is configured and the ``redis`` package is installed.
+"""
+import hashlib
+import json
+import pickle
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Bounded in-process cache with least-recently-used eviction and TTL"""
+
+    def __init__(self, max_size=256, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at or None, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class RedisCache:
+    """JSON values stored in Redis under a common key prefix"""
+
+    def __init__(self, client, prefix='cache:', ttl=None):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+class EvaluationMemo:
+    """
+    LRU memo of challenge evaluation results.
+
+    Keys combine the memo version, the caller's parts (challenge type,
+    difficulty, role...) and a SHA-256 digest of the payload, so large
+    payloads are not kept as keys. Results are stored pickled and every hit
+    returns a fresh copy that callers may modify. ``invalidate()`` bumps
+    the version and drops every entry; call it when grading rules change.
+    """
+
+    def __init__(self, max_size=1024):
+        self.version = 0
+        self._cache = LRUCache(max_size=max_size)
+
+    def key(self, payload, *parts):
+        digest = hashlib.sha256(payload.encode('utf-8', 'surrogatepass')).digest()
+        return (self.version,) + parts + (digest,)
+
+    def get(self, key):
+        blob = self._cache.get(key)
+        return None if blob is None else pickle.loads(blob)
+
+    def set(self, key, result):
+        self._cache.set(key, pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+
+    def invalidate(self):
+        self.version += 1
+        self._cache.clear()
+
+    def stats(self):
+        return dict(self._cache.stats(), version=self.version)
+
+
+def get_redis_client(url):
+    """Return a Redis client for ``url``, or None if redis-py is unavailable"""
+    if not url:
+        return None
+    try:
+        import redis
+    except ImportError:
+        print("REDIS_URL is set but the 'redis' package is not installed; using in-process cache")
+        return None
+    return redis.Redis.from_url(url)
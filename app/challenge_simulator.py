@@ -10,6 +10,38 @@ import sqlite3
 from datetime import datetime
 import random
 import string
+from app.cracking import simulate as simulate_cracking
+from app.evaluation import evaluation_core, canonical
+from app.password_strength import strength_estimator
+from app.rule_packs import rule_packs
+from app.sandbox import sandbox_pool, SandboxLimitExceeded
+
+# Points for each estimated strength score (0-4) and the score each
+# difficulty requires to pass
+PASSWORD_STRENGTH_POINTS = (0, 25, 50, 75, 100)
+PASSWORD_REQUIRED_STRENGTH = {'easy': 2, 'medium': 3, 'hard': 4}
+
+# What to tell the player about the pattern that makes a password guessable
+PASSWORD_WARNINGS = {
+    'common_password': 'من كلمات المرور الأكثر شيوعاً',
+    'dictionary_word': 'كلمة من القاموس يسهل تخمينها',
+    'name': 'الأسماء الشائعة يسهل تخمينها',
+    'keyboard_pattern': 'أنماط لوحة المفاتيح مثل qwerty يسهل تخمينها',
+    'repeat': 'التكرار مثل aaa أو abcabc يسهل تخمينه',
+    'sequence': 'التسلسلات مثل abc أو 6543 يسهل تخمينها',
+    'recent_year': 'السنوات الحديثة يسهل تخمينها',
+    'date': 'التواريخ يسهل تخمينها',
+    'breached': 'ظهرت في تسريبات كلمات المرور',
+}
+
+# Points added when the cracking simulation recovers the target password,
+# and where to look when it does not
+PASSWORD_CRACKED_POINTS = 50
+PASSWORD_CRACKING_HINTS = {
+    'easy': 'تلميح: كلمة المرور من أشهر كلمات المرور (dictionary attack)',
+    'medium': 'تلميح: كلمة من القاموس بحرف كبير وسنة في آخرها (wordlist + rules)',
+    'hard': 'تلميح: رمز PIN من ستة أرقام، جرّب هجوم mask',
+}
 
 
 class ChallengeSimulator:
@@ -30,8 +62,27 @@ class ChallengeSimulator:
         Returns:
             dict: نتيجة التقييم مع التفاصيل
         """
+        result = evaluation_core.evaluate('simulator', challenge_type, user_input, difficulty)
+        if result is None:
+            return self._unknown_type_result()
+        return result
+    
+    def evaluate_many(self, challenge_type, payloads, difficulty='medium'):
+        """تقييم مجموعة من الحلول دفعة واحدة وإرجاع النتائج بنفس الترتيب"""
+        return list(self.iter_evaluate(challenge_type, payloads, difficulty))
+    
+    def iter_evaluate(self, challenge_type, payloads, difficulty='medium'):
+        """
+        تقييم تدريجي (generator) لمجموعات كبيرة دون الاحتفاظ بكل النتائج في الذاكرة
         
-        evaluators = {
+        تُقيَّم الدفعة كاملة بنسخة واحدة من حزم القواعد، والحلول المكررة
+        تُخدم من الذاكرة المؤقتة في محرك التقييم
+        """
+        for result in evaluation_core.iter_evaluate('simulator', challenge_type, payloads, difficulty):
+            yield self._unknown_type_result() if result is None else result
+    
+    def _get_evaluators(self):
+        return {
             'sql_injection': self.evaluate_sql_injection,
             'sql_injection_defense': self.evaluate_sql_defense,
             'xss': self.evaluate_xss,
@@ -45,484 +96,179 @@ class ChallengeSimulator:
             'command_injection': self.evaluate_command_injection,
             'command_injection_defense': self.evaluate_command_injection_defense,
         }
+    
+    def register(self, core):
+        """تسجيل دوال التقييم في محرك التقييم الموحد حسب (نوع التحدي، الدور)"""
+        for challenge_type, evaluator in self._get_evaluators().items():
+            core.register('simulator', *canonical(challenge_type), evaluator)
+    
+    def _unknown_type_result(self):
+        return {
+            'success': False,
+            'score': 0,
+            'feedback': 'Unknown challenge type',
+            'errors': ['Challenge type not recognized']
+        }
+    
+    def _apply_pack(self, challenge_type, payload, difficulty, packs=None):
+        """تطبيق حزمة القواعد (rule pack) الخاصة بنوع التحدي وإرجاع النتيجة الأولية"""
+        rules = (packs or rule_packs.current()).get('simulator', challenge_type)
+        outcome = rules.apply(payload, difficulty)
+        feedback = [text for kind, text in outcome['notes'] if kind == 'feedback']
+        errors = [text for kind, text in outcome['notes'] if kind == 'miss']
+        return rules, outcome, feedback, errors
+    
+    def _pack_result(self, rules, outcome, feedback, errors, payload):
+        details = dict(rules.details)
+        if 'details_feedback' in rules.spec:
+            details[rules.spec['details_feedback']] = feedback
+        for key, length in rules.spec.get('details_input', {}).items():
+            details[key] = payload.text[:length]
         
-        evaluator = evaluators.get(challenge_type)
-        if not evaluator:
-            return {
-                'success': False,
-                'score': 0,
-                'feedback': 'Unknown challenge type',
-                'errors': ['Challenge type not recognized']
-            }
-        
-        return evaluator(user_input, difficulty)
+        return {
+            'success': outcome['success'],
+            'score': min(outcome['score'], rules.max_score),
+            'feedback': '\n'.join(feedback) if feedback else rules.spec['default_feedback'],
+            'errors': errors,
+            'details': details
+        }
+    
+    def _evaluate_pack(self, challenge_type, payload, difficulty, packs=None):
+        """تقييم الحل بالكامل وفق حزمة القواعد"""
+        rules, outcome, feedback, errors = self._apply_pack(challenge_type, payload, difficulty, packs)
+        return self._pack_result(rules, outcome, feedback, errors, payload)
     
     # ==================== SQL INJECTION ====================
     
-    def evaluate_sql_injection(self, user_input, difficulty='medium'):
+    def evaluate_sql_injection(self, payload, difficulty='medium', packs=None):
         """تقييم هجوم SQL Injection (Red Team)"""
         
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        # تحقق من العناصر الأساسية لهجوم SQL Injection
-        sql_keywords = {
-            'basic': ['UNION', 'SELECT', 'OR', '1=1'],
-            'intermediate': ['DROP', 'INSERT', 'UPDATE', 'DELETE', '--', '#'],
-            'advanced': ['WAITFOR', 'DELAY', 'BENCHMARK', 'SLEEP', 'LOAD_FILE']
-        }
-        
-        user_input_upper = user_input.upper()
-        
-        # Basic SQL Injection
-        if any(keyword in user_input_upper for keyword in sql_keywords['basic']):
-            score += 30
-            feedback.append('✓ Basic SQL keywords detected')
-            is_correct = True
-        else:
-            errors.append('No basic SQL keywords detected')
-        
-        # UNION-based injection
-        if 'UNION' in user_input_upper and 'SELECT' in user_input_upper:
-            score += 25
-            feedback.append('✓ Proper UNION SELECT usage detected')
-        
-        # Boolean-based blind injection
-        if "OR" in user_input_upper and ("1=1" in user_input or "TRUE" in user_input_upper):
-            score += 20
-            feedback.append('✓ Boolean-based injection used')
-        
-        # Comment injection
-        if '--' in user_input or '#' in user_input or '/*' in user_input:
-            score += 15
-            feedback.append('✓ Comments used to bypass checks')
+        try:
+            sandbox_pool.check_payload(payload.text)
+        except SandboxLimitExceeded as e:
+            return self._resource_limit_result('SQL Injection', e.reason)
         
-        # Advanced techniques (for hard difficulty)
-        if difficulty == 'hard':
-            if any(keyword in user_input_upper for keyword in sql_keywords['advanced']):
-                score += 10
-                feedback.append('✓ Advanced SQL techniques used')
+        rules, outcome, feedback, errors = self._apply_pack('sql_injection', payload, difficulty, packs)
         
         # المحاكاة: تنفيذ SQL على قاعدة بيانات وهمية
         try:
-            simulation_result = self._simulate_sql_injection(user_input)
+            simulation_result = self._simulate_sql_injection(payload)
             if simulation_result['vulnerable']:
                 feedback.append(f'✓ Attack succeeded! Extracted: {simulation_result["data_extracted"]}')
             else:
                 errors.append('Attack failed to extract data')
+        except SandboxLimitExceeded as e:
+            return self._resource_limit_result('SQL Injection', e.reason)
         except Exception as e:
             errors.append(f'Simulation error: {str(e)}')
         
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-                'feedback': '\n'.join(feedback) if feedback else 'No valid SQL Injection attack detected',
-            'errors': errors,
-            'details': {
-                'attack_type': 'SQL Injection',
-                'techniques_used': feedback
-            }
-        }
+        return self._pack_result(rules, outcome, feedback, errors, payload)
     
     def _simulate_sql_injection(self, payload):
         """محاكاة تنفيذ SQL Injection على قاعدة بيانات وهمية"""
         
-        # إنشاء قاعدة بيانات وهمية في الذاكرة
-        conn = sqlite3.connect(':memory:')
-        cursor = conn.cursor()
-        
-        # إنشاء جدول مستخدمين وهمي
-        cursor.execute('''
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY,
-                username TEXT,
-                password TEXT,
-                email TEXT,
-                is_admin INTEGER
-            )
-        ''')
-        
-        # إدراج بيانات وهمية
-        test_users = [
-            (1, 'admin', 'admin123', 'admin@test.com', 1),
-            (2, 'user1', 'pass123', 'user1@test.com', 0),
-            (3, 'user2', 'secret456', 'user2@test.com', 0),
-        ]
-        cursor.executemany('INSERT INTO users VALUES (?,?,?,?,?)', test_users)
-        conn.commit()
-        
         vulnerable = False
         data_extracted = []
         
         try:
-            # محاولة تنفيذ الـ payload (استعلام ضعيف)
+            # محاولة تنفيذ الـ payload (استعلام ضعيف) على قاعدة بيانات وهمية للقراءة فقط
             # في الواقع، هذا الكود ضعيف أمنياً - لأغراض المحاكاة فقط!
-            query = f"SELECT * FROM users WHERE username = '{payload}' AND password = 'test'"
+            query = f"SELECT * FROM users WHERE username = '{payload.text}' AND password = 'test'"
             
-            cursor.execute(query)
-            results = cursor.fetchall()
+            # يرفع SandboxLimitExceeded عند تجاوز حدود الموارد
+            results = sandbox_pool.execute(query)
             
             if results:
                 vulnerable = True
                 data_extracted = [f"User: {row[1]}, Email: {row[3]}" for row in results]
         except sqlite3.Error:
             # إذا حدث خطأ في SQL، قد يكون الـ payload صحيح ولكن بناء الجملة خاطئ
-            if 'UNION' in payload.upper() or 'OR' in payload.upper():
+            if 'UNION' in payload.view('upper') or 'OR' in payload.view('upper'):
                 vulnerable = True
                 data_extracted = ['SQL Error - but injection detected']
-        finally:
-            conn.close()
         
         return {
             'vulnerable': vulnerable,
             'data_extracted': ', '.join(data_extracted) if data_extracted else 'None'
         }
     
-    def evaluate_sql_defense(self, user_input, difficulty='medium'):
-        """تقييم الدفاع ضد SQL Injection (Blue Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        defense_techniques = {
-            'prepared_statements': ['prepare', 'bind', 'placeholder', '?', ':'],
-            'input_validation': ['validate', 'sanitize', 'escape', 'filter', 'whitelist'],
-            'parameterized': ['parameter', 'param', 'bind_param'],
-            'orm': ['ORM', 'model', 'query builder'],
-            'stored_procedures': ['procedure', 'stored', 'call']
-        }
-        
-        user_input_lower = user_input.lower()
-        
-        # Prepared Statements / Parameterized Queries
-        if any(keyword in user_input_lower for keyword in defense_techniques['prepared_statements']):
-            score += 30
-            feedback.append('✓ Used Prepared Statements')
-            is_correct = True
-        else:
-            errors.append('Prepared Statements not detected')
-        
-        # Input Validation
-        if any(keyword in user_input_lower for keyword in defense_techniques['input_validation']):
-            score += 25
-            feedback.append('✓ Applied Input Validation')
-        else:
-            errors.append('Input validation not applied')
-        
-        # Parameterized Queries
-        if any(keyword in user_input_lower for keyword in defense_techniques['parameterized']):
-            score += 20
-            feedback.append('✓ Used Parameterized Queries')
-        
-        # ORM Usage
-        if any(keyword in user_input_lower for keyword in defense_techniques['orm']):
-            score += 15
-            feedback.append('✓ Used ORM for protection')
-        
-        # Stored Procedures (for hard difficulty)
-        if difficulty == 'hard':
-            if any(keyword in user_input_lower for keyword in defense_techniques['stored_procedures']):
-                score += 10
-                feedback.append('✓ Used Stored Procedures')
-        
-        # تحقق من عدم وجود ثغرات
-        vulnerable_patterns = ["'+", '"+', "OR 1=1", "OR '1'='1'", "UNION SELECT"]
-        if not any(pattern.lower() in user_input_lower for pattern in vulnerable_patterns):
-            score += 10
-            feedback.append('✓ No vulnerable patterns detected')
-        else:
-            errors.append('⚠ Vulnerable patterns detected')
-        
+    def _resource_limit_result(self, attack_type, reason):
+        """نتيجة موحدة عند تجاوز الـ payload لحدود موارد بيئة المحاكاة"""
         return {
-            'success': is_correct,
-            'score': min(score, max_score),
-                'feedback': '\n'.join(feedback) if feedback else 'Insufficient defenses against SQL Injection',
-            'errors': errors,
+            'success': False,
+            'score': 0,
+            'feedback': 'Payload exceeded the sandbox resource limits',
+            'errors': [f'Resource limit exceeded: {reason}'],
             'details': {
-                'defense_type': 'SQL Injection Protection',
-                'techniques_applied': feedback
+                'attack_type': attack_type,
+                'resource_limit': reason
             }
         }
     
+    def evaluate_sql_defense(self, payload, difficulty='medium', packs=None):
+        """تقييم الدفاع ضد SQL Injection (Blue Team)"""
+        return self._evaluate_pack('sql_injection_defense', payload, difficulty, packs)
+    
     # ==================== XSS (Cross-Site Scripting) ====================
     
-    def evaluate_xss(self, user_input, difficulty='medium'):
+    def evaluate_xss(self, payload, difficulty='medium', packs=None):
         """تقييم هجوم XSS (Red Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        # Reflected XSS
-        if '<script>' in user_input.lower() or 'alert' in user_input.lower():
-            score += 30
-            feedback.append('✓ تم استخدام Reflected XSS')
-            is_correct = True
-        
-        # Event handler XSS
-        xss_events = ['onerror', 'onload', 'onclick', 'onmouseover', 'onfocus']
-        if any(event in user_input.lower() for event in xss_events):
-            score += 25
-            feedback.append('✓ تم استخدام Event Handler XSS')
-            is_correct = True
-        
-        # Image-based XSS
-        if '<img' in user_input.lower() and 'src' in user_input.lower():
-            score += 20
-            feedback.append('✓ تم استخدام Image-based XSS')
-        
-        # JavaScript: protocol
-        if 'javascript:' in user_input.lower():
-            score += 15
-            feedback.append('✓ تم استخدام JavaScript protocol')
-        
-        # Advanced: DOM-based or encoded XSS
-        if difficulty == 'hard':
-            if 'document.cookie' in user_input.lower() or 'localstorage' in user_input.lower():
-                score += 10
-                feedback.append('✓ تم استهداف بيانات المستخدم الحساسة')
-        
-        if not is_correct:
-            errors.append('لم يتم اكتشاف payload XSS صحيح')
-        
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'لم يتم اكتشاف هجوم XSS صحيح',
-            'errors': errors,
-            'details': {
-                'attack_type': 'Cross-Site Scripting (XSS)',
-                'payload': user_input[:100]
-            }
-        }
+        return self._evaluate_pack('xss', payload, difficulty, packs)
     
-    def evaluate_xss_defense(self, user_input, difficulty='medium'):
+    def evaluate_xss_defense(self, payload, difficulty='medium', packs=None):
         """تقييم الدفاع ضد XSS (Blue Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        defense_keywords = {
-            'encoding': ['encode', 'escape', 'htmlspecialchars', 'htmlentities'],
-            'csp': ['Content-Security-Policy', 'CSP', 'nonce'],
-            'sanitize': ['sanitize', 'purify', 'clean', 'strip'],
-            'validation': ['validate', 'whitelist', 'allowlist']
-        }
-        
-        user_input_lower = user_input.lower()
-        
-        # HTML Encoding/Escaping
-        if any(keyword in user_input_lower for keyword in defense_keywords['encoding']):
-            score += 30
-            feedback.append('✓ استخدام HTML Encoding/Escaping')
-            is_correct = True
-        else:
-            errors.append('لم يتم استخدام HTML Encoding')
-        
-        # Content Security Policy
-        if any(keyword in user_input for keyword in defense_keywords['csp']):
-            score += 30
-            feedback.append('✓ تطبيق Content Security Policy (CSP)')
-        else:
-            errors.append('لم يتم تطبيق CSP')
-        
-        # Input Sanitization
-        if any(keyword in user_input_lower for keyword in defense_keywords['sanitize']):
-            score += 25
-            feedback.append('✓ تطبيق Input Sanitization')
-        
-        # Input Validation
-        if any(keyword in user_input_lower for keyword in defense_keywords['validation']):
-            score += 15
-            feedback.append('✓ تطبيق Input Validation')
-        
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'لم يتم تطبيق دفاعات كافية ضد XSS',
-            'errors': errors,
-            'details': {
-                'defense_type': 'XSS Protection',
-                'techniques_applied': feedback
-            }
-        }
+        return self._evaluate_pack('xss_defense', payload, difficulty, packs)
     
     # ==================== DoS (Denial of Service) ====================
     
-    def evaluate_dos(self, user_input, difficulty='medium'):
+    def evaluate_dos(self, payload, difficulty='medium', packs=None):
         """تقييم هجوم DoS (Red Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        dos_techniques = {
-            'flood': ['flood', 'syn flood', 'udp flood', 'icmp flood'],
-            'amplification': ['amplification', 'reflection', 'dns amplification'],
-            'application': ['slowloris', 'slow http', 'http flood'],
-            'distributed': ['botnet', 'distributed', 'ddos']
-        }
-        
-        user_input_lower = user_input.lower()
-        
-        # Flood attacks
-        if any(keyword in user_input_lower for keyword in dos_techniques['flood']):
-            score += 30
-            feedback.append('✓ تم وصف هجوم Flood')
-            is_correct = True
-        
-        # Amplification attacks
-        if any(keyword in user_input_lower for keyword in dos_techniques['amplification']):
-            score += 25
-            feedback.append('✓ تم وصف Amplification attack')
-            is_correct = True
-        
-        # Application layer attacks
-        if any(keyword in user_input_lower for keyword in dos_techniques['application']):
-            score += 25
-            feedback.append('✓ تم وصف Application layer attack')
-            is_correct = True
-        
-        # DDoS
-        if any(keyword in user_input_lower for keyword in dos_techniques['distributed']):
-            score += 20
-            feedback.append('✓ تم ذكر Distributed DoS')
-        
-        # محاكاة: عدد الطلبات
-        request_count = user_input_lower.count('request') + user_input_lower.count('packet')
-        if request_count > 5:
-            score += 10
-            feedback.append(f'✓ تم محاكاة {request_count} طلبات')
-        
-        if not is_correct:
-            errors.append('لم يتم وصف هجوم DoS بشكل صحيح')
-        
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'لم يتم وصف هجوم DoS صحيح',
-            'errors': errors,
-            'details': {
-                'attack_type': 'Denial of Service',
-                'description': user_input[:200]
-            }
-        }
+        return self._evaluate_pack('dos', payload, difficulty, packs)
     
-    def evaluate_dos_defense(self, user_input, difficulty='medium'):
+    def evaluate_dos_defense(self, payload, difficulty='medium', packs=None):
         """تقييم الدفاع ضد DoS (Blue Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        defense_techniques = {
-            'rate_limiting': ['rate limit', 'throttle', 'limit requests'],
-            'firewall': ['firewall', 'waf', 'iptables', 'filter'],
-            'load_balancer': ['load balanc', 'distribute', 'scaling'],
-            'cdn': ['cdn', 'cloudflare', 'content delivery'],
-            'monitoring': ['monitor', 'detect', 'alert', 'intrusion detection']
-        }
-        
-        user_input_lower = user_input.lower()
-        
-        # Rate Limiting
-        if any(keyword in user_input_lower for keyword in defense_techniques['rate_limiting']):
-            score += 30
-            feedback.append('✓ تطبيق Rate Limiting')
-            is_correct = True
-        else:
-            errors.append('لم يتم تطبيق Rate Limiting')
-        
-        # Firewall/WAF
-        if any(keyword in user_input_lower for keyword in defense_techniques['firewall']):
-            score += 25
-            feedback.append('✓ استخدام Firewall/WAF')
-        else:
-            errors.append('لم يتم ذكر Firewall')
-        
-        # Load Balancing
-        if any(keyword in user_input_lower for keyword in defense_techniques['load_balancer']):
-            score += 20
-            feedback.append('✓ استخدام Load Balancing')
-        
-        # CDN
-        if any(keyword in user_input_lower for keyword in defense_techniques['cdn']):
-            score += 15
-            feedback.append('✓ استخدام CDN')
-        
-        # Monitoring
-        if any(keyword in user_input_lower for keyword in defense_techniques['monitoring']):
-            score += 10
-            feedback.append('✓ تطبيق Monitoring & Detection')
-        
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'لم يتم تطبيق دفاعات كافية ضد DoS',
-            'errors': errors,
-            'details': {
-                'defense_type': 'DoS Protection',
-                'techniques_applied': feedback
-            }
-        }
+        return self._evaluate_pack('dos_defense', payload, difficulty, packs)
     
     # ==================== PASSWORD CHECKING ====================
     
-    def evaluate_password_strength(self, user_input, difficulty='medium'):
-        """تقييم قوة كلمة المرور (Blue Team)"""
+    def evaluate_password_strength(self, payload, difficulty='medium', packs=None):
+        """تقييم قوة كلمة المرور (Blue Team) بتقدير عدد محاولات التخمين اللازمة لكسرها"""
         
-        score = 0
-        max_score = 100
         feedback = []
         errors = []
-        is_correct = False
         
-        password = user_input.strip()
+        password = payload.text.strip()
+        estimate = strength_estimator.estimate(password)
+        
+        # The estimate decides the score; the character checks below are guidance
+        score = PASSWORD_STRENGTH_POINTS[estimate['score']]
+        is_correct = estimate['score'] >= PASSWORD_REQUIRED_STRENGTH.get(difficulty, 3)
+        feedback.append(f"عدد محاولات التخمين المقدّرة: 10^{estimate['guesses_log10']:.1f} "
+                        f"(القوة {estimate['score']}/4)")
         
         # Length check
         if len(password) >= 8:
-            score += 20
             feedback.append('✓ الطول مناسب (8+ أحرف)')
-            is_correct = True
         else:
             errors.append('كلمة المرور قصيرة جداً (يجب أن تكون 8+ أحرف)')
         
         if difficulty in ['medium', 'hard'] and len(password) >= 12:
-            score += 10
             feedback.append('✓ طول ممتاز (12+ أحرف)')
         
         # Uppercase letters
         if any(c.isupper() for c in password):
-            score += 20
             feedback.append('✓ تحتوي على حروف كبيرة')
         else:
             errors.append('لا تحتوي على حروف كبيرة')
         
         # Lowercase letters
         if any(c.islower() for c in password):
-            score += 20
             feedback.append('✓ تحتوي على حروف صغيرة')
         else:
             errors.append('لا تحتوي على حروف صغيرة')
         
         # Numbers
         if any(c.isdigit() for c in password):
-            score += 20
             feedback.append('✓ تحتوي على أرقام')
         else:
             errors.append('لا تحتوي على أرقام')
@@ -530,259 +276,85 @@ class ChallengeSimulator:
         # Special characters
         special_chars = '!@#$%^&*()_+-=[]{}|;:,.<>?'
         if any(c in special_chars for c in password):
-            score += 20
             feedback.append('✓ تحتوي على رموز خاصة')
         else:
             errors.append('لا تحتوي على رموز خاصة')
         
-        # Check for common passwords
-        common_passwords = ['password', '123456', 'qwerty', 'admin', 'letmein', '12345678']
-        if password.lower() in common_passwords:
-            score = max(0, score - 50)
+        # Found in the breached/common password blocklist
+        if estimate['breached']:
             errors.append('⚠ كلمة مرور شائعة وضعيفة جداً!')
+        elif estimate['warning']:
+            errors.append('⚠ ' + PASSWORD_WARNINGS[estimate['warning']])
         
         return {
             'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'كلمة مرور ضعيفة',
+            'score': score,
+            'feedback': '\n'.join(feedback),
             'errors': errors,
             'details': {
                 'password_length': len(password),
-                'strength': 'strong' if score >= 80 else 'medium' if score >= 50 else 'weak'
+                'strength': 'strong' if score >= 75 else 'medium' if score >= 50 else 'weak',
+                'guesses': estimate['guesses'],
+                'guesses_log10': estimate['guesses_log10'],
+                'strength_score': estimate['score'],
+                'patterns': [match['pattern'] for match in estimate['patterns']]
             }
         }
     
-    def evaluate_password_cracking(self, user_input, difficulty='medium'):
-        """تقييم كسر كلمات المرور (Red Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        cracking_techniques = {
-            'dictionary': ['dictionary', 'wordlist', 'common passwords'],
-            'brute_force': ['brute force', 'try all combinations', 'exhaustive'],
-            'rainbow_table': ['rainbow table', 'precomputed', 'hash table'],
-            'tools': ['hashcat', 'john', 'hydra', 'medusa']
-        }
-        
-        user_input_lower = user_input.lower()
-        
-        # Dictionary attack
-        if any(keyword in user_input_lower for keyword in cracking_techniques['dictionary']):
-            score += 30
-            feedback.append('✓ استخدام Dictionary Attack')
-            is_correct = True
-        
-        # Brute Force
-        if any(keyword in user_input_lower for keyword in cracking_techniques['brute_force']):
-            score += 25
-            feedback.append('✓ استخدام Brute Force')
-            is_correct = True
-        
-        # Rainbow Tables
-        if any(keyword in user_input_lower for keyword in cracking_techniques['rainbow_table']):
-            score += 25
-            feedback.append('✓ استخدام Rainbow Tables')
-        
-        # Cracking Tools
-        if any(keyword in user_input_lower for keyword in cracking_techniques['tools']):
-            score += 20
-            feedback.append('✓ ذكر أدوات كسر كلمات المرور')
-        
-        if not is_correct:
-            errors.append('لم يتم وصف طريقة كسر كلمات المرور بشكل صحيح')
-        
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'لم يتم وصف طريقة كسر صحيحة',
-            'errors': errors,
-            'details': {
-                'attack_type': 'Password Cracking'
-            }
-        }
+    def evaluate_password_cracking(self, payload, difficulty='medium', packs=None):
+        """تقييم كسر كلمات المرور (Red Team) بتشغيل الاستراتيجية الموصوفة على تجزئة الهدف"""
+        rules, outcome, feedback, errors = self._apply_pack('password_cracking', payload, difficulty, packs)
+        
+        # المحاكاة: هجوم فعلي محدود بعدد محاولات ووقت
+        run = simulate_cracking(payload.text, difficulty)
+        if run is None:
+            outcome['success'] = False
+            errors.append('لم يتم تحديد استراتيجية قابلة للتنفيذ (wordlist أو rules أو mask مثل ?u?l?l?d?d)')
+        else:
+            if run['ignored_hash']:
+                errors.append('⚠ التجزئة المرفقة ليست تجزئة التحدي؛ تم الهجوم على تجزئة التحدي فقط')
+            outcome['success'] = run['cracked']
+            if run['cracked']:
+                outcome['score'] += PASSWORD_CRACKED_POINTS
+                if rules.failure in errors:
+                    errors.remove(rules.failure)
+                feedback.append(f"✓ تم كسر التجزئة ({run['algorithm']}) بهجوم {run['attack']}: "
+                                f"{run['password']} بعد {run['guesses']} محاولة")
+            else:
+                errors.append(f"✗ لم يتم كسر التجزئة ({run['algorithm']}) خلال {run['guesses']} محاولة")
+                errors.append(PASSWORD_CRACKING_HINTS.get(difficulty, PASSWORD_CRACKING_HINTS['medium']))
+            feedback.append(f"السرعة: {run['guesses_per_second']} محاولة/ثانية، "
+                            f"الزمن: {run['seconds']:.2f} ثانية")
+        
+        result = self._pack_result(rules, outcome, feedback, errors, payload)
+        if run is not None:
+            result['details']['cracking'] = run
+            # A run cut short by the clock depends on load; grade it again next time
+            if run['stopped'] == 'time_budget':
+                result['details']['resource_limit'] = 'time_budget'
+        return result
     
     # ==================== CSRF (Cross-Site Request Forgery) ====================
     
-    def evaluate_csrf(self, user_input, difficulty='medium'):
+    def evaluate_csrf(self, payload, difficulty='medium', packs=None):
         """تقييم هجوم CSRF (Red Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        csrf_indicators = ['form', 'submit', 'post', 'request', 'cookie', 'session']
-        
-        user_input_lower = user_input.lower()
-        
-        # Basic CSRF understanding
-        if 'csrf' in user_input_lower or 'cross-site request forgery' in user_input_lower:
-            score += 30
-            feedback.append('✓ فهم مفهوم CSRF')
-            is_correct = True
-        
-        # Form-based attack
-        if 'form' in user_input_lower and 'submit' in user_input_lower:
-            score += 25
-            feedback.append('✓ وصف هجوم عبر النماذج')
-        
-        # Session exploitation
-        if 'session' in user_input_lower or 'cookie' in user_input_lower:
-            score += 25
-            feedback.append('✓ استغلال الجلسة/الكوكيز')
-        
-        # Automatic submission
-        if 'automatic' in user_input_lower or 'javascript' in user_input_lower:
-            score += 20
-            feedback.append('✓ إرسال تلقائي للطلب')
-        
-        if not is_correct:
-            errors.append('لم يتم وصف هجوم CSRF بشكل صحيح')
-        
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'لم يتم وصف هجوم CSRF صحيح',
-            'errors': errors,
-            'details': {
-                'attack_type': 'CSRF'
-            }
-        }
+        return self._evaluate_pack('csrf', payload, difficulty, packs)
     
-    def evaluate_csrf_defense(self, user_input, difficulty='medium'):
+    def evaluate_csrf_defense(self, payload, difficulty='medium', packs=None):
         """تقييم الدفاع ضد CSRF (Blue Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        defense_keywords = ['token', 'csrf token', 'synchronizer token', 'samesite', 'referer', 'origin']
-        
-        user_input_lower = user_input.lower()
-        
-        # CSRF Token
-        if 'token' in user_input_lower:
-            score += 40
-            feedback.append('✓ استخدام CSRF Token')
-            is_correct = True
-        else:
-            errors.append('لم يتم استخدام CSRF Token')
-        
-        # SameSite Cookie
-        if 'samesite' in user_input_lower:
-            score += 30
-            feedback.append('✓ استخدام SameSite Cookie')
-        
-        # Referer/Origin Check
-        if 'referer' in user_input_lower or 'origin' in user_input_lower:
-            score += 30
-            feedback.append('✓ التحقق من Referer/Origin')
-        
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'لم يتم تطبيق دفاعات كافية ضد CSRF',
-            'errors': errors,
-            'details': {
-                'defense_type': 'CSRF Protection'
-            }
-        }
+        return self._evaluate_pack('csrf_defense', payload, difficulty, packs)
     
     # ==================== COMMAND INJECTION ====================
     
-    def evaluate_command_injection(self, user_input, difficulty='medium'):
+    def evaluate_command_injection(self, payload, difficulty='medium', packs=None):
         """تقييم هجوم Command Injection (Red Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        command_operators = [';', '|', '&', '&&', '||', '`', '$']
-        dangerous_commands = ['ls', 'cat', 'rm', 'chmod', 'wget', 'curl', 'nc', 'sh', 'bash']
-        
-        # Check for command operators
-        if any(op in user_input for op in command_operators):
-            score += 30
-            feedback.append('✓ استخدام command operators')
-            is_correct = True
-        
-        # Check for dangerous commands
-        if any(cmd in user_input.lower() for cmd in dangerous_commands):
-            score += 40
-            feedback.append('✓ استخدام أوامر نظام خطيرة')
-        
-        # Command chaining
-        if '&&' in user_input or '||' in user_input:
-            score += 30
-            feedback.append('✓ ربط أوامر متعددة')
-        
-        if not is_correct:
-            errors.append('لم يتم اكتشاف Command Injection صحيح')
-        
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'لم يتم اكتشاف Command Injection صحيح',
-            'errors': errors,
-            'details': {
-                'attack_type': 'Command Injection'
-            }
-        }
+        return self._evaluate_pack('command_injection', payload, difficulty, packs)
     
-    def evaluate_command_injection_defense(self, user_input, difficulty='medium'):
+    def evaluate_command_injection_defense(self, payload, difficulty='medium', packs=None):
         """تقييم الدفاع ضد Command Injection (Blue Team)"""
-        
-        score = 0
-        max_score = 100
-        feedback = []
-        errors = []
-        is_correct = False
-        
-        defense_keywords = {
-            'validation': ['validate', 'whitelist', 'allowlist', 'filter'],
-            'escaping': ['escape', 'sanitize', 'escapeshellarg', 'escapeshellcmd'],
-            'avoid_shell': ['avoid shell', 'direct execution', 'subprocess', 'exec array']
-        }
-        
-        user_input_lower = user_input.lower()
-        
-        # Input Validation
-        if any(keyword in user_input_lower for keyword in defense_keywords['validation']):
-            score += 35
-            feedback.append('✓ تطبيق Input Validation')
-            is_correct = True
-        else:
-            errors.append('لم يتم تطبيق Input Validation')
-        
-        # Shell Escaping
-        if any(keyword in user_input_lower for keyword in defense_keywords['escaping']):
-            score += 35
-            feedback.append('✓ استخدام Shell Escaping')
-        
-        # Avoid Shell Execution
-        if any(keyword in user_input_lower for keyword in defense_keywords['avoid_shell']):
-            score += 30
-            feedback.append('✓ تجنب تنفيذ Shell مباشرة')
-        
-        return {
-            'success': is_correct,
-            'score': min(score, max_score),
-            'feedback': '\n'.join(feedback) if feedback else 'لم يتم تطبيق دفاعات كافية ضد Command Injection',
-            'errors': errors,
-            'details': {
-                'defense_type': 'Command Injection Protection'
-            }
-        }
-
+        return self._evaluate_pack('command_injection_defense', payload, difficulty, packs)
+    
 
 # إنشاء instance عام
 challenge_simulator = ChallengeSimulator()
+challenge_simulator.register(evaluation_core)
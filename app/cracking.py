@@ -0,0 +1,270 @@
+"""
+Password Cracking Simulator
+Bounded offline cracking runs for password_cracking challenges. A target
+hash is attacked with the strategies the player describes: the ranked
+wordlist, the wordlist through mangling rules, hashcat-style masks and
+incremental brute force. Every attack's keyspace is indexable, so it is
+worked through in fixed-size chunks under a guess budget and a wall-clock
+budget, and the run reports its guess rate, time and the cracked password.
+"""
+import hashlib
+import re
+import string
+import time
+from app.password_strength import strength_estimator
+
+# Hex digest length -> hash algorithm, for hashes pasted by the player
+ALGORITHMS = {32: 'md5', 40: 'sha1', 64: 'sha256'}
+
+# The password behind each difficulty's target hash
+TARGET_PASSWORDS = {
+    'easy': ('md5', 'sunshine'),          # in the wordlist
+    'medium': ('sha1', 'Summer2024'),     # a wordlist entry mangled by rules
+    'hard': ('sha256', '730419'),         # a six-digit PIN, found by a mask
+}
+
+# Guesses one attempt may make; every target is in reach of the right
+# strategy well within these (tools/cracking_check.py checks this)
+GUESS_BUDGETS = {'easy': 50000, 'medium': 300000, 'hard': 1500000}
+
+# Seconds one attempt may run; kept below EVALUATION_TIMEOUT so a run
+# always completes inside the grading worker
+TIME_BUDGET = 4.0
+
+# Candidates generated and hashed per step; the budgets are checked between
+# chunks. Each attack starts small and doubles up to CHUNK_SIZE, so a hit
+# near the start of a keyspace does not pay for a whole chunk
+FIRST_CHUNK_SIZE = 256
+CHUNK_SIZE = 10000
+
+# Years appended by the mangling rules, newest first. Pinned rather than
+# taken from the clock, so the rule order (and with it the medium target's
+# place in the rules keyspace) never moves
+MANGLING_RULE_YEARS = range(2030, 1969, -1)
+
+# Only this many top-ranked words go through the mangling rules, so the
+# rules keyspace does not grow with the size of a built wordlist
+RULES_WORDLIST_SIZE = 5000
+
+MAX_MASK_LENGTH = 16
+MAX_BRUTE_FORCE_LENGTH = 8
+
+CHARSETS = {
+    'l': string.ascii_lowercase,
+    'u': string.ascii_uppercase,
+    'd': string.digits,
+    's': ' ' + string.punctuation,
+    'a': string.ascii_letters + string.digits + ' ' + string.punctuation,
+}
+
+HASH_TOKEN = re.compile(r'\b(?:[0-9a-fA-F]{64}|[0-9a-fA-F]{40}|[0-9a-fA-F]{32})\b')
+MASK_TOKEN = re.compile(r'\?[ludsa]')
+
+STRATEGY_KEYWORDS = {
+    'dictionary': ('dictionary', 'wordlist', 'word list', 'rockyou', 'common passwords'),
+    'rules': ('rule', 'mangl', 'best64', 'hybrid'),
+    'brute_force': ('brute force', 'brute-force', 'bruteforce', 'exhaustive',
+                    'try all combinations', 'incremental'),
+}
+
+L33T = str.maketrans('aeiost', '431057')
+
+
+def _mangling_rules():
+    """(name, function) pairs, the most productive first"""
+    rules = [
+        (':', lambda word: word),
+        ('c', str.capitalize),
+        ('u', str.upper),
+        ('r', lambda word: word[::-1]),
+        ('l33t', lambda word: word.translate(L33T)),
+        ('$!', lambda word: word + '!'),
+        ('c $!', lambda word: word.capitalize() + '!'),
+    ]
+    for digit in string.digits:
+        rules.append((f'${digit}', lambda word, d=digit: word + d))
+        rules.append((f'c ${digit}', lambda word, d=digit: word.capitalize() + d))
+    for year in MANGLING_RULE_YEARS:
+        rules.append((f'${year}', lambda word, y=str(year): word + y))
+        rules.append((f'c ${year}', lambda word, y=str(year): word.capitalize() + y))
+    return rules
+
+
+MANGLING_RULES = _mangling_rules()
+
+
+class WordlistAttack:
+    """The ranked wordlist, once through each rule (rule-major, like hashcat)"""
+
+    def __init__(self, words, rules=MANGLING_RULES[:1], name='dictionary'):
+        self.name = name
+        self.words = words
+        self.rules = rules
+        self.keyspace = len(words) * len(rules)
+
+    def candidates(self, start, stop):
+        words = self.words
+        out = []
+        while start < stop:
+            rule, offset = divmod(start, len(words))
+            take = min(len(words) - offset, stop - start)
+            out.extend(map(self.rules[rule][1], words[offset:offset + take]))
+            start += take
+        return out
+
+
+class MaskAttack:
+    """Every string matching a mask of per-position charsets, last position fastest"""
+
+    def __init__(self, charsets, name):
+        self.name = name
+        self.charsets = charsets
+        self.keyspace = 1
+        for charset in charsets:
+            self.keyspace *= len(charset)
+
+    def _prefix(self, index):
+        chars = []
+        for charset in reversed(self.charsets[:-1]):
+            index, position = divmod(index, len(charset))
+            chars.append(charset[position])
+        return ''.join(reversed(chars))
+
+    def candidates(self, start, stop):
+        last = self.charsets[-1]
+        out = []
+        while start < stop:
+            prefix_index, offset = divmod(start, len(last))
+            take = min(len(last) - offset, stop - start)
+            prefix = self._prefix(prefix_index)
+            out.extend(prefix + char for char in last[offset:offset + take])
+            start += take
+        return out
+
+
+def parse_mask(token):
+    """Charsets for a hashcat-style mask ('?u?l?l?d?d', literals allowed), or None"""
+    charsets = []
+    i = 0
+    while i < len(token):
+        if token[i] == '?' and i + 1 < len(token):
+            charsets.append(CHARSETS.get(token[i + 1], token[i + 1]))
+            i += 2
+        else:
+            charsets.append(token[i])
+            i += 1
+    return charsets if 0 < len(charsets) <= MAX_MASK_LENGTH else None
+
+
+def plan_attacks(text):
+    """
+    The attacks described in ``text``, cheapest first, and any hash the
+    player pasted as ``(algorithm, hex digest)`` or None.
+    """
+    lowered = text.lower()
+    attacks = []
+    wants = {name for name, keywords in STRATEGY_KEYWORDS.items() if any(k in lowered for k in keywords)}
+    if 'rules' in wants:
+        # The identity rule comes first, so this includes the plain wordlist
+        attacks.append(WordlistAttack(strength_estimator.ranked_words()[:RULES_WORDLIST_SIZE], MANGLING_RULES, 'rules'))
+    elif 'dictionary' in wants:
+        attacks.append(WordlistAttack(strength_estimator.ranked_words()))
+    for token in text.split():
+        if MASK_TOKEN.search(token):
+            charsets = parse_mask(token.strip('.,;:()\'"'))
+            if charsets:
+                attacks.append(MaskAttack(charsets, 'mask'))
+                break
+    if 'brute_force' in wants:
+        for length in range(1, MAX_BRUTE_FORCE_LENGTH + 1):
+            attacks.append(MaskAttack([CHARSETS['a']] * length, 'brute_force'))
+
+    found = HASH_TOKEN.search(text)
+    supplied = (ALGORITHMS[len(found.group(0))], found.group(0).lower()) if found else None
+    return attacks, supplied
+
+
+def _search(hash_fn, target, candidates):
+    """Index of the candidate hashing to ``target``, or None"""
+    for index, candidate in enumerate(candidates):
+        if hash_fn(candidate.encode('utf-8', 'surrogatepass')).digest() == target:
+            return index
+    return None
+
+
+def target_for(difficulty):
+    """``(algorithm, hex digest)`` of the built-in target for ``difficulty``"""
+    algorithm, password = TARGET_PASSWORDS.get(difficulty, TARGET_PASSWORDS['medium'])
+    return algorithm, hashlib.new(algorithm, password.encode('utf-8')).hexdigest()
+
+
+def crack(algorithm, digest, attacks, guess_budget, time_budget=TIME_BUDGET, chunk_size=CHUNK_SIZE):
+    """
+    Run ``attacks`` in order against ``digest`` until one cracks it, the
+    keyspaces run out, ``guess_budget`` guesses are spent or
+    ``time_budget`` seconds pass. ``stopped`` is None when the run
+    finished on its own, else 'guess_budget' or 'time_budget'.
+    """
+    hash_fn = getattr(hashlib, algorithm)
+    target = bytes.fromhex(digest)
+    guesses = 0
+    password = None
+    attack_name = None
+    stopped = None
+    started = time.perf_counter()
+    deadline = started + time_budget
+
+    for attack in attacks:
+        start = 0
+        size = FIRST_CHUNK_SIZE
+        while start < attack.keyspace and password is None and stopped is None:
+            if guesses >= guess_budget:
+                stopped = 'guess_budget'
+            elif time.perf_counter() >= deadline:
+                stopped = 'time_budget'
+            else:
+                stop = min(attack.keyspace, start + size, start + guess_budget - guesses)
+                size = min(size * 2, chunk_size)
+                candidates = attack.candidates(start, stop)
+                index = _search(hash_fn, target, candidates)
+                if index is None:
+                    guesses += len(candidates)
+                else:
+                    guesses += index + 1
+                    password = candidates[index]
+                    attack_name = attack.name
+                start = stop
+        if password is not None or stopped is not None:
+            break
+
+    seconds = time.perf_counter() - started
+    return {
+        'algorithm': algorithm,
+        'target_hash': digest,
+        'cracked': password is not None,
+        'password': password,
+        'attack': attack_name,
+        'attacks': [attack.name for attack in attacks],
+        'guesses': guesses,
+        'guess_budget': guess_budget,
+        'seconds': round(seconds, 3),
+        'guesses_per_second': round(guesses / seconds) if seconds > 0 else 0,
+        'stopped': stopped
+    }
+
+
+def simulate(text, difficulty='medium'):
+    """
+    Crack the difficulty's built-in target hash with the strategy
+    described in ``text``; None when no runnable strategy is described.
+    A hash pasted by the player is never attacked (a hash of their own
+    easy password would pass the challenge); it is only reported back as
+    ``ignored_hash`` when it is not the target.
+    """
+    attacks, supplied = plan_attacks(text)
+    if not attacks:
+        return None
+    algorithm, digest = target_for(difficulty)
+    run = crack(algorithm, digest, attacks, GUESS_BUDGETS.get(difficulty, GUESS_BUDGETS['medium']))
+    run['ignored_hash'] = supplied[1] if supplied and supplied[1] != digest else None
+    return run
@@ -0,0 +1,158 @@
+"""
+Evaluation Core
+Single dispatch point for grading. Evaluator plugins are registered per
+(challenge type, role) by the grader modules; ChallengeEngine and
+ChallengeSimulator are thin adapters that call EvaluationCore.evaluate.
+Each payload is normalized once and results are memoized in one place.
+"""
+import importlib
+from app.cache import EvaluationMemo
+from app.matcher import Payload
+from app.rule_packs import rule_packs
+
+ROLES = ('attacker', 'defender')
+
+# Modules that register evaluators when imported
+PLUGIN_MODULES = ('app.challenge_engine', 'app.challenge_simulator')
+
+# Challenge types that also name the role (the simulator's vocabulary),
+# mapped to the canonical (challenge type, role)
+TYPE_ALIASES = {
+    'sql_injection_defense': ('sql_injection', 'defender'),
+    'xss_defense': ('xss', 'defender'),
+    'dos_defense': ('dos', 'defender'),
+    'password_check': ('password_strength', 'defender'),
+    'password_cracking': ('password_strength', 'attacker'),
+    'csrf_defense': ('csrf', 'defender'),
+    'command_injection_defense': ('command_injection', 'defender'),
+}
+
+
+def canonical(challenge_type, role='attacker'):
+    """Map any grader's vocabulary to a canonical (challenge type, role)"""
+    if challenge_type in TYPE_ALIASES:
+        return TYPE_ALIASES[challenge_type]
+    # Any role other than 'attacker' is graded as the defender
+    return challenge_type, 'attacker' if role == 'attacker' else 'defender'
+
+
+class Evaluator:
+    """
+    One registered evaluator: ``fn(payload, difficulty, packs)`` returning
+    a result dict. With ``strip`` the payload is stripped of surrounding
+    whitespace before grading and memoization.
+    """
+
+    __slots__ = ('grader', 'fn', 'strip')
+
+    def __init__(self, grader, fn, strip=False):
+        self.grader = grader
+        self.fn = fn
+        self.strip = strip
+
+
+class EvaluationCore:
+    """
+    Registry of evaluators keyed by canonical (challenge type, role).
+
+    A (type, role) may have one evaluator per grader ('engine',
+    'simulator'). ``evaluate`` prefers the requested grader's evaluator and
+    otherwise falls back to whichever grader does implement the type, so
+    both entry points accept the whole vocabulary. Results are memoized by
+    the evaluator that produced them, so the same payload reaching the same
+    evaluator through either adapter is graded once.
+    """
+
+    def __init__(self):
+        self.memo = EvaluationMemo()
+        self._evaluators = {}  # (challenge_type, role) -> {grader: Evaluator}
+        self._plugins_loaded = False
+
+    def register(self, grader, challenge_type, role, fn, strip=False):
+        """Register ``fn`` as ``grader``'s evaluator for (challenge_type, role)"""
+        if role not in ROLES:
+            raise ValueError(f'Unknown role: {role}')
+        self._evaluators.setdefault((challenge_type, role), {})[grader] = Evaluator(grader, fn, strip)
+
+    def _load_plugins(self):
+        if not self._plugins_loaded:
+            self._plugins_loaded = True
+            for module in PLUGIN_MODULES:
+                importlib.import_module(module)
+
+    def resolve(self, grader, challenge_type, role='attacker'):
+        """The Evaluator that grades (challenge_type, role) for ``grader``, or None"""
+        self._load_plugins()
+        candidates = self._evaluators.get(canonical(challenge_type, role))
+        if not candidates:
+            return None
+        return candidates.get(grader) or next(iter(candidates.values()))
+
+    def evaluate(self, grader, challenge_type, user_input, difficulty, role='attacker'):
+        """Grade ``user_input``; returns None when no evaluator handles the type"""
+        return next(self.iter_evaluate(grader, challenge_type, (user_input,), difficulty, role))
+
+    def iter_evaluate(self, grader, challenge_type, payloads, difficulty, role='attacker'):
+        """
+        Yield one result per payload, in order. The evaluator and the rule
+        pack snapshot are resolved once for the whole batch, so a reload
+        never splits a batch across two versions. Yields None for every
+        payload when no evaluator handles the type.
+        """
+        evaluator = self.resolve(grader, challenge_type, role)
+        if evaluator is None:
+            for _ in payloads:
+                yield None
+            return
+        packs = rule_packs.current()
+        challenge_type, role = canonical(challenge_type, role)
+        for user_input in payloads:
+            yield self._grade(evaluator, packs, challenge_type, role, user_input, difficulty)
+
+    def _grade(self, evaluator, packs, challenge_type, role, user_input, difficulty):
+        payload, key = self._memo_key(evaluator, packs, challenge_type, role, user_input, difficulty)
+        result = self.memo.get(key)
+        if result is None:
+            result = evaluator.fn(payload, difficulty, packs)
+            result['rule_pack_version'] = packs.version
+            self.remember(key, result)
+        return result
+
+    def _memo_key(self, evaluator, packs, challenge_type, role, user_input, difficulty):
+        payload = Payload(user_input.strip() if evaluator.strip else user_input)
+        return payload, self.memo.key(payload.text, packs.version, evaluator.grader,
+                                      challenge_type, role, difficulty)
+
+    def lookup(self, grader, challenge_type, user_input, difficulty, role='attacker'):
+        """
+        ``(result, key)`` without grading: the memoized result (None on a
+        miss) and the key to ``remember`` a result graded elsewhere, e.g. in
+        a worker process, under. Both are None when no evaluator handles
+        the type.
+        """
+        evaluator = self.resolve(grader, challenge_type, role)
+        if evaluator is None:
+            return None, None
+        packs = rule_packs.current()
+        challenge_type, role = canonical(challenge_type, role)
+        _, key = self._memo_key(evaluator, packs, challenge_type, role, user_input, difficulty)
+        return self.memo.get(key), key
+
+    def remember(self, key, result):
+        """Memoize ``result`` under ``key`` if it is safe to serve again"""
+        # Memo keys are (memo version, rule pack version, ...); a result
+        # graded against other packs (a worker that reloaded) is not kept
+        if result.get('rule_pack_version') != key[1]:
+            return
+        # A sandbox budget breach may be load-dependent; grade it again next time
+        if 'resource_limit' not in result.get('details', {}):
+            self.memo.set(key, result)
+
+    def types(self):
+        """Registered canonical (challenge type, role) pairs with their graders"""
+        self._load_plugins()
+        return {key: sorted(graders) for key, graders in self._evaluators.items()}
+
+
+# Global instance
+evaluation_core = EvaluationCore()
@@ -1,13 +1,22 @@
 from flask_socketio import emit, join_room, leave_room, rooms
 from flask_login import current_user
 from app.models import db, CoopSession, Challenge, ChallengeAttempt
-from app.challenge_simulator import challenge_simulator
-from app.bot_ai import BotAI
+from app.executor import evaluation_executor, ExecutorBusy
+from app.live_leaderboard import leaderboard_broadcaster, LEADERBOARD_ROOM
+from app.write_behind import write_behind
+from app.session_cache import coop_sessions, ParticipantIndex
+from app.session_state import LocalSessionStore
+from app.bot_scheduler import bot_scheduler
 from datetime import datetime
 import string
 import random
 import time
 
+# Seconds between two graded actions of one player in a coop session.
+# Grading can be costly (a cracking run may make over a million guesses),
+# so play_action enforces it rather than trusting the client's timer
+ACTION_COOLDOWN = 3
+
 def register_socketio_events(socketio):
     """Register all SocketIO events"""
     
@@ -20,15 +29,36 @@ def register_socketio_events(socketio):
                 'user': current_user.username
             })
 
-    # In-memory lightweight session state for live gameplay (kept per-process)
-    # structure: { session_code: { 'scores': {user_id: score}, 'log': [], 'running': True, 'bot_threads': [] } }
-    if not hasattr(socketio, 'sessions_state'):
-        socketio.sessions_state = {}
+    # Live gameplay state (running flag, scores, hp, cooldowns, results, log).
+    # create_app attaches a shared Redis store when one is configured, so any
+    # worker can serve any session; otherwise it is kept per-process
+    if not hasattr(socketio, 'session_store'):
+        socketio.session_store = LocalSessionStore()
+    store = socketio.session_store
     
     @socketio.on('disconnect')
     def handle_disconnect():
         """Handle client disconnection"""
         pass
+
+    # Live leaderboard: clients join the room, render the snapshot once and
+    # then apply the coalesced 'leaderboard_delta' messages
+    leaderboard_broadcaster.init_socketio(socketio)
+
+    # Coop attempts and session state are committed in batches off the
+    # broadcast path; see app/write_behind.py for the durability guarantees
+    write_behind.init_socketio(socketio)
+
+    @socketio.on('join_leaderboard')
+    def handle_join_leaderboard(data=None):
+        """Subscribe to live leaderboard deltas and send the current snapshot"""
+        join_room(LEADERBOARD_ROOM)
+        emit('leaderboard_snapshot', leaderboard_broadcaster.snapshot())
+
+    @socketio.on('leave_leaderboard')
+    def handle_leave_leaderboard(data=None):
+        """Stop receiving live leaderboard deltas"""
+        leave_room(LEADERBOARD_ROOM)
     
     @socketio.on('create_coop_session')
     def handle_create_coop_session(data):
@@ -71,8 +101,11 @@ def register_socketio_events(socketio):
             'participants': [current_user.username]
         })
 
-    def _start_session(coop_session):
-        """Internal helper to start a session (extracted from handler)."""
+    def _start_session(coop_session, index=None):
+        """
+        Internal helper to start a session (extracted from handler).
+        ``index`` is the session's ParticipantIndex when the caller has one.
+        """
         if not coop_session:
             return
 
@@ -85,15 +118,14 @@ def register_socketio_events(socketio):
             print(f"Error starting session: {e}")
             return
 
-        # Create a ChallengeAttempt for each participant and map them
+        # Index the participants once (usernames in one query) and create a
+        # ChallengeAttempt for each of them
+        participants = coop_session.participants or []
+        if index is None:
+            index = ParticipantIndex.load(participants)
         attempts_map = {}
         participants_user_map = {}
-        participants = coop_session.participants or []
-        for p in participants:
-            if isinstance(p, dict):
-                uid = p.get('user_id')
-            else:
-                uid = p
+        for uid in list(index.players):
             try:
                 attempt = ChallengeAttempt(
                     user_id=str(uid),
@@ -102,13 +134,9 @@ def register_socketio_events(socketio):
                 )
                 db.session.add(attempt)
                 db.session.flush()
-                attempts_map[str(uid)] = attempt.id
-                try:
-                    user = __import__('app.models', fromlist=['User']).User.query.get(uid)
-                    participants_user_map[str(uid)] = user.username if user else str(uid)
-                except Exception as e:
-                    print(f"Error getting username for {uid}: {e}")
-                    participants_user_map[str(uid)] = str(uid)
+                attempts_map[uid] = attempt.id
+                index.set_attempt(uid, attempt.id)
+                participants_user_map[uid] = index.username(uid)
             except Exception as e:
                 print(f"Error creating attempt for {uid}: {e}")
                 continue
@@ -117,6 +145,8 @@ def register_socketio_events(socketio):
             db.session.commit()
         except Exception:
             db.session.rollback()
+        # Gameplay reads the session, its challenge and this index from the cache
+        coop_sessions.put(coop_session, index)
 
         # Notify all participants with mapping user_id -> attempt_id so each client can redirect
         emit('session_started', {
@@ -127,72 +157,38 @@ def register_socketio_events(socketio):
             'participants': participants_user_map
         }, room=coop_session.session_code)
 
-        # Initialize in-process session state (scores, log, hp, cooldowns)
-        state = socketio.sessions_state.setdefault(coop_session.session_code, {})
-        state.setdefault('scores', {})
-        state.setdefault('log', [])
-        state['running'] = True
-        state.setdefault('hp_map', {})
-        state.setdefault('cooldowns', {})
-
-        def _extract_user_id(p):
-            if isinstance(p, dict):
-                return p.get('user_id')
-            return p
-
-        for p in (coop_session.participants or []):
-            uid = _extract_user_id(p)
-            state['scores'].setdefault(str(uid), 0)
-            # init hp to full (100)
-            state['hp_map'].setdefault(str(uid), 100)
+        # Initialize the live session state; every player starts at full hp
+        session_code = coop_session.session_code
+        store.start(session_code, list(index.players), seed_results=coop_session.results)
 
         # persist initial hp_map and cooldowns on coop_session
         try:
-            coop_session.hp_map = state.get('hp_map', {})
-            coop_session.cooldowns = state.get('cooldowns', {})
+            state = store.state(session_code)
+            coop_session.hp_map = state['hp_map']
+            coop_session.cooldowns = state['cooldowns']
             db.session.commit()
         except Exception:
             db.session.rollback()
 
         # If there are fewer than 2 human participants, spawn a simple bot to participate
-        human_count = 0
-        for p in (coop_session.participants or []):
-            uid = _extract_user_id(p)
-            if isinstance(uid, str) and uid.startswith('bot-'):
-                continue
-            human_count += 1
+        human_count = sum(1 for uid in index.players if not uid.startswith('bot-'))
 
         if human_count < 2:
             bot_id = f"bot-{coop_session.session_code[:6]}"
             bot_name = f"Bot-{coop_session.session_code[:4]}"
-            state['scores'].setdefault(bot_id, 0)
-            state['hp_map'].setdefault(bot_id, 100)
+            store.start(session_code, [bot_id])
             attempts_map[bot_id] = f"bot-attempt-{bot_id}"
             participants_user_map[bot_id] = bot_name
 
-            def bot_loop():
-                bot = BotAI(difficulty='medium', role='attacker')
-                bot_state = {'bot_step': 0}
-                while state.get('running'):
-                    try:
-                        challenge = coop_session.challenge
-                        action = bot.get_next_action(challenge.challenge_type, bot_state)
-                        payload = action.get('description', '')
-                        try:
-                            evaluate_and_record(coop_session.session_code, bot_id, bot_name, payload)
-                        except Exception:
-                            pass
-                        bot_state['bot_step'] = bot_state.get('bot_step', 0) + 1
-                        time.sleep(bot.get_reaction_delay())
-                    except Exception:
-                        break
-
-            t = socketio.start_background_task(bot_loop)
-            state.setdefault('bot_threads', []).append(t)
+            # Resolve the challenge once; the scheduler plays every turn from it
+            challenge = coop_session.challenge or Challenge.query.get(coop_session.challenge_id)
+            if challenge is not None:
+                bot_scheduler.add(session_code, bot_id, bot_name, challenge.challenge_type)
             # persist changes caused by bot addition
             try:
-                coop_session.hp_map = state.get('hp_map', {})
-                coop_session.cooldowns = state.get('cooldowns', {})
+                state = store.state(session_code)
+                coop_session.hp_map = state['hp_map']
+                coop_session.cooldowns = state['cooldowns']
                 db.session.commit()
             except Exception:
                 db.session.rollback()
@@ -227,30 +223,19 @@ def register_socketio_events(socketio):
             new_part = {'user_id': current_user.id, 'team': None}
             coop_session.participants = existing + [new_part]
             db.session.commit()
+            coop_sessions.invalidate(session_code)
         
         # Join room
         join_room(session_code)
         
-        # Build participants list of usernames for readability
-        def _extract_user_id(p):
-            # participants may be stored as dicts like {'user_id':..., 'team':...} or raw ids
-            if isinstance(p, dict):
-                return p.get('user_id')
-            return p
-
-        participants_usernames = []
-        for p in (coop_session.participants or []):
-            uid = _extract_user_id(p)
-            try:
-                user = __import__('app.models', fromlist=['User']).User.query.get(uid)
-                participants_usernames.append(user.username if user else str(uid))
-            except Exception:
-                participants_usernames.append(str(uid))
+        # Index the participants (usernames resolved in one query); kept
+        # up to date below and handed to _start_session
+        index = ParticipantIndex.load(coop_session.participants or [])
 
         # Notify all participants
         emit('user_joined', {
             'username': current_user.username,
-            'participants': participants_usernames
+            'participants': index.usernames()
         }, room=session_code)
 
         # If this session was created as competitive (creator_team 'red' or 'blue'), auto-assign teams
@@ -260,12 +245,14 @@ def register_socketio_events(socketio):
                 for p in coop_session.participants:
                     if isinstance(p, dict) and p.get('user_id') == current_user.id:
                         p['team'] = 'blue' if coop_session.creator_team == 'red' else 'red'
+                        index.add(current_user.id, team=p['team'], username=current_user.username)
                 # persist
                 coop_session.participants = coop_session.participants
                 db.session.commit()
+                coop_sessions.invalidate(session_code)
                 # if we have 2 or more participants, auto-start PvP
                 if len(coop_session.participants or []) >= 2:
-                    _start_session(coop_session)
+                    _start_session(coop_session, index)
         except Exception:
             db.session.rollback()
 
@@ -287,34 +274,33 @@ def register_socketio_events(socketio):
         session_code = data.get('session_code')
         solution = data.get('solution')
         
-        coop_session = CoopSession.query.filter_by(session_code=session_code).first()
+        # Cached snapshot with the challenge already resolved
+        coop_session = coop_sessions.get(session_code)
         if not coop_session:
             emit('error', {'message': 'Session not found'})
             return
         
-        # coop_session.challenge may be None if an invalid challenge_id was stored (e.g. fallback 1)
         challenge = coop_session.challenge
-        if challenge is None:
-            try:
-                # attempt to resolve the challenge explicitly
-                challenge = __import__('app.models', fromlist=['Challenge']).Challenge.query.get(coop_session.challenge_id)
-            except Exception:
-                challenge = None
-
         if challenge is None:
             # nothing to evaluate against; record a no-op and return
             emit('error', {'message': 'The challenge associated with the session is missing — cannot perform action'}, room=session_code)
             return
         
-        # Use realistic challenge simulator
-        result = challenge_simulator.evaluate_challenge(
-            challenge.challenge_type,
-            solution,
-            challenge.difficulty
-        )
+        # Use realistic challenge simulator (graded in a worker process)
+        try:
+            result = evaluation_executor.evaluate(
+                'simulator',
+                challenge.challenge_type,
+                solution,
+                challenge.difficulty
+            )
+        except ExecutorBusy:
+            emit('error', {'message': 'Server is busy grading other solutions, please try again'})
+            return
         
-        # Create attempt record
-        attempt = ChallengeAttempt(
+        # Queue the attempt record; it is committed with the next batch
+        write_behind.add_attempt(
+            challenge.category,
             user_id=current_user.id,
             challenge_id=coop_session.challenge_id,
             user_input=solution,
@@ -323,25 +309,19 @@ def register_socketio_events(socketio):
             is_correct=result['success'],
             score=result['score'],
             feedback=result['feedback'],
-            errors=result.get('errors', [])
+            mistakes=result.get('errors', []),
+            rule_pack_version=result.get('rule_pack_version')
         )
         
-        db.session.add(attempt)
-        db.session.commit()
-        
         # Store result in session
-        if not coop_session.results:
-            coop_session.results = {}
-        
-        coop_session.results[current_user.id] = {
+        results = store.set_result(session_code, str(current_user.id), {
             'username': current_user.username,
             'is_correct': result['success'],
             'score': result['score'],
             'feedback': result['feedback'],
             'submitted_at': datetime.utcnow().isoformat()
-        }
-        
-        db.session.commit()
+        }, seed_results=coop_session.results)
+        write_behind.snapshot(session_code, results=results)
         
         # Notify all participants
         emit('solution_submitted', {
@@ -349,29 +329,29 @@ def register_socketio_events(socketio):
             'is_correct': result['success'],
             'score': result['score'],
             'feedback': result['feedback'],
-            'results': coop_session.results
+            'results': results
         }, room=session_code)
 
     def evaluate_and_record(session_code, actor_id, actor_name, payload, target_id=None):
-        """Helper to evaluate a submitted action/payload and broadcast results."""
-        coop_session = CoopSession.query.filter_by(session_code=session_code).first()
+        """
+        Helper to evaluate a submitted action/payload and broadcast results.
+        Also called for bot turns outside any request, so it broadcasts with
+        socketio.emit.
+        """
+        # Cached snapshot with the challenge already resolved: no SQL on the hot path
+        coop_session = coop_sessions.get(session_code)
         if not coop_session:
             return
 
-        # Resolve challenge object (guard against invalid challenge_id)
         challenge = coop_session.challenge
-        if challenge is None:
-            try:
-                challenge = __import__('app.models', fromlist=['Challenge']).Challenge.query.get(coop_session.challenge_id)
-            except Exception:
-                challenge = None
-
         if challenge is None:
             # nothing to evaluate against; notify room and stop
-            emit('error', {'message': 'The challenge associated with the session is missing — cannot perform action'}, room=session_code)
+            socketio.emit('error', {'message': 'The challenge associated with the session is missing — cannot perform action'}, to=session_code)
             return
 
-        result = challenge_simulator.evaluate_challenge(
+        # Raises ExecutorBusy when the grading pool is saturated
+        result = evaluation_executor.evaluate(
+            'simulator',
             challenge.challenge_type,
             payload,
             challenge.difficulty
@@ -389,36 +369,24 @@ def register_socketio_events(socketio):
             'timestamp': datetime.utcnow().isoformat()
         }
 
-        # Persist attempt record for both humans and bots (bots have ids like 'bot-...')
-        try:
-            attempt = ChallengeAttempt(
-                user_id=str(actor_id),
-                challenge_id=coop_session.challenge_id,
-                user_input=payload,
-                is_completed=True,
-                completed_at=datetime.utcnow(),
-                is_correct=result['success'],
-                score=result['score'],
-                feedback=result['feedback']
-            )
-            db.session.add(attempt)
-            db.session.commit()
-        except Exception:
-            # don't fail the live flow on DB write issues
-            db.session.rollback()
-
-        # Update in-memory session state
-        state = socketio.sessions_state.setdefault(session_code, {})
-        scores = state.setdefault('scores', {})
-        scores.setdefault(str(actor_id), 0)
-        scores[str(actor_id)] += result.get('score', 0)
-        state.setdefault('log', []).append(record)
-        # ensure hp_map and cooldowns exist
-        hp_map = state.setdefault('hp_map', {})
-        cooldowns = state.setdefault('cooldowns', {})
+        # Queue the attempt record; bots (ids like 'bot-...') have no user row
+        # to attach one to, so the buffer skips them
+        write_behind.add_attempt(
+            challenge.category,
+            user_id=str(actor_id),
+            challenge_id=coop_session.challenge_id,
+            user_input=payload,
+            is_completed=True,
+            completed_at=datetime.utcnow(),
+            is_correct=result['success'],
+            score=result['score'],
+            feedback=result['feedback'],
+            rule_pack_version=result.get('rule_pack_version')
+        )
 
-        # Initialize actor hp if missing
-        hp_map.setdefault(str(actor_id), 100)
+        # Update the live session state
+        total_score = store.add_score(session_code, str(actor_id), result.get('score', 0))
+        damage = {}
 
         # Simple PvP mechanics: if session was competitive, apply damage to opponents on successful attack
         try:
@@ -427,111 +395,88 @@ def register_socketio_events(socketio):
             competitive = False
 
         if competitive:
-            # determine actor team
-            actor_team = None
-            for p in (coop_session.participants or []):
-                if isinstance(p, dict) and str(p.get('user_id')) == str(actor_id):
-                    actor_team = p.get('team')
-                    break
-
-            # choose targets: if explicit target_id provided use that, otherwise default to participants not on actor_team
-            targets = []
-            if target_id:
-                # only target if present in participants and not self
-                for p in (coop_session.participants or []):
-                    uid = p.get('user_id') if isinstance(p, dict) else p
-                    if str(uid) == str(target_id) and str(uid) != str(actor_id):
-                        targets.append(str(uid))
-                        break
-            else:
-                for p in (coop_session.participants or []):
-                    uid = p.get('user_id') if isinstance(p, dict) else p
-                    if str(uid) == str(actor_id):
-                        continue
-                    if actor_team and isinstance(p, dict) and p.get('team') and p.get('team') == actor_team:
-                        continue
-                    targets.append(str(uid))
+            # explicit target_id if it is another player, otherwise the actor's opponents
+            targets = coop_session.index.targets(actor_id, target_id)
 
             # damage amount based on score (fallback 10)
             dmg = int(result.get('score') or 10)
             if result.get('success'):
                 for tid in targets:
-                    hp_map.setdefault(tid, 100)
                     # remove up to min(20, dmg)
-                    hp_map[tid] = max(0, hp_map[tid] - min(20, dmg))
+                    damage[tid] = min(20, dmg)
             else:
                 # failed action penalizes attacker a bit
-                hp_map[str(actor_id)] = max(0, hp_map.get(str(actor_id), 100) - 8)
-
-        # Set cooldown for actor (expiry timestamp)
-        try:
-            cooldown_seconds = 3
-            cooldowns[str(actor_id)] = int(time.time()) + cooldown_seconds
-        except Exception:
-            pass
-
-        # persist hp_map and cooldowns back to the CoopSession DB record so state survives process restarts
-        try:
-            coop_session.hp_map = hp_map
-            coop_session.cooldowns = cooldowns
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-
-        # Persist summary into coop_session.results for later retrieval
-        if not coop_session.results:
-            coop_session.results = {}
-        coop_session.results[str(actor_id)] = {
-            'username': actor_name,
-            'is_correct': result['success'],
-            'score': scores[str(actor_id)],
-            'feedback': result['feedback'],
-            'last_seen': datetime.utcnow().isoformat()
-        }
-        try:
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-
-        # Broadcast action result and summary update
-        emit('action_result', {
+                damage[str(actor_id)] = 8
+
+        # Set cooldown for actor (expiry timestamp), log the action and keep
+        # a summary for later retrieval, all in one store update
+        state = store.apply_action(
+            session_code, str(actor_id), record,
+            damage=damage,
+            cooldown_until=int(time.time()) + ACTION_COOLDOWN,
+            result={
+                'username': actor_name,
+                'is_correct': result['success'],
+                'score': total_score,
+                'feedback': result['feedback'],
+                'last_seen': datetime.utcnow().isoformat()
+            },
+            seed_results=coop_session.results
+        )
+        scores = state['scores']
+        hp_map = state['hp_map']
+        cooldowns = state['cooldowns']
+        results = state['results']
+
+        # Queue hp_map, cooldowns and results for the CoopSession record so
+        # state survives process restarts; the broadcast does not wait for it
+        write_behind.snapshot(session_code, hp_map=hp_map, cooldowns=cooldowns, results=results)
+
+        # Broadcast only what this action changed; clients apply deltas in
+        # seq order and ask for a 'state_snapshot' when they see a gap
+        actor_key = str(actor_id)
+        changed_hp = {actor_key, *damage}
+        socketio.emit('state_delta', {
+            'seq': state['seq'],
             'record': record,
-            'scores': scores,
-            'results': coop_session.results,
-            'hp_map': hp_map,
-            'cooldowns': cooldowns
-        }, room=session_code)
-
-        # Also send a compact session update for UI
-        emit('session_update', {
-            'scores': scores,
-            'recent': record,
-            'hp_map': hp_map,
-            'cooldowns': cooldowns
-        }, room=session_code)
+            'scores': {actor_key: scores[actor_key]},
+            'hp_map': {uid: hp_map[uid] for uid in changed_hp if uid in hp_map},
+            'cooldowns': {actor_key: cooldowns[actor_key]},
+            'results': {actor_key: results[actor_key]}
+        }, to=session_code)
 
         # If any player reached 0 HP, end the session and declare winner(s)
         try:
             losers = [k for k,v in (hp_map or {}).items() if v <= 0]
             if losers:
-                coop_session.status = 'completed'
-                coop_session.completed_at = datetime.utcnow()
-                try:
-                    db.session.commit()
-                except Exception:
-                    db.session.rollback()
-                # prepare results and emit session_ended
-                emit('session_ended', {
-                    'results': coop_session.results,
+                # store the final state before announcing the end
+                write_behind.snapshot(session_code, status='completed', completed_at=datetime.utcnow())
+                write_behind.flush()
+                coop_sessions.invalidate(session_code)
+                socketio.emit('session_ended', {
+                    'results': results,
                     'hp_map': hp_map,
                     'losers': losers,
                     'mode': getattr(coop_session, 'mode', coop_session.creator_team if hasattr(coop_session, 'creator_team') else None)
-                }, room=session_code)
+                }, to=session_code)
                 # mark running false so bots/loops exit
-                state['running'] = False
+                store.stop(session_code)
         except Exception:
             pass
 
+    def _play_bot_turn(session_code, bot_id, bot_name, payload):
+        """Play one scheduled bot action; False once the session has ended"""
+        if not store.is_running(session_code):
+            return False
+        try:
+            evaluate_and_record(session_code, bot_id, bot_name, payload)
+        except ExecutorBusy:
+            # graders are saturated; the bot just skips this turn
+            pass
+        return store.is_running(session_code)
+
+    bot_scheduler.init_socketio(socketio, _play_bot_turn)
+
     @socketio.on('play_action')
     def handle_play_action(data):
         """Receive an in-game action from a connected client."""
@@ -557,9 +502,19 @@ def register_socketio_events(socketio):
         except Exception:
             target_id = None
 
+        if not coop_sessions.get(session_code):
+            emit('error', {'message': 'Session not found'})
+            return
+        if not store.claim_cooldown(session_code, str(current_user.id), ACTION_COOLDOWN):
+            emit('error', {'message': 'Action on cooldown, please wait'})
+            return
+
         # Call helper to evaluate and broadcast (pass target_id when available)
         try:
             evaluate_and_record(session_code, current_user.id, current_user.username, action_payload, target_id=target_id)
+        except ExecutorBusy:
+            emit('error', {'message': 'Server is busy grading other actions, please try again'})
+            return
         except Exception as e:
             # log exception for debugging and return a more informative error to the client
             import traceback
@@ -567,27 +522,57 @@ def register_socketio_events(socketio):
             emit('error', {'message': f'Failed to execute action: {str(e)}'})
             return
     
+    @socketio.on('request_state')
+    def handle_request_state(data):
+        """Send the full live state of a session to the requesting client"""
+        if not current_user.is_authenticated:
+            emit('error', {'message': 'Authentication required'})
+            return
+        session_code = (data or {}).get('session_code')
+        if not session_code:
+            emit('error', {'message': 'Invalid session code'})
+            return
+        # Only the session's players may read its live state
+        cached = coop_sessions.get(session_code)
+        if not cached or current_user.id not in cached.index:
+            emit('error', {'message': 'You are not a participant of this session'})
+            return
+        state = store.state(session_code)
+        emit('state_snapshot', {
+            'seq': state['seq'],
+            'scores': state['scores'],
+            'hp_map': state['hp_map'],
+            'cooldowns': state['cooldowns'],
+            'results': state['results']
+        })
+    
     @socketio.on('end_coop_session')
     def handle_end_coop_session(data):
         """End a cooperative session"""
         session_code = data.get('session_code')
         
-        coop_session = CoopSession.query.filter_by(session_code=session_code).first()
+        coop_session = coop_sessions.get(session_code)
         if not coop_session:
             emit('error', {'message': 'Session not found'})
             return
         
-        coop_session.status = 'completed'
-        coop_session.completed_at = datetime.utcnow()
-        db.session.commit()
-        # mark session state as stopped so threads can exit
-        state = getattr(socketio, 'sessions_state', {}).get(session_code)
-        if state:
-            state['running'] = False
+        # mark session state as stopped so bots (in any worker) exit
+        store.stop(session_code)
+        bot_scheduler.cancel(session_code)
+        # Store the final state, with any queued actions, before announcing the end
+        state = store.state(session_code)
+        final = {'status': 'completed', 'completed_at': datetime.utcnow()}
+        if state['hp_map']:
+            # the live state may come from actions handled by other workers
+            final.update(hp_map=state['hp_map'], cooldowns=state['cooldowns'], results=state['results'])
+        write_behind.snapshot(session_code, **final)
+        write_behind.flush()
+        coop_sessions.invalidate(session_code)
+        results = state['results'] or coop_session.results
 
         # Notify all participants
         emit('session_ended', {
-            'results': coop_session.results,
+            'results': results,
             'mode': getattr(coop_session, 'mode', coop_session.creator_team if hasattr(coop_session, 'creator_team') else None)
         }, room=session_code)
         
@@ -0,0 +1,176 @@
+"""
+Evaluation Executor
+Runs CPU-bound work (challenge grading, the SQL sandbox, password hashing)
+in a bounded process pool so it does not block the gevent hub that serves
+every HTTP request and socket.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+
+class ExecutorBusy(Exception):
+    """No capacity to run the work now; the caller should ask to retry"""
+
+
+def _grade(grader, challenge_type, payload, difficulty, role):
+    """Evaluate one payload (runs inside a worker process)"""
+    if grader == 'engine':
+        from app.challenge_engine import challenge_engine
+        return challenge_engine.evaluate_challenge(challenge_type, payload, difficulty, role)
+    from app.challenge_simulator import challenge_simulator
+    return challenge_simulator.evaluate_challenge(challenge_type, payload, difficulty)
+
+
+def in_pool_worker():
+    """
+    True inside a pool worker process. Set before a spawned worker
+    re-imports the parent's main module, unlike parent_process().
+    """
+    return multiprocessing.current_process().name != 'MainProcess'
+
+
+def _outside_request():
+    """
+    True in the main greenlet, i.e. startup code, scripts and the shell
+    rather than a request or socket handler. Offloading only pays while
+    serving, and a pool started from a script would have every spawned
+    worker re-run that script.
+    """
+    try:
+        from gevent import getcurrent, get_hub
+    except ImportError:
+        return False
+    return getcurrent() is get_hub().parent
+
+
+def _gevent_unpatched():
+    """True when running on gevent without monkey-patched threading"""
+    try:
+        from gevent.monkey import is_module_patched
+        from gevent import getcurrent, get_hub
+    except ImportError:
+        return False
+    # A plain blocking wait would stall the hub only if we are in a greenlet
+    return not is_module_patched('threading') and getcurrent() is not get_hub().parent
+
+
+class EvaluationExecutor:
+    """
+    Bounded process pool for CPU-heavy calls.
+
+    At most ``max_pending`` calls may be queued or running; beyond that
+    ``ExecutorBusy`` is raised immediately instead of queueing more work.
+    With ``workers == 0`` (or before ``init_app``), and outside request
+    handlers, calls run inline. Waits are gevent-friendly: with
+    monkey-patching the future's condition yields to the hub, and without
+    it the wait is moved to gevent's native thread pool.
+    """
+
+    def __init__(self):
+        self.workers = 0
+        self.max_pending = 32
+        self.timeout = 10
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.memo_hits = 0
+
+    def init_app(self, app):
+        self.workers = app.config.get('EVALUATION_WORKERS', 0)
+        self.max_pending = app.config.get('EVALUATION_MAX_PENDING', 32)
+        self.timeout = app.config.get('EVALUATION_TIMEOUT', 10)
+        if in_pool_worker():
+            # Spawned pool workers import the app as well; they grade inline
+            self.workers = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: never fork a process that owns a gevent hub
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._pool
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def _runs_inline(self):
+        return not self.workers or _outside_request()
+
+    def call(self, fn, *args):
+        """Run ``fn(*args)`` in the pool and return its result"""
+        if self._runs_inline():
+            return fn(*args)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorBusy('Too many evaluations in progress')
+            self._pending += 1
+
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BrokenProcessPool:
+            self._reset_pool()
+            with self._lock:
+                self._pending -= 1
+            raise ExecutorBusy('Evaluation workers are restarting')
+        future.add_done_callback(self._done)
+
+        try:
+            if _gevent_unpatched():
+                from gevent import get_hub
+                return get_hub().threadpool.spawn(future.result, self.timeout).get()
+            return future.result(self.timeout)
+        except FutureTimeout:
+            raise ExecutorBusy('Evaluation timed out')
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise ExecutorBusy('Evaluation workers are restarting')
+
+    def _reset_pool(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def evaluate(self, grader, challenge_type, payload, difficulty, role='attacker'):
+        """
+        Grade ``payload`` with challenge_engine ('engine') or
+        challenge_simulator. The memo is checked here first, so repeated
+        payloads never take a pool slot, and results graded by a worker
+        are memoized here too.
+        """
+        if self._runs_inline():
+            return _grade(grader, challenge_type, payload, difficulty, role)
+        from app.evaluation import evaluation_core
+        result, key = evaluation_core.lookup(grader, challenge_type, payload, difficulty, role)
+        if result is not None:
+            self.memo_hits += 1
+            return result
+        if key is None:
+            # Unknown type: nothing to offload
+            return _grade(grader, challenge_type, payload, difficulty, role)
+        result = self.call(_grade, grader, challenge_type, payload, difficulty, role)
+        evaluation_core.remember(key, result)
+        return result
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'pending': self._pending,
+            'max_pending': self.max_pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'memo_hits': self.memo_hits
+        }
+
+
+# Global instance
+evaluation_executor = EvaluationExecutor()
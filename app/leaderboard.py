@@ -0,0 +1,427 @@
+"""
+Leaderboard Aggregates
+Keeps the per-user UserScore rows and the time-bucketed ScoreBucket rollups
+in step with completed challenge attempts and serves sorted leaderboard
+reads from them.
+"""
+import hashlib
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, event, func, or_
+from app.models import db, User, Challenge, ChallengeAttempt, UserScore, ScoreBucket
+from app.cache import LRUCache, RedisCache, get_redis_client
+
+# Category key holding each user's overall total
+ALL_CATEGORIES = 'all'
+
+# Categories the leaderboard can be filtered by
+LEADERBOARD_CATEGORIES = (ALL_CATEGORIES, 'red', 'blue', 'coop')
+
+# Time windows with their own rollup buckets
+WINDOWS = ('day', 'week', 'month')
+
+# Key in Session.info collecting score deltas until the transaction commits
+_PENDING_KEY = 'leaderboard_pending'
+
+# Callables notified after commit with {user_id: {category: delta}}
+_score_listeners = []
+
+
+def on_scores_changed(callback):
+    """Register ``callback(changes)`` to run after score changes commit"""
+    _score_listeners.append(callback)
+    return callback
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_committed_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+    for callback in list(_score_listeners):
+        try:
+            callback(changes)
+        except Exception as e:
+            # listeners are best-effort; the scores themselves are committed
+            print(f"Leaderboard listener failed: {e}")
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def is_bot_id(user_id):
+    """Bots record attempts under synthetic ids like 'bot-XXXXXX'"""
+    return str(user_id).startswith('bot-')
+
+
+def bucket_start(window, when):
+    """First day of the ``window`` bucket containing ``when``"""
+    day = when.date() if isinstance(when, datetime) else when
+    if window == 'day':
+        return day
+    if window == 'week':
+        return day - timedelta(days=day.weekday())
+    if window == 'month':
+        return day.replace(day=1)
+    raise ValueError(f'Unknown leaderboard window: {window}')
+
+
+def _increment(model, delta, completed, **key):
+    """Add ``delta`` to one aggregate row, creating it on first use"""
+    entry = model.query.filter_by(**key).first()
+    if entry is None:
+        entry = model(score=delta, attempts_completed=completed, **key)
+        db.session.add(entry)
+        return
+    # Increment in SQL so concurrent writers do not lose updates
+    entry.score = model.score + delta
+    entry.attempts_completed = model.attempts_completed + completed
+
+
+def record_completed_attempt(attempt, category=None, previous_score=None, previous_completed_at=None):
+    """
+    Fold a completed attempt into the aggregates.
+
+    Must be called before the commit that completes ``attempt`` so the
+    aggregate update shares its transaction. When the attempt is being
+    re-graded, ``previous_score`` and ``previous_completed_at`` are the
+    score it already contributed and the time it was counted under: that
+    score leaves its old time buckets and the new score goes to the buckets
+    of the new ``completed_at``.
+    """
+    if not attempt.is_completed or is_bot_id(attempt.user_id):
+        return
+
+    if category is None:
+        challenge = Challenge.query.get(attempt.challenge_id)
+        category = challenge.category if challenge else None
+
+    score = attempt.score or 0
+    if previous_score is None:
+        delta, completed = score, 1
+    else:
+        delta, completed = score - previous_score, 0
+
+    categories = [ALL_CATEGORIES]
+    if category and category != ALL_CATEGORIES:
+        categories.append(category)
+
+    # Per-bucket (score, completed) changes, merged so a re-grade within the
+    # same bucket updates its row once
+    bucket_changes = {}
+
+    def change(window, when, score_delta, completed_delta):
+        key = (window, bucket_start(window, when))
+        old_score, old_completed = bucket_changes.get(key, (0, 0))
+        bucket_changes[key] = (old_score + score_delta, old_completed + completed_delta)
+
+    completed_at = attempt.completed_at or datetime.utcnow()
+    for window in WINDOWS:
+        # Attempts completed without a timestamp were never bucketed
+        if previous_score is not None and previous_completed_at is not None:
+            change(window, previous_completed_at, -previous_score, -1)
+        change(window, completed_at, score, 1)
+
+    pending = db.session.info.setdefault(_PENDING_KEY, {}).setdefault(attempt.user_id, {})
+    for cat in categories:
+        _increment(UserScore, delta, completed, user_id=attempt.user_id, category=cat)
+        for (window, start), (score_delta, completed_delta) in bucket_changes.items():
+            _increment(ScoreBucket, score_delta, completed_delta, user_id=attempt.user_id,
+                       category=cat, period=window, bucket_start=start)
+        pending[cat] = pending.get(cat, 0) + delta
+
+
+def remove_challenge_scores(challenge):
+    """
+    Take the points of ``challenge``'s completed attempts back out of the
+    aggregates, before the challenge (and with it its attempts) is deleted
+    in the same transaction.
+    """
+    rows = db.session.query(
+        ChallengeAttempt.user_id,
+        func.date(ChallengeAttempt.completed_at),
+        func.sum(ChallengeAttempt.score),
+        func.count(ChallengeAttempt.id)
+    ).filter(
+        ChallengeAttempt.challenge_id == challenge.id,
+        ChallengeAttempt.is_completed == True
+    ).group_by(ChallengeAttempt.user_id, func.date(ChallengeAttempt.completed_at)).all()
+
+    categories = [ALL_CATEGORIES]
+    if challenge.category and challenge.category != ALL_CATEGORIES:
+        categories.append(challenge.category)
+
+    totals = {}   # user_id -> (score, completed)
+    buckets = {}  # (user_id, window, bucket_start) -> (score, completed)
+
+    def add(table, key, score, completed):
+        old_score, old_completed = table.get(key, (0, 0))
+        table[key] = (old_score + score, old_completed + completed)
+
+    for user_id, day, score, completed in rows:
+        if is_bot_id(user_id):
+            continue
+        score = score or 0
+        add(totals, user_id, score, completed)
+        if day is None:
+            continue
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        for window in WINDOWS:
+            add(buckets, (user_id, window, bucket_start(window, day)), score, completed)
+
+    pending = db.session.info.setdefault(_PENDING_KEY, {})
+    for user_id, (score, completed) in totals.items():
+        changes = pending.setdefault(user_id, {})
+        for cat in categories:
+            _increment(UserScore, -score, -completed, user_id=user_id, category=cat)
+            changes[cat] = changes.get(cat, 0) - score
+    for (user_id, window, start), (score, completed) in buckets.items():
+        for cat in categories:
+            _increment(ScoreBucket, -score, -completed, user_id=user_id, category=cat,
+                       period=window, bucket_start=start)
+
+
+def get_leaderboard(category=ALL_CATEGORIES, limit=50, after_score=None, after_user=None,
+                    window=None, period_start=None):
+    """
+    One page of the leaderboard for ``category``, read in one sorted query.
+
+    With ``window`` (day/week/month) the page is read from the ScoreBucket
+    rollup starting at ``period_start`` instead of the all-time totals.
+    Pages are keyset-paginated on (score DESC, user_id ASC): pass the last
+    row of the previous page as ``after_score``/``after_user``. Returns
+    ``(entries, next_cursor)`` where ``next_cursor`` is None on the last page.
+    """
+    model = ScoreBucket if window else UserScore
+    query = db.session.query(model.score, User).join(
+        User, User.id == model.user_id
+    ).filter(
+        model.category == category,
+        model.score > 0
+    )
+
+    if window:
+        query = query.filter(ScoreBucket.period == window,
+                             ScoreBucket.bucket_start == period_start)
+
+    if after_score is not None and after_user is not None:
+        query = query.filter(or_(
+            model.score < after_score,
+            and_(model.score == after_score, model.user_id > after_user)
+        ))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.order_by(
+        model.score.desc(), model.user_id
+    ).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_score, last_user = rows[-1]
+        next_cursor = {'after_score': last_score, 'after_user': last_user.id}
+
+    entries = [{'user': user, 'score': score} for score, user in rows]
+    return entries, next_cursor
+
+
+class LeaderboardCache:
+    """
+    Cache of serialized leaderboard pages keyed by category and cursor.
+
+    Entries expire after LEADERBOARD_CACHE_TTL seconds and are invalidated
+    explicitly whenever scores change: invalidation bumps a generation
+    number that is part of every key, so old pages are simply never read
+    again. With REDIS_URL set the pages and the generation live in Redis
+    and are shared by every worker; otherwise an in-process LRU is used.
+    """
+
+    def __init__(self):
+        self.ttl = 30
+        self._local = LRUCache(max_size=256, ttl=self.ttl)
+        self._redis = None
+        self._generation = 0
+        self._modified = time.time()
+        # Shared generation this worker's last invalidation produced
+        self.last_shared_generation = None
+
+    def init_app(self, app):
+        self.ttl = app.config.get('LEADERBOARD_CACHE_TTL', 30)
+        self._local = LRUCache(max_size=app.config.get('LEADERBOARD_CACHE_SIZE', 256), ttl=self.ttl)
+        client = get_redis_client(app.config.get('REDIS_URL'))
+        self._redis = RedisCache(client, prefix='leaderboard:', ttl=self.ttl) if client else None
+
+    def _version(self):
+        """Current (generation, last-modified epoch seconds)"""
+        if self._redis:
+            generation = self._redis.get('generation', 0)
+            modified = self._redis.get('modified', self._modified)
+            return generation, modified
+        return self._generation, self._modified
+
+    def shared_generation(self):
+        """
+        The generation shared by every worker (bumped by any worker's score
+        change), or None without Redis, when this worker sees every change
+        """
+        if not self._redis:
+            return None
+        return self._redis.get('generation', 0)
+
+    def next_shared_seq(self, key):
+        """Next value of a counter shared by every worker, or None without Redis"""
+        if not self._redis:
+            return None
+        return self._redis.incr(key)
+
+    def shared_value(self, key, default=None):
+        if not self._redis:
+            return default
+        return self._redis.get(key, default)
+
+    def invalidate(self):
+        """Drop every cached page (called when scores change)"""
+        now = time.time()
+        self._generation += 1
+        self._modified = now
+        self._local.clear()
+        if self._redis:
+            try:
+                self.last_shared_generation = self._redis.incr('generation')
+                self._redis.set('modified', now, ttl=0)
+            except Exception as e:
+                print(f"Leaderboard cache invalidation failed: {e}")
+
+    def get_page(self, category, limit, after_score=None, after_user=None, window=None, period_start=None):
+        """
+        Return ``(page, etag, last_modified)`` for one leaderboard page.
+
+        ``page`` is a JSON-serializable dict with ``entries`` and ``next``.
+        """
+        backend = self._local
+        try:
+            generation, modified = self._version()
+            if self._redis:
+                backend = self._redis
+        except Exception as e:
+            # Redis unreachable: serve from the in-process cache instead
+            print(f"Leaderboard cache unavailable: {e}")
+            generation, modified = self._generation, self._modified
+
+        key = f'{generation}:{window}:{period_start}:{category}:{limit}:{after_score}:{after_user}'
+        page = None
+        try:
+            page = backend.get(key)
+        except Exception as e:
+            print(f"Leaderboard cache read failed: {e}")
+
+        if page is None:
+            entries, next_cursor = get_leaderboard(category, limit, after_score, after_user,
+                                                   window, period_start)
+            page = {
+                'entries': [{
+                    'user': {
+                        'id': item['user'].id,
+                        'username': item['user'].username,
+                        'is_admin': bool(item['user'].is_admin)
+                    },
+                    'score': item['score']
+                } for item in entries],
+                'next': next_cursor
+            }
+            try:
+                backend.set(key, page)
+            except Exception as e:
+                print(f"Leaderboard cache write failed: {e}")
+
+        etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return page, etag, datetime.utcfromtimestamp(int(modified))
+
+
+# Global instance
+leaderboard_cache = LeaderboardCache()
+
+
+@on_scores_changed
+def _invalidate_cached_pages(changes):
+    leaderboard_cache.invalidate()
+
+
+def clear_user_scores():
+    """Drop every aggregate and rollup row (used when attempts are wiped)"""
+    UserScore.query.delete()
+    ScoreBucket.query.delete()
+
+
+def backfill_user_scores():
+    """
+    Rebuild the aggregates once if they are missing, e.g. on the first start
+    after the UserScore or ScoreBucket table was added to an existing
+    database. Returns the number of rows written (0 when nothing was needed).
+    """
+    completed = db.session.query(ChallengeAttempt.id).join(
+        User, User.id == ChallengeAttempt.user_id
+    ).filter(ChallengeAttempt.is_completed == True)
+    if UserScore.query.first() is None:
+        needed = completed.first() is not None
+    else:
+        needed = (ScoreBucket.query.first() is None and
+                  completed.filter(ChallengeAttempt.completed_at.isnot(None)).first() is not None)
+    return rebuild_user_scores() if needed else 0
+
+
+def rebuild_user_scores():
+    """Recompute all aggregates and time-bucket rollups from ChallengeAttempt"""
+    clear_user_scores()
+
+    user_ids = {uid for (uid,) in db.session.query(User.id).all()}
+    totals = {}
+    buckets = {}
+
+    def add(table, key, score):
+        score_sum, completed = table.get(key, (0, 0))
+        table[key] = (score_sum + score, completed + 1)
+
+    # Stream attempts once; an attempt whose challenge row is missing still
+    # counts towards the overall totals (deleting a challenge deletes its
+    # attempts, see remove_challenge_scores)
+    attempts = db.session.query(
+        ChallengeAttempt.user_id,
+        ChallengeAttempt.score,
+        ChallengeAttempt.completed_at,
+        Challenge.category
+    ).outerjoin(Challenge, Challenge.id == ChallengeAttempt.challenge_id).filter(
+        ChallengeAttempt.is_completed == True
+    ).yield_per(10000)
+
+    for user_id, score, completed_at, category in attempts:
+        if user_id not in user_ids:
+            continue
+        score = score or 0
+        categories = [ALL_CATEGORIES]
+        if category and category != ALL_CATEGORIES:
+            categories.append(category)
+        for cat in categories:
+            add(totals, (user_id, cat), score)
+            if completed_at is None:
+                continue
+            for window in WINDOWS:
+                add(buckets, (user_id, cat, window, bucket_start(window, completed_at)), score)
+
+    db.session.bulk_save_objects([
+        UserScore(user_id=user_id, category=cat, score=score, attempts_completed=completed)
+        for (user_id, cat), (score, completed) in totals.items()
+    ])
+    db.session.bulk_save_objects([
+        ScoreBucket(user_id=user_id, category=cat, period=window, bucket_start=start,
+                    score=score, attempts_completed=completed)
+        for (user_id, cat, window, start), (score, completed) in buckets.items()
+    ])
+
+    db.session.commit()
+    # Shared (Redis) caches must not keep serving pre-rebuild pages
+    leaderboard_cache.invalidate()
+    return len(totals) + len(buckets)
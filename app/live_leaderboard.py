@@ -0,0 +1,121 @@
+"""
+Live Leaderboard
+Pushes compact rank/score deltas to clients in the 'leaderboard' Socket.IO
+room. Committed score changes are coalesced over a short window so a burst
+of completions produces a single message. With Redis the sequence number
+is shared, so deltas from every worker form one sequence.
+"""
+from flask import current_app
+from app.models import db, User
+from app.leaderboard import ALL_CATEGORIES, on_scores_changed, leaderboard_cache
+from app.ranking import rank_index
+
+# Socket.IO room clients join to receive leaderboard deltas
+LEADERBOARD_ROOM = 'leaderboard'
+
+
+class LeaderboardBroadcaster:
+    """Collects score changes and emits one 'leaderboard_delta' per window"""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.seq = 0
+        self.socketio = None
+        self._app = None
+        self._pending = {}  # user_id -> {category: delta}
+        self._scheduled = False
+
+    def init_socketio(self, socketio):
+        self.socketio = socketio
+
+    def push(self, changes):
+        """Queue committed ``{user_id: {category: delta}}`` changes"""
+        if self.socketio is None:
+            return
+        if self._app is None:
+            self._app = current_app._get_current_object()
+            self.interval = self._app.config.get('LEADERBOARD_PUSH_INTERVAL', self.interval)
+        for user_id, deltas in changes.items():
+            pending = self._pending.setdefault(user_id, {})
+            for category, delta in deltas.items():
+                pending[category] = pending.get(category, 0) + delta
+        if not self._scheduled:
+            self._scheduled = True
+            self.socketio.start_background_task(self._flush_later)
+
+    def _flush_later(self):
+        self.socketio.sleep(self.interval)
+        pending, self._pending = self._pending, {}
+        self._scheduled = False
+        if not pending:
+            return
+        try:
+            with self._app.app_context():
+                message = self._build_delta(pending)
+        except Exception as e:
+            print(f"Leaderboard delta failed: {e}")
+            return
+        self.socketio.emit('leaderboard_delta', message, to=LEADERBOARD_ROOM)
+
+    def _build_delta(self, pending):
+        user_ids = list(pending)
+        users = self._load_users(user_ids)
+        self.seq = self._next_seq()
+        return {
+            'seq': self.seq,
+            'changes': [{
+                'user_id': user_id,
+                'username': users[user_id].username,
+                'is_admin': bool(users[user_id].is_admin),
+                'score': rank_index.get_score(user_id),
+                'rank': rank_index.get_rank(user_id),
+                'delta': deltas.get(ALL_CATEGORIES, 0),
+                'categories': {cat: d for cat, d in deltas.items() if cat != ALL_CATEGORIES}
+            } for user_id, deltas in pending.items() if user_id in users]
+        }
+
+    def _next_seq(self):
+        try:
+            seq = leaderboard_cache.next_shared_seq('delta_seq')
+        except Exception as e:
+            print(f"Shared leaderboard seq unavailable: {e}")
+            seq = None
+        return self.seq + 1 if seq is None else seq
+
+    def _current_seq(self):
+        try:
+            return leaderboard_cache.shared_value('delta_seq', self.seq)
+        except Exception as e:
+            print(f"Shared leaderboard seq unavailable: {e}")
+            return self.seq
+
+    @staticmethod
+    def _load_users(user_ids):
+        """Resolve display fields for ``user_ids`` in one query"""
+        rows = db.session.query(User.id, User.username, User.is_admin).filter(User.id.in_(user_ids)).all()
+        return {row.id: row for row in rows}
+
+    def snapshot(self, limit=50):
+        """Current top ``limit`` overall, tagged with the latest sequence number"""
+        top = rank_index.get_top(limit)
+        user_ids = [user_id for _, user_id, score in top if score > 0]
+        users = self._load_users(user_ids)
+        return {
+            'seq': self._current_seq(),
+            'entries': [{
+                'user_id': user_id,
+                'username': users[user_id].username,
+                'is_admin': bool(users[user_id].is_admin),
+                'score': score,
+                'rank': rank
+            } for rank, user_id, score in top if user_id in users]
+        }
+
+
+# Global instance
+leaderboard_broadcaster = LeaderboardBroadcaster()
+
+
+@on_scores_changed
+def _queue_leaderboard_delta(changes):
+    leaderboard_broadcaster.push(changes)
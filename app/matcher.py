@@ -0,0 +1,110 @@
+"""
+Keyword Matcher
+Compiles an evaluator's keyword tables once into a single lookup structure
+so that one call reports every technique group present in a payload.
+Payload carries the normalized views of one submission so every matcher
+that grades it shares them.
+"""
+import re
+
+# Normalized views of the input a group can be matched against
+VIEWS = {
+    'raw': lambda text: text,
+    'lower': str.lower,
+    'upper': str.upper,
+}
+
+
+class Payload:
+    """A submitted payload whose views are computed at most once each"""
+
+    __slots__ = ('text', '_views')
+
+    def __init__(self, text):
+        self.text = text
+        self._views = {'raw': text}
+
+    def view(self, name):
+        try:
+            return self._views[name]
+        except KeyError:
+            value = self._views[name] = VIEWS[name](self.text)
+            return value
+
+    def __len__(self):
+        return len(self.text)
+
+
+def as_payload(value):
+    """``value`` as a Payload (strings are wrapped)"""
+    return value if isinstance(value, Payload) else Payload(value)
+
+
+class KeywordMatcher:
+    """
+    Named keyword groups compiled into one deduplicated literal table.
+
+    ``groups`` maps a group name to a list of keywords, or to a
+    ``(view, keywords)`` tuple to match that group against another view of
+    the input (``raw``, ``lower`` or ``upper``) than the matcher default.
+    Each view is computed once per call, each distinct keyword is searched
+    for once, and keywords whose groups have all matched already are
+    skipped. Substring semantics are identical to ``keyword in text``.
+
+    Groups listed in ``counted`` report the total number of occurrences of
+    their keywords (``str.count``) instead of 1.
+    """
+
+    def __init__(self, groups, view='lower', counted=()):
+        self.groups = tuple(groups)
+        self.counted = frozenset(counted)
+
+        table = {}
+        for name, spec in groups.items():
+            group_view, keywords = spec if isinstance(spec, tuple) else (view, spec)
+            if group_view not in VIEWS:
+                raise ValueError(f'Unknown matcher view: {group_view}')
+            for keyword in keywords:
+                table.setdefault((group_view, keyword), set()).add(name)
+
+        # Counted groups need every keyword; presence groups can stop early
+        self._presence = []
+        self._counted = []
+        for (group_view, keyword), names in table.items():
+            present = frozenset(names - self.counted)
+            if present:
+                self._presence.append((group_view, keyword, present))
+            for name in names & self.counted:
+                self._counted.append((group_view, keyword, name))
+        self._views = sorted({v for v, _, _ in self._presence + self._counted})
+
+    def match(self, text):
+        """Return ``{group: count}`` for every group found in ``text`` (a str or Payload)"""
+        payload = as_payload(text)
+        views = {name: payload.view(name) for name in self._views}
+        found = set()
+        for view, keyword, names in self._presence:
+            if names <= found:
+                continue
+            if keyword in views[view]:
+                found |= names
+        hits = dict.fromkeys(found, 1)
+        for view, keyword, name in self._counted:
+            count = views[view].count(keyword)
+            if count:
+                hits[name] = hits.get(name, 0) + count
+        return hits
+
+
+class RuleTable:
+    """Named regular expressions compiled once; ``match`` mirrors KeywordMatcher"""
+
+    def __init__(self, patterns):
+        # patterns: name -> (pattern, flags)
+        self.groups = tuple(patterns)
+        self.patterns = [(name, re.compile(pattern, flags)) for name, (pattern, flags) in patterns.items()]
+
+    def match(self, text):
+        """Return ``{name: 1}`` for every pattern found in ``text`` (a str or Payload)"""
+        text = as_payload(text).text
+        return {name: 1 for name, pattern in self.patterns if pattern.search(text)}
@@ -1,11 +1,41 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from app.executor import evaluation_executor
+from sqlalchemy import inspect, text
 from datetime import datetime
 import uuid
 
 db = SQLAlchemy()
 
+# Nullable columns added to existing tables after their first release.
+# create_all() never alters a table that exists, so add_missing_columns()
+# adds these at startup on databases created before them
+ADDED_COLUMNS = [
+    ('challenge_attempt', 'rule_pack_version'),
+]
+
+
+def add_missing_columns():
+    """
+    Add any ADDED_COLUMNS an existing database lacks, on any dialect.
+    Idempotent; returns the "table.column" names added.
+    """
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    added = []
+    for table, name in ADDED_COLUMNS:
+        if table not in tables:
+            continue
+        if name in {column['name'] for column in inspector.get_columns(table)}:
+            continue
+        column = db.metadata.tables[table].c[name]
+        column_type = column.type.compile(dialect=db.engine.dialect)
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}'))
+        added.append(f'{table}.{name}')
+    return added
+
 class User(UserMixin, db.Model):
     """User model for authentication and profile management"""
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -24,25 +54,21 @@ class User(UserMixin, db.Model):
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = evaluation_executor.call(generate_password_hash, password)
     
     def check_password(self, password):
         """Check if provided password matches hash"""
-        return check_password_hash(self.password_hash, password)
+        return evaluation_executor.call(check_password_hash, self.password_hash, password)
     
     def get_total_score(self):
-        """Calculate total score from all attempts"""
-        attempts = ChallengeAttempt.query.filter_by(user_id=self.id, is_completed=True).all()
-        return sum(attempt.score for attempt in attempts)
+        """Total score, read from the maintained UserScore aggregate"""
+        entry = UserScore.query.filter_by(user_id=self.id, category='all').first()
+        return entry.score if entry else 0
     
     def get_rank(self):
-        """Get user rank in leaderboard"""
-        users = db.session.query(User).all()
-        sorted_users = sorted(users, key=lambda u: u.get_total_score(), reverse=True)
-        for rank, user in enumerate(sorted_users, 1):
-            if user.id == self.id:
-                return rank
-        return len(sorted_users)
+        """Get user rank in leaderboard (O(log n) via the rank service)"""
+        from app.ranking import rank_index
+        return rank_index.get_rank(self.id)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -99,6 +125,7 @@ class ChallengeAttempt(db.Model):
     mistakes = db.Column(db.JSON)  # JSON array of mistakes
     corrections = db.Column(db.JSON)  # JSON object with corrections
     bot_actions = db.Column(db.JSON)  # JSON array of bot actions
+    rule_pack_version = db.Column(db.String(16))  # Rule packs that graded this attempt
     is_completed = db.Column(db.Boolean, default=False)
     
     # Timestamps
@@ -108,6 +135,57 @@ class ChallengeAttempt(db.Model):
     def __repr__(self):
         return f'<ChallengeAttempt {self.user_id} - {self.challenge_id}>'
 
+class UserScore(db.Model):
+    """Per-user score aggregate, one row per (user, category).
+
+    The ``all`` category holds the overall total; the other rows mirror
+    ``Challenge.category`` (blue, red, coop). Rows are updated in the same
+    transaction as the completed ChallengeAttempt (see app/leaderboard.py).
+    """
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'category', name='uq_user_score_user_category'),
+        db.Index('ix_user_score_category_score', 'category', 'score', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
+    category = db.Column(db.String(50), nullable=False)  # all, blue, red, coop
+    score = db.Column(db.Integer, nullable=False, default=0)
+    attempts_completed = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationship
+    user = db.relationship('User', backref=db.backref('score_entries', lazy=True, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<UserScore {self.user_id} {self.category}={self.score}>'
+
+class ScoreBucket(db.Model):
+    """Time-bucketed score rollup: one row per (period, bucket, category, user).
+
+    ``period`` is day, week (buckets start on Monday) or month, and
+    ``bucket_start`` is the first day of the bucket that
+    ``ChallengeAttempt.completed_at`` falls in. A windowed leaderboard is a
+    sorted read of a single bucket. Rows are never pruned, so past windows
+    stay available.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('period', 'bucket_start', 'category', 'user_id', name='uq_score_bucket'),
+        db.Index('ix_score_bucket_board', 'period', 'bucket_start', 'category', 'score', 'user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
+    category = db.Column(db.String(50), nullable=False)  # all, blue, red, coop
+    period = db.Column(db.String(10), nullable=False)  # day, week, month
+    bucket_start = db.Column(db.Date, nullable=False)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    attempts_completed = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ScoreBucket {self.period}:{self.bucket_start} {self.user_id} {self.category}={self.score}>'
+
 class CoopSession(db.Model):
     """Model for cooperative play sessions"""
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -0,0 +1,142 @@
+"""
+Password Blocklist
+Breached/common password membership checks backed by a Bloom filter file
+that is memory-mapped read-only, so a wordlist of millions of entries costs
+no Python heap and its pages are shared by every process that maps it.
+Build the file with tools/build_password_blocklist.py.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+DEFAULT_PATH = os.environ.get('PASSWORD_BLOCKLIST_PATH') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'password_blocklist.bloom')
+
+# File layout: header (magic, bit count, hash count, entry count), then the bit array
+MAGIC = b'SSBLOOM1'
+HEADER = struct.Struct('<8sQII')
+
+# Always blocked, with or without a filter file
+BUILTIN_PASSWORDS = frozenset((
+    'password', '123456', 'qwerty', 'admin', 'letmein', '12345678',
+))
+
+
+def normalize(password):
+    """Blocklist entries and lookups are compared case-insensitively"""
+    return password.lower()
+
+
+def _hash_pair(word):
+    digest = hashlib.blake2b(word.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+def _positions(word, bits, hashes):
+    """Bit positions for ``word`` (Kirsch-Mitzenmacher double hashing)"""
+    h1, h2 = _hash_pair(word)
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+def filter_size(entries, false_positive_rate):
+    """Bits and hash count for ``entries`` at ``false_positive_rate``"""
+    entries = max(entries, 1)
+    bits = math.ceil(-entries * math.log(false_positive_rate) / (math.log(2) ** 2))
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, round(bits / entries * math.log(2)))
+    return bits, hashes
+
+
+def build_filter(words, entries, false_positive_rate=0.001):
+    """Return the filter file bytes for ``words`` (an iterable of ``entries`` items)"""
+    bits, hashes = filter_size(entries, false_positive_rate)
+    array = bytearray(bits // 8)
+    added = 0
+    for word in words:
+        for bit in _positions(normalize(word), bits, hashes):
+            array[bit >> 3] |= 1 << (bit & 7)
+        added += 1
+    return HEADER.pack(MAGIC, bits, hashes, added) + bytes(array)
+
+
+class PasswordBlocklist:
+    """
+    Case-insensitive membership test against the built-in list plus the
+    memory-mapped Bloom filter at ``path``. A Bloom filter may report a
+    password that is not in the list (at the false-positive rate it was
+    built for) but never misses one that is.
+
+    The file is mapped on first use, once per process; a missing or
+    invalid file leaves only the built-in list active.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._map = None
+        self._bits = 0
+        self._hashes = 0
+        self.entries = 0
+        self._opened = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('PASSWORD_BLOCKLIST_PATH', self.path)
+        # Map before any worker is forked so the pages are shared
+        self.open()
+
+    def open(self):
+        """Map the filter file if it exists; returns True when a filter is active"""
+        with self._lock:
+            if self._opened:
+                return self._map is not None
+            self._opened = True
+            if not self.path or not os.path.exists(self.path):
+                return False
+            try:
+                with open(self.path, 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, bits, hashes, entries = HEADER.unpack_from(mapped)
+                if magic != MAGIC or len(mapped) < HEADER.size + bits // 8:
+                    raise ValueError('not a password blocklist filter')
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Password blocklist unavailable ({self.path}): {e}")
+                return False
+            self._map, self._bits, self._hashes, self.entries = mapped, bits, hashes, entries
+            return True
+
+    def __contains__(self, password):
+        word = normalize(password)
+        if word in BUILTIN_PASSWORDS:
+            return True
+        if not self._opened:
+            self.open()
+        mapped = self._map
+        if mapped is None:
+            return False
+        # Same positions as _positions, probed lazily so most misses stop early
+        h1, h2 = _hash_pair(word)
+        bits = self._bits
+        for i in range(self._hashes):
+            bit = (h1 + i * h2) % bits
+            if not mapped[HEADER.size + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def contains(self, password):
+        return password in self
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'loaded': self._map is not None,
+            'entries': self.entries,
+            'bits': self._bits,
+            'hashes': self._hashes
+        }
+
+
+# Global instance
+password_blocklist = PasswordBlocklist()
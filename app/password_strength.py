@@ -0,0 +1,724 @@
+"""
+Password Strength Estimator
+zxcvbn-style guess-count estimate. The password is matched against
+frequency-ranked dictionaries (with case, reversal and l33t variants),
+keyboard walks, sequences, repeats, dates and breached passwords, and the
+cheapest sequence of matches that covers it gives the number of guesses an
+attacker needs. The dictionaries are compiled into a single lookup table by
+tools/build_password_dictionaries.py; estimates are memoized per password.
+"""
+import math
+import os
+import pickle
+import re
+import threading
+from datetime import datetime
+from app.cache import LRUCache
+from app.password_blocklist import password_blocklist
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'password_data')
+DEFAULT_TABLE_PATH = os.environ.get('PASSWORD_DICTIONARIES_PATH') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'password_dictionaries.pickle')
+
+# Bundled ranked wordlists (most common first), used when no table is built
+DICTIONARY_SOURCES = ('passwords', 'english', 'names')
+TABLE_FORMAT = 1
+
+# Only this many characters are pattern-matched at a time, which keeps very
+# long inputs cheap to estimate; longer passwords are estimated in windows
+MAX_MATCH_LENGTH = 64
+# Characters past this are not looked at; estimates of longer inputs can
+# only err low
+MAX_ESTIMATE_LENGTH = 1024
+# Estimates stop growing here, far beyond any feasible attack
+MAX_GUESSES = 10 ** 100
+
+BRUTEFORCE_CARDINALITY = 10
+MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10000
+MIN_SUBMATCH_GUESSES_SINGLE_CHAR = 10
+MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
+# A breached password is assumed to sit mid-way down a list of millions
+BREACHED_GUESSES = 10 ** 6
+
+REFERENCE_YEAR = datetime.now().year
+MIN_YEAR_SPACE = 20
+DATE_MIN_YEAR = 1000
+DATE_MAX_YEAR = 2050
+# Where a separator-less run of digits may split into day/month/year
+DATE_SPLITS = {
+    4: ((1, 2), (2, 3)),
+    5: ((1, 3), (2, 3)),
+    6: ((1, 2), (2, 4), (4, 5)),
+    7: ((1, 3), (2, 3), (4, 5), (4, 6)),
+    8: ((2, 4), (4, 6)),
+}
+DATE_WITH_SEPARATOR = re.compile(r'^(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})$')
+RECENT_YEAR = re.compile(r'19\d\d|20\d\d')
+
+# Letters and the characters commonly substituted for them
+L33T_TABLE = {
+    'a': '4@', 'b': '8', 'c': '({[<', 'e': '3', 'g': '69', 'i': '1!|',
+    'l': '1|7', 'o': '0', 's': '$5', 't': '+7', 'x': '%', 'z': '2',
+}
+MAX_L33T_SUBSTITUTIONS = 32
+
+# Guesses needed for a password of each score (0-4) or stronger
+SCORE_THRESHOLDS = (10 ** 3, 10 ** 6, 10 ** 8, 10 ** 10)
+
+# Offline attack against a slow hash (bcrypt, PBKDF2), guesses per second
+OFFLINE_SLOW_HASH_RATE = 10 ** 4
+
+
+def _keyboard_graph(rows, slanted):
+    """Adjacency of every key in ``rows`` (lists of 'unshifted+shifted' tokens)"""
+    positions = {}
+    for y, row in enumerate(rows):
+        for x, token in enumerate(row):
+            if token:
+                # Keyboard rows below the first are offset half a key to the right
+                positions[(x + (1 if slanted and y else 0), y)] = token
+    if slanted:
+        directions = ((-1, 0), (0, -1), (1, -1), (1, 0), (0, 1), (-1, 1))
+    else:
+        directions = ((-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1))
+    graph = {}
+    for (x, y), token in positions.items():
+        adjacent = tuple(positions.get((x + dx, y + dy)) for dx, dy in directions)
+        for char in token:
+            graph[char] = adjacent
+    return graph
+
+
+KEYBOARDS = {
+    'qwerty': _keyboard_graph([
+        '`~ 1! 2@ 3# 4$ 5% 6^ 7& 8* 9( 0) -_ =+'.split(),
+        'qQ wW eE rR tT yY uU iI oO pP [{ ]} \\|'.split(),
+        'aA sS dD fF gG hH jJ kK lL ;: \'"'.split(),
+        'zZ xX cC vV bB nN mM ,< .> /?'.split(),
+    ], slanted=True),
+    'keypad': _keyboard_graph([
+        [None, '/', '*', '-'],
+        ['7', '8', '9', '+'],
+        ['4', '5', '6', None],
+        ['1', '2', '3', None],
+        [None, '0', '.', None],
+    ], slanted=False),
+}
+
+
+def _graph_stats(graph):
+    degrees = [sum(1 for token in adjacent if token) for adjacent in graph.values()]
+    return len(graph), sum(degrees) / len(degrees)
+
+
+# (starting positions, average degree) per keyboard, for spatial guesses
+KEYBOARD_STATS = {name: _graph_stats(graph) for name, graph in KEYBOARDS.items()}
+
+
+def read_wordlist(path):
+    """Words of a ranked wordlist, most common first"""
+    with open(path, encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            word = line.strip().lower()
+            if word:
+                yield word
+
+
+def compile_table(dictionaries, limit=None):
+    """
+    Compile ``{name: ranked words}`` into the lookup table: one dict of
+    ``word -> (rank, dictionary name)`` keeping each word's best rank,
+    plus the longest word length so matching can stop early.
+    """
+    words = {}
+    for name, ranked in dictionaries.items():
+        rank = 0
+        for word in ranked:
+            if word in words and words[word][1] == name:
+                continue
+            rank += 1
+            if limit and rank > limit:
+                break
+            if word not in words or rank < words[word][0]:
+                words[word] = (rank, name)
+    return {
+        'format': TABLE_FORMAT,
+        'max_length': max(map(len, words), default=0),
+        'words': words,
+    }
+
+
+def bundled_dictionaries():
+    return {name: read_wordlist(os.path.join(DATA_DIR, f'{name}.txt')) for name in DICTIONARY_SOURCES}
+
+
+def _ncr(n, k):
+    return math.comb(n, k) if 0 <= k <= n else 0
+
+
+def _variations(special, plain):
+    """Ways to choose which characters took a variant (case, l33t or shift)"""
+    if special == 0 or plain == 0:
+        return 2 if special else 1
+    return sum(_ncr(special + plain, i) for i in range(1, min(special, plain) + 1))
+
+
+def _uppercase_variations(token):
+    if token.islower() or token.lower() == token:
+        return 1
+    # Capitalized, all caps and trailing caps are what people usually do
+    if token[0].isupper() and token[1:].lower() == token[1:] or token.isupper() \
+            or token[-1].isupper() and token[:-1].lower() == token[:-1]:
+        return 2
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    return _variations(upper, lower)
+
+
+def _lower(text):
+    """Lowercase ``text`` keeping its length, so match positions stay valid"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # Some characters lowercase to two ('İ' -> 'i̇'); leave those as they are
+    return ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+def _period(text):
+    """Length of the shortest unit ``text`` repeats (``len(text)`` if it does not)"""
+    # Knuth-Morris-Pratt failure function: the longest border of text[:k + 1]
+    border = [0] * len(text)
+    for k in range(1, len(text)):
+        length = border[k - 1]
+        while length and text[k] != text[length]:
+            length = border[length - 1]
+        border[k] = length + (text[k] == text[length])
+    return len(text) - border[-1] if text else 0
+
+
+def _match(pattern, i, j, password, **fields):
+    return dict(fields, pattern=pattern, i=i, j=j, token=password[i:j + 1])
+
+
+class PasswordStrengthEstimator:
+    """
+    Estimates how many guesses a password takes to crack and scores it 0-4
+    (too guessable .. very unguessable), as zxcvbn does.
+
+    The lookup table is loaded on first use, from the built file at
+    ``path`` when it exists and otherwise compiled from the bundled
+    wordlists. Estimates are cached per password; treat them as read-only.
+    """
+
+    def __init__(self, path=DEFAULT_TABLE_PATH, cache_size=4096):
+        self.path = path
+        self._words = None
+        self._max_length = 0
+        self._ranked = None
+        self.cache = LRUCache(max_size=cache_size)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.path = app.config.get('PASSWORD_DICTIONARIES_PATH', self.path)
+        # Load before any worker is forked so every process inherits it
+        self.load()
+
+    def load(self):
+        """Load the lookup table; returns the number of words in it"""
+        with self._lock:
+            if self._words is not None:
+                return len(self._words)
+            table = None
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'rb') as f:
+                        table = pickle.load(f)
+                    if table.get('format') != TABLE_FORMAT:
+                        raise ValueError('unsupported table format')
+                except (OSError, ValueError, pickle.UnpicklingError, AttributeError) as e:
+                    print(f"Password dictionaries unavailable ({self.path}): {e}")
+                    table = None
+            if table is None:
+                table = compile_table(bundled_dictionaries())
+            self._max_length = table['max_length']
+            self._words = table['words']
+            return len(self._words)
+
+    # ==================== Matching ====================
+
+    def _dictionary_matches(self, password, lowered=None, covering=None):
+        """Dictionary words in ``lowered`` (and, with ``covering``, only those spanning one of those positions)"""
+        words = self._words
+        lowered = lowered or _lower(password)
+        n = len(lowered)
+        matches = []
+        for i in range(n):
+            start = i + 1
+            if covering is not None:
+                following = [p for p in covering if p >= i]
+                if not following:
+                    break
+                start = following[0] + 1
+            for j in range(start, min(n, i + self._max_length) + 1):
+                entry = words.get(lowered[i:j])
+                if entry:
+                    matches.append(_match('dictionary', i, j - 1, password, matched_word=lowered[i:j],
+                                          rank=entry[0], dictionary_name=entry[1]))
+        return matches
+
+    def _reversed_matches(self, password):
+        n = len(password)
+        matches = []
+        for match in self._dictionary_matches(password[::-1]):
+            i, j = n - 1 - match['j'], n - 1 - match['i']
+            token = password[i:j + 1]
+            if _lower(token) == match['matched_word']:
+                continue  # a palindrome, already matched forwards
+            match.update(i=i, j=j, token=token, reversed=True)
+            matches.append(match)
+        return matches
+
+    def _l33t_matches(self, password):
+        present = {}
+        for letter, subs in L33T_TABLE.items():
+            for char in subs:
+                if char in password:
+                    present.setdefault(char, []).append(letter)
+        if not present:
+            return []
+
+        substitutions = [{}]
+        for char, letters in present.items():
+            substitutions = [dict(sub, **{char: letter}) for sub in substitutions for letter in letters]
+            if len(substitutions) > MAX_L33T_SUBSTITUTIONS:
+                substitutions = substitutions[:MAX_L33T_SUBSTITUTIONS]
+                break
+
+        # Only words that contain a substituted character are new
+        covering = [i for i, c in enumerate(password) if c in present]
+        matches = []
+        seen = set()
+        for sub in substitutions:
+            translated = _lower(''.join(sub.get(c, c) for c in password))
+            for match in self._dictionary_matches(password, translated, covering):
+                token = match['token']
+                used = {char: letter for char, letter in sub.items() if char in token}
+                key = (match['i'], match['j'], match['matched_word'])
+                # A lone substituted character is a character, not a word
+                if not used or len(token) == 1 or key in seen:
+                    continue
+                seen.add(key)
+                match.update(l33t=True, sub=used)
+                matches.append(match)
+        return matches
+
+    @staticmethod
+    def _spatial_matches(password):
+        matches = []
+        n = len(password)
+        for name, graph in KEYBOARDS.items():
+            i = 0
+            while i < n - 1:
+                j = i + 1
+                last_direction = None
+                turns = 0
+                shifted = 1 if name == 'qwerty' and password[i] in '~!@#$%^&*()_+QWERTYUIOP{}|ASDFGHJKL:"ZXCVBNM<>?' else 0
+                while True:
+                    found = False
+                    if j < n:
+                        char = password[j]
+                        for direction, token in enumerate(graph.get(password[j - 1], ())):
+                            if token and char in token:
+                                found = True
+                                if token.index(char) == 1:
+                                    shifted += 1
+                                if direction != last_direction:
+                                    turns += 1
+                                    last_direction = direction
+                                break
+                    if found:
+                        j += 1
+                        continue
+                    # Walks of three or more keys count as a pattern
+                    if j - i > 2:
+                        matches.append(_match('spatial', i, j - 1, password,
+                                              graph=name, turns=turns, shifted_count=shifted))
+                    i = j
+                    break
+        return matches
+
+    @staticmethod
+    def _sequence_matches(password):
+        matches = []
+
+        def add(i, j, delta):
+            if (j - i > 1 or abs(delta) == 1) and 0 < abs(delta) <= 5:
+                matches.append(_match('sequence', i, j, password, ascending=delta > 0))
+
+        if len(password) < 2:
+            return matches
+        i = 0
+        last_delta = None
+        for k in range(1, len(password)):
+            delta = ord(password[k]) - ord(password[k - 1])
+            if last_delta is None:
+                last_delta = delta
+            if delta == last_delta:
+                continue
+            add(i, k - 1, last_delta)
+            i = k - 1
+            last_delta = delta
+        add(i, len(password) - 1, last_delta)
+        return matches
+
+    def _repeat_matches(self, password):
+        matches = []
+        greedy = re.compile(r'(.+)\1+')
+        lazy = re.compile(r'(.+?)\1+')
+        lazy_anchored = re.compile(r'^(.+?)\1+$')
+        position = 0
+        while position < len(password):
+            greedy_match = greedy.search(password, position)
+            if not greedy_match:
+                break
+            lazy_match = lazy.search(password, position)
+            if len(greedy_match.group(0)) > len(lazy_match.group(0)):
+                # 'aabaab' is 'aab' twice, not 'a' twice then 'baab'
+                found = greedy_match
+                base = lazy_anchored.match(found.group(0)).group(1)
+            else:
+                found = lazy_match
+                base = found.group(1)
+            i, j = found.start(), found.end() - 1
+            matches.append(_match('repeat', i, j, password, base_token=base,
+                                  base_guesses=self._estimate(base)['guesses'],
+                                  repeat_count=len(found.group(0)) // len(base)))
+            position = j + 1
+        return matches
+
+    @staticmethod
+    def _date_matches(password):
+        matches = []
+        n = len(password)
+        for i in range(n - 3):
+            for j in range(i + 3, min(n, i + 8)):
+                token = password[i:j + 1]
+                if not token.isdigit():
+                    break
+                candidates = []
+                for k, l in DATE_SPLITS.get(len(token), ()):
+                    dmy = _date_from_ints((int(token[:k]), int(token[k:l]), int(token[l:])))
+                    if dmy:
+                        candidates.append(dmy)
+                if candidates:
+                    # Assume the year nearest today, the cheapest for an attacker
+                    best = min(candidates, key=lambda dmy: abs(dmy[2] - REFERENCE_YEAR))
+                    matches.append(_match('date', i, j, password, separator='',
+                                          day=best[0], month=best[1], year=best[2]))
+
+        for i in range(n - 5):
+            for j in range(i + 5, min(n, i + 10)):
+                found = DATE_WITH_SEPARATOR.match(password[i:j + 1])
+                if found:
+                    dmy = _date_from_ints((int(found.group(1)), int(found.group(3)), int(found.group(4))))
+                    if dmy:
+                        matches.append(_match('date', i, j, password, separator=found.group(2),
+                                              day=dmy[0], month=dmy[1], year=dmy[2]))
+
+        # Drop dates inside longer dates ('1991' within '1/1/1991'); dates
+        # are at most 10 characters, so only nearby spans can contain one
+        spans = {(m['i'], m['j']) for m in matches}
+        return [m for m in matches if not any(
+            (i, j) in spans and (i, j) != (m['i'], m['j'])
+            for i in range(max(0, m['i'] - 6), m['i'] + 1) for j in range(m['j'], m['j'] + 7))]
+
+    @staticmethod
+    def _year_matches(password):
+        return [_match('regex', found.start(), found.end() - 1, password, regex_name='recent_year')
+                for found in RECENT_YEAR.finditer(password)]
+
+    def _matches(self, password):
+        matches = []
+        matches += self._dictionary_matches(password)
+        matches += self._reversed_matches(password)
+        matches += self._l33t_matches(password)
+        matches += self._spatial_matches(password)
+        matches += self._repeat_matches(password)
+        matches += self._sequence_matches(password)
+        matches += self._year_matches(password)
+        matches += self._date_matches(password)
+        return matches
+
+    # ==================== Guess estimation ====================
+
+    @staticmethod
+    def _pattern_guesses(match):
+        pattern = match['pattern']
+        token = match['token']
+        if pattern == 'bruteforce':
+            guesses = BRUTEFORCE_CARDINALITY ** len(token)
+            minimum = MIN_SUBMATCH_GUESSES_SINGLE_CHAR if len(token) == 1 else MIN_SUBMATCH_GUESSES_MULTI_CHAR
+            return max(guesses, minimum + 1)
+        if pattern == 'dictionary':
+            guesses = match['rank'] * _uppercase_variations(token)
+            if match.get('l33t'):
+                for char, letter in match['sub'].items():
+                    lowered = _lower(token)
+                    guesses *= _variations(lowered.count(char), lowered.count(letter))
+            return guesses * (2 if match.get('reversed') else 1)
+        if pattern == 'spatial':
+            starts, degree = KEYBOARD_STATS[match['graph']]
+            length = len(token)
+            guesses = 0
+            for i in range(2, length + 1):
+                for j in range(1, min(match['turns'], i - 1) + 1):
+                    guesses += _ncr(i - 1, j - 1) * starts * degree ** j
+            shifted = match['shifted_count']
+            if shifted:
+                guesses *= _variations(shifted, length - shifted)
+            return guesses
+        if pattern == 'repeat':
+            return match['base_guesses'] * match['repeat_count']
+        if pattern == 'sequence':
+            if token[0] in 'aAzZ019':
+                base = 4
+            elif token[0].isdigit():
+                base = 10
+            else:
+                base = 26
+            return base * len(token) * (1 if match['ascending'] else 2)
+        if pattern == 'regex':
+            return max(abs(int(token) - REFERENCE_YEAR), MIN_YEAR_SPACE)
+        if pattern == 'date':
+            guesses = max(abs(match['year'] - REFERENCE_YEAR), MIN_YEAR_SPACE) * 365
+            return guesses * (4 if match['separator'] else 1)
+        return BREACHED_GUESSES  # breached
+
+    def _guesses(self, match, password_length):
+        if 'guesses' not in match:
+            minimum = 1
+            if len(match['token']) < password_length:
+                minimum = MIN_SUBMATCH_GUESSES_SINGLE_CHAR if len(match['token']) == 1 \
+                    else MIN_SUBMATCH_GUESSES_MULTI_CHAR
+            match['guesses'] = max(self._pattern_guesses(match), minimum)
+        return match['guesses']
+
+    def _most_guessable_sequence(self, password, matches):
+        """
+        The sequence of non-overlapping matches covering ``password`` with
+        the fewest guesses, where gaps are brute-forced. A sequence of l
+        matches costs l! * (product of their guesses) plus a penalty that
+        grows with l, since the attacker also has to guess how many
+        patterns there are and in which order.
+        """
+        n = len(password)
+        by_end = [[] for _ in range(n)]
+        for match in matches:
+            by_end[match['j']].append(match)
+        # Per end position: sequence length -> (guesses, product, last match)
+        optimal = [{} for _ in range(n)]
+
+        def update(match, length):
+            k = match['j']
+            product = self._guesses(match, n)
+            if length > 1:
+                product *= optimal[match['i'] - 1][length - 1][1]
+            guesses = math.factorial(length) * product + MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (length - 1)
+            for other_length, (other_guesses, _, _) in optimal[k].items():
+                if other_length <= length and other_guesses <= guesses:
+                    return
+            optimal[k][length] = (guesses, product, match)
+
+        def bruteforce(i, k):
+            return _match('bruteforce', i, k, password)
+
+        for k in range(n):
+            for match in by_end[k]:
+                if match['i'] > 0:
+                    for length in list(optimal[match['i'] - 1]):
+                        update(match, length + 1)
+                else:
+                    update(match, 1)
+            update(bruteforce(0, k), 1)
+            for i in range(1, k + 1):
+                # Two adjacent brute-force runs are one longer run
+                lengths = [length for length, (_, _, last) in optimal[i - 1].items()
+                           if last['pattern'] != 'bruteforce']
+                if lengths:
+                    match = bruteforce(i, k)
+                    for length in lengths:
+                        update(match, length + 1)
+
+        if n == 0:
+            return 1, []
+        length, (guesses, _, _) = min(optimal[n - 1].items(), key=lambda item: item[1][0])
+        sequence = []
+        k = n - 1
+        while k >= 0:
+            match = optimal[k][length][2]
+            sequence.insert(0, match)
+            k = match['i'] - 1
+            length -= 1
+        return guesses, sequence
+
+    def _estimate(self, password):
+        """Guesses and the match sequence behind them, without feedback"""
+        if self._words is None:
+            self.load()
+        matched = password[:MAX_MATCH_LENGTH]
+        matches = self._matches(matched)
+        if matched and password in password_blocklist:
+            matches.append(_match('breached', 0, len(matched) - 1, matched))
+        guesses, sequence = self._most_guessable_sequence(matched, matches)
+        if len(password) > MAX_MATCH_LENGTH:
+            guesses *= self._tail_guesses(password, sequence[-1]['i'] if sequence else 0)
+        return {'guesses': guesses, 'sequence': sequence}
+
+    def _tail_guesses(self, password, anchor):
+        """
+        Guesses for what follows the first window, where ``anchor`` is the
+        start of the first window's last match. If the rest keeps repeating
+        a unit from there on, or a unit longer than a window, it is more
+        repeats (guesses grow linearly, as for repeat matches); otherwise
+        each further window is estimated on its own.
+        """
+        password = password[:MAX_ESTIMATE_LENGTH]
+        guesses = 1
+        start = MAX_MATCH_LENGTH
+        while start < len(password) and guesses < MAX_GUESSES:
+            period = _period(password[anchor:])
+            if period <= MAX_MATCH_LENGTH:
+                # The repetition may have begun before the last match
+                while anchor > 0 and password[anchor - 1] == password[anchor - 1 + period]:
+                    anchor -= 1
+                return guesses * math.ceil((len(password) - anchor) / (start - anchor))
+            window_start = start - MAX_MATCH_LENGTH
+            counted = password[window_start:]
+            period = _period(counted)
+            if period * 2 <= len(counted):
+                # The unit's first window is already counted
+                unit_guesses = self._tail_guesses(counted[:period], anchor - window_start)
+                return guesses * unit_guesses * math.ceil(len(counted) / period)
+            window = password[start:start + MAX_MATCH_LENGTH]
+            estimate = self._estimate(window)
+            guesses *= max(min(estimate['guesses'], BRUTEFORCE_CARDINALITY ** len(window)),
+                           MIN_SUBMATCH_GUESSES_MULTI_CHAR)
+            anchor = start + estimate['sequence'][-1]['i']
+            start += MAX_MATCH_LENGTH
+        return guesses
+
+    def estimate(self, password):
+        """
+        Estimate ``password``; returns a dict with ``guesses``,
+        ``guesses_log10``, ``score`` (0-4), ``crack_time_seconds`` (offline,
+        slow hash), ``warning`` (a code naming the weakest pattern, or None
+        for strong passwords), ``breached`` and ``patterns`` (the matches
+        the estimate is built from).
+        """
+        result = self.cache.get(password)
+        if result is not None:
+            return result
+
+        estimate = self._estimate(password)
+        guesses = min(estimate['guesses'], MAX_GUESSES)
+        score = sum(1 for threshold in SCORE_THRESHOLDS if guesses >= threshold)
+        sequence = estimate['sequence']
+        result = {
+            'guesses': int(guesses),
+            'guesses_log10': round(math.log10(guesses), 2) if guesses > 0 else 0.0,
+            'score': score,
+            'crack_time_seconds': guesses / OFFLINE_SLOW_HASH_RATE,
+            'warning': _warning(sequence) if score <= 2 else None,
+            'breached': any(m['pattern'] == 'breached' for m in sequence),
+            'patterns': [_describe(m) for m in sequence],
+        }
+        self.cache.set(password, result)
+        return result
+
+    def ranked_words(self):
+        """Every dictionary word, most common first (a wordlist for attacks)"""
+        if self._ranked is None:
+            if self._words is None:
+                self.load()
+            self._ranked = sorted(self._words, key=lambda word: self._words[word][0])
+        return self._ranked
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'words': len(self._words) if self._words is not None else 0,
+            'cache': self.cache.stats()
+        }
+
+
+def _date_from_ints(ints):
+    """(day, month, year) read from three integers, or None if they are not a date"""
+    if ints[1] > 31 or ints[1] <= 0:
+        return None
+    over_12 = over_31 = under_1 = 0
+    for value in ints:
+        if 99 < value < DATE_MIN_YEAR or value > DATE_MAX_YEAR:
+            return None
+        over_31 += value > 31
+        over_12 += value > 12
+        under_1 += value <= 0
+    if over_31 >= 2 or over_12 == 3 or under_1 >= 2:
+        return None
+
+    splits = ((ints[2], ints[:2]), (ints[0], ints[1:]))
+    for year, rest in splits:
+        if DATE_MIN_YEAR <= year <= DATE_MAX_YEAR:
+            day_month = _day_month(rest)
+            return (*day_month, year) if day_month else None
+    for year, rest in splits:
+        day_month = _day_month(rest)
+        if day_month:
+            # Two-digit years: '87' is 1987, '12' is 2012
+            if year <= 99:
+                year += 1900 if year > 50 else 2000
+            return (*day_month, year)
+    return None
+
+
+def _day_month(pair):
+    for day, month in (pair, pair[::-1]):
+        if 1 <= day <= 31 and 1 <= month <= 12:
+            return day, month
+    return None
+
+
+def _warning(sequence):
+    """Code for the pattern that most weakens a guessable password"""
+    matches = [m for m in sequence if m['pattern'] != 'bruteforce']
+    if not matches:
+        return None
+    match = max(matches, key=lambda m: len(m['token']))
+    pattern = match['pattern']
+    if pattern == 'dictionary':
+        if match['dictionary_name'] == 'passwords':
+            return 'common_password'
+        return 'name' if match['dictionary_name'] == 'names' else 'dictionary_word'
+    return {
+        'spatial': 'keyboard_pattern',
+        'repeat': 'repeat',
+        'sequence': 'sequence',
+        'regex': 'recent_year',
+        'date': 'date',
+        'breached': 'breached',
+    }[pattern]
+
+
+def _describe(match):
+    described = {
+        'pattern': match['pattern'],
+        'token': match['token'],
+        'guesses_log10': round(math.log10(match['guesses']), 2),
+    }
+    for key in ('dictionary_name', 'rank', 'l33t', 'reversed', 'graph'):
+        if match.get(key):
+            described[key] = match[key]
+    return described
+
+
+# Global instance
+strength_estimator = PasswordStrengthEstimator()
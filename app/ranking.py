@@ -0,0 +1,148 @@
+"""
+Rank Service
+In-memory ordered index of overall scores so rank lookups cost O(log n)
+instead of sorting every user on each request.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from app.models import db, User, UserScore
+from app.leaderboard import ALL_CATEGORIES, on_scores_changed, leaderboard_cache
+
+# Seconds between checks for score changes committed by other workers
+SHARED_CHECK_INTERVAL = 1.0
+
+
+class RankIndex:
+    """Sorted array of (-score, user_id) keys searched with bisect.
+
+    The index is seeded lazily from the database (one query) on first use
+    and then kept current from committed score changes. It is per-process:
+    with several workers each one seeds and maintains its own copy, and
+    reseeds when the shared (Redis) leaderboard generation shows that
+    another worker committed score changes.
+    """
+
+    def __init__(self):
+        self._keys = []      # sorted (-score, user_id)
+        self._scores = {}    # user_id -> score
+        self._seeded = False
+        self._generation = None  # shared generation the index reflects
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # ----- maintenance -----
+
+    def ensure_seeded(self):
+        """Load every user's overall score once, and again after other workers' changes"""
+        if self._seeded and not self._stale():
+            return
+        with self._lock:
+            if self._seeded and not self._stale():
+                return
+            self._generation = self._shared_generation()
+            rows = db.session.query(User.id, UserScore.score).outerjoin(
+                UserScore,
+                (UserScore.user_id == User.id) & (UserScore.category == ALL_CATEGORIES)
+            ).all()
+            self.seed((user_id, score or 0) for user_id, score in rows)
+
+    def _shared_generation(self):
+        try:
+            return leaderboard_cache.shared_generation()
+        except Exception as e:
+            print(f"Rank index cannot read the shared generation: {e}")
+            return self._generation
+
+    def _stale(self):
+        """Whether another worker changed scores since the index was built"""
+        if time.monotonic() - self._checked_at < SHARED_CHECK_INTERVAL:
+            return False
+        self._checked_at = time.monotonic()
+        generation = self._shared_generation()
+        if generation is None or generation == self._generation:
+            return False
+        self._seeded = False
+        return True
+
+    def applied_own_change(self):
+        """
+        Note that this worker's own committed change (already applied) moved
+        the shared generation on, so it does not force a reseed
+        """
+        generation = leaderboard_cache.last_shared_generation
+        if generation is not None and self._generation is not None and generation == self._generation + 1:
+            self._generation = generation
+
+    def seed(self, entries):
+        """Replace the index contents with ``(user_id, score)`` pairs"""
+        scores = {str(user_id): int(score) for user_id, score in entries}
+        self._scores = scores
+        self._keys = sorted((-score, user_id) for user_id, score in scores.items())
+        self._seeded = True
+
+    def reset(self):
+        """Forget everything; the next lookup reseeds from the database"""
+        with self._lock:
+            self._keys = []
+            self._scores = {}
+            self._seeded = False
+
+    def set_score(self, user_id, score):
+        """Move ``user_id`` to ``score`` in O(log n) search + list shift"""
+        if not self._seeded:
+            # the seed query will pick the change up from the database
+            return
+        user_id = str(user_id)
+        old = self._scores.get(user_id)
+        if old is not None:
+            i = bisect_left(self._keys, (-old, user_id))
+            if i < len(self._keys) and self._keys[i] == (-old, user_id):
+                del self._keys[i]
+        self._scores[user_id] = score
+        insort(self._keys, (-score, user_id))
+
+    def add_score(self, user_id, delta):
+        self.set_score(user_id, self._scores.get(str(user_id), 0) + delta)
+
+    # ----- queries -----
+
+    def get_score(self, user_id):
+        return self._scores.get(str(user_id), 0)
+
+    def get_rank(self, user_id):
+        """1-based position of ``user_id`` (ties broken by user id)"""
+        self.ensure_seeded()
+        user_id = str(user_id)
+        return bisect_left(self._keys, (-self.get_score(user_id), user_id)) + 1
+
+    def count(self):
+        self.ensure_seeded()
+        return len(self._keys)
+
+    def get_top(self, limit=10):
+        """Highest ``limit`` entries as (rank, user_id, score)"""
+        self.ensure_seeded()
+        return [(i + 1, user_id, -neg) for i, (neg, user_id) in enumerate(self._keys[:limit])]
+
+    def get_around(self, user_id, radius=2):
+        """Entries within ``radius`` places of ``user_id`` as (rank, user_id, score)"""
+        self.ensure_seeded()
+        position = self.get_rank(user_id) - 1
+        start = max(0, position - radius)
+        window = self._keys[start:position + radius + 1]
+        return [(start + i + 1, uid, -neg) for i, (neg, uid) in enumerate(window)]
+
+
+# Global instance
+rank_index = RankIndex()
+
+
+@on_scores_changed
+def _apply_score_changes(changes):
+    """Fold committed overall-score deltas into the index"""
+    for user_id, deltas in changes.items():
+        delta = deltas.get(ALL_CATEGORIES)
+        if delta:
+            rank_index.add_score(user_id, delta)
+    rank_index.applied_own_change()
@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, current_app, make_response
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import db, User, Challenge, ChallengeAttempt, CoopSession, AdminLog
-from app.challenge_engine import challenge_engine
+from app.executor import evaluation_executor, ExecutorBusy
+from app.leaderboard import (record_completed_attempt, leaderboard_cache, clear_user_scores,
+                             remove_challenge_scores, bucket_start, LEADERBOARD_CATEGORIES, WINDOWS)
+from app.ranking import rank_index
+from app.session_cache import coop_sessions
 from app.bot_ai import BotAI
+from werkzeug.http import is_resource_modified
 from datetime import datetime
 import uuid
 import string
@@ -60,10 +65,15 @@ def signup():
         
         # Create new user
         user = User(username=username, email=email, full_name=full_name)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except ExecutorBusy:
+            flash('Server is busy, please try again in a moment', 'error')
+            return redirect(url_for('auth.signup'))
         
         db.session.add(user)
         db.session.commit()
+        rank_index.set_score(user.id, 0)
         
         flash('Account created successfully! Please log in', 'success')
         return redirect(url_for('auth.login'))
@@ -92,7 +102,12 @@ def login():
                 if not user:
                     # fallback: try email too (user may have entered email without @ due to input error)
                     user = User.query.filter_by(email=identifier.lower()).first()
-        if user and user.check_password(password):
+        try:
+            authenticated = user is not None and user.check_password(password)
+        except ExecutorBusy:
+            flash('Server is busy, please try again in a moment', 'error')
+            return redirect(url_for('auth.login'))
+        if authenticated:
             login_user(user)
             flash('Logged in successfully', 'success')
             return redirect(url_for('main.dashboard'))
@@ -144,37 +159,126 @@ def profile():
                          total_score=total_score,
                          rank=rank)
 
+def _leaderboard_page_args():
+    """Parse category, window, page size and keyset cursor from the query string"""
+    args = {}
+    category = request.args.get('category', 'all')
+    args['category'] = category if category in LEADERBOARD_CATEGORIES else 'all'
+    args['limit'] = min(max(request.args.get('limit', 50, type=int), 1), 100)
+    
+    # Optional time window; ?period=YYYY-MM-DD selects a past bucket
+    window = request.args.get('window')
+    args['window'] = window if window in WINDOWS else None
+    args['period_start'] = None
+    if args['window']:
+        try:
+            when = datetime.strptime(request.args.get('period', ''), '%Y-%m-%d')
+        except ValueError:
+            when = datetime.utcnow()
+        args['period_start'] = bucket_start(args['window'], when)
+    
+    after_score = request.args.get('after_score', type=int)
+    after_user = request.args.get('after_user')
+    if after_score is None or not after_user:
+        after_score, after_user = None, None
+    args['after_score'], args['after_user'] = after_score, after_user
+    # Rank of the first row; carried in the "next" link so numbering stays
+    # continuous without counting the rows before the cursor
+    args['start'] = max(request.args.get('start', 1, type=int), 1) if after_user else 1
+    return args
+
+def _get_leaderboard_page(args):
+    return leaderboard_cache.get_page(args['category'], args['limit'],
+                                      args['after_score'], args['after_user'],
+                                      args['window'], args['period_start'])
+
+def _conditional_response(etag, last_modified, build, vary_cookie=False):
+    """Answer 304 if the client already holds this version, else build the body"""
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response(build())
+    else:
+        response = make_response('', 304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    if vary_cookie:
+        response.vary.add('Cookie')
+    return response
+
 @main_bp.route('/leaderboard')
 def leaderboard():
     """Leaderboard page"""
-    category_filter = request.args.get('category', 'all')
-    
-    users = User.query.all()
-    leaderboard_data = []
-    
-    for user in users:
-        if category_filter == 'all':
-            score = user.get_total_score()
-        else:
-            # Filter by category
-            attempts = ChallengeAttempt.query.join(Challenge).filter(
-                ChallengeAttempt.user_id == user.id,
-                ChallengeAttempt.is_completed == True,
-                Challenge.category == category_filter
-            ).all()
-            score = sum(a.score for a in attempts)
-        
-        if score > 0:
-            leaderboard_data.append({
-                'user': user,
-                'score': score
-            })
+    args = _leaderboard_page_args()
+    start = args['start']
+    
+    page, etag, last_modified = _get_leaderboard_page(args)
+    
+    period = args['period_start'].isoformat() if args['period_start'] else None
+    next_url = None
+    if page['next']:
+        next_url = url_for('main.leaderboard', category=args['category'], limit=args['limit'],
+                           window=args['window'], period=period,
+                           start=start + len(page['entries']), **page['next'])
+    
+    # The page highlights the viewer's own row, so the version is per user
+    viewer = current_user.id if current_user.is_authenticated else 'anonymous'
+    etag = f'{etag}-{viewer}-{start}'
+    
+    return _conditional_response(etag, last_modified, lambda: render_template('leaderboard.html', 
+                         leaderboard=page['entries'],
+                         category=args['category'],
+                         window=args['window'],
+                         period=period,
+                         rank_start=start,
+                         limit=args['limit'],
+                         next_url=next_url), vary_cookie=True)
+
+@api_bp.route('/leaderboard')
+def leaderboard_json():
+    """JSON leaderboard page (same keyset pagination as the HTML page)"""
+    args = _leaderboard_page_args()
+    start = args['start']
+    
+    page, etag, last_modified = _get_leaderboard_page(args)
+    
+    next_cursor = None
+    if page['next']:
+        next_cursor = dict(page['next'], start=start + len(page['entries']))
+    
+    return _conditional_response(f'{etag}-{start}', last_modified, lambda: jsonify({
+        'category': args['category'],
+        'window': args['window'],
+        'period_start': args['period_start'].isoformat() if args['period_start'] else None,
+        'entries': [{
+            'rank': start + i,
+            'user_id': item['user']['id'],
+            'username': item['user']['username'],
+            'score': item['score']
+        } for i, item in enumerate(page['entries'])],
+        'next': next_cursor
+    }))
+
+@api_bp.route('/leaderboard/around-me')
+@login_required
+def leaderboard_around_me():
+    """Players ranked just above and below the current user"""
+    radius = min(max(request.args.get('radius', 2, type=int), 0), 25)
+    entries = rank_index.get_around(current_user.id, radius)
     
-    leaderboard_data.sort(key=lambda x: x['score'], reverse=True)
+    user_ids = [user_id for _, user_id, _ in entries]
+    usernames = dict(db.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all())
     
-    return render_template('leaderboard.html', 
-                         leaderboard=leaderboard_data,
-                         category=category_filter)
+    return jsonify({
+        'rank': rank_index.get_rank(current_user.id),
+        'total_players': rank_index.count(),
+        'entries': [{
+            'rank': rank,
+            'user_id': user_id,
+            'username': usernames.get(user_id, user_id),
+            'score': score,
+            'is_you': user_id == current_user.id
+        } for rank, user_id, score in entries]
+    })
 
 # ==================== CHALLENGE ROUTES ====================
 
@@ -270,13 +374,17 @@ def submit_solution(attempt_id):
     # Determine role
     role = 'attacker' if challenge.category == 'red' else 'defender'
     
-    # Evaluate solution
-    result = challenge_engine.evaluate_challenge(
-        challenge.challenge_type,
-        user_input,
-        challenge.difficulty,
-        role
-    )
+    # Evaluate solution (in a worker process; refuse rather than queue when saturated)
+    try:
+        result = evaluation_executor.evaluate(
+            'engine',
+            challenge.challenge_type,
+            user_input,
+            challenge.difficulty,
+            role
+        )
+    except ExecutorBusy:
+        return jsonify({'error': 'Server is busy grading other solutions, please try again'}), 503
     
     # Calculate time taken
     time_taken = int((datetime.utcnow() - attempt.started_at).total_seconds())
@@ -290,6 +398,10 @@ def submit_solution(attempt_id):
         bot_action = bot.get_next_action(challenge.challenge_type, {'bot_step': i})
         bot_actions.append(bot_action)
     
+    # Score already counted if this attempt is being re-submitted
+    previous_score = attempt.score if attempt.is_completed else None
+    previous_completed_at = attempt.completed_at if attempt.is_completed else None
+    
     # Update attempt
     attempt.user_input = user_input
     attempt.is_correct = result['success']
@@ -297,10 +409,12 @@ def submit_solution(attempt_id):
     attempt.feedback = result['feedback']
     attempt.mistakes = result.get('details', {})
     attempt.corrections = result.get('corrections', {})
+    attempt.rule_pack_version = result.get('rule_pack_version')
     attempt.bot_actions = bot_actions
     attempt.time_taken = time_taken
     attempt.is_completed = True
     attempt.completed_at = datetime.utcnow()
+    record_completed_attempt(attempt, challenge.category, previous_score, previous_completed_at)
     
     db.session.commit()
     
@@ -420,6 +534,7 @@ def join_coop_session(session_code):
         coop_session.status = 'in_progress'
         coop_session.started_at = datetime.utcnow()
         db.session.commit()
+        coop_sessions.invalidate(session_code)
     
     if request.method == 'POST':
         return jsonify({'success': True, 'redirect_url': url_for('challenges.play_coop', session_id=coop_session.id)})
@@ -582,8 +697,12 @@ def delete_challenge(challenge_id):
         details={'title': challenge.title}
     )
     db.session.add(log)
+    # Its attempts are deleted with it; their points leave the aggregates
+    remove_challenge_scores(challenge)
     db.session.delete(challenge)
     db.session.commit()
+    rank_index.reset()
+    leaderboard_cache.invalidate()
     
     return jsonify({'success': True, 'message': 'Challenge deleted'})
 
@@ -653,8 +772,9 @@ def reset_leaderboard():
     if not current_user.is_admin:
         return jsonify({'error': 'Access denied'}), 403
     
-    # Delete all attempts
+    # Delete all attempts and the score aggregates built from them
     ChallengeAttempt.query.delete()
+    clear_user_scores()
     
     # Log admin action
     log = AdminLog(
@@ -665,5 +785,7 @@ def reset_leaderboard():
     )
     db.session.add(log)
     db.session.commit()
+    rank_index.reset()
+    leaderboard_cache.invalidate()
     
     return jsonify({'success': True, 'message': 'Leaderboard reset successfully'})
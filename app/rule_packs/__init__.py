@@ -0,0 +1,287 @@
+"""
+Rule Packs
+Declarative grading rules: one JSON file per challenge type under engine/
+(ChallengeEngine, per role) and simulator/ (ChallengeSimulator). Packs are
+compiled into matchers at load and hot-reloaded when the files change; the
+version string identifies the exact set of files that graded an attempt.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from app.matcher import KeywordMatcher, RuleTable, VIEWS, as_payload
+from app.password_blocklist import password_blocklist
+from app.password_strength import strength_estimator
+
+PACK_DIR = os.path.dirname(os.path.abspath(__file__))
+GRADERS = ('engine', 'simulator')
+
+# Seconds between checks of the pack files for changes
+RELOAD_INTERVAL = 2.0
+
+CONDITIONS = ('any', 'all', 'none', 'count_gt', 'min_length', 'blocklisted',
+              'strength_at_least', 'strength_below')
+# Conditions on the estimated password strength score (0-4)
+STRENGTH_CONDITIONS = ('strength_at_least', 'strength_below')
+RULE_KEYS = ('when', 'difficulty', 'score', 'feedback', 'format', 'success', 'miss', 'detail', 'extract')
+
+
+class RulePackError(ValueError):
+    """A rule pack file is malformed"""
+
+
+class RuleSet:
+    """
+    Compiled scoring rules for one challenge type (and role).
+
+    Rules run in file order. A rule whose ``when`` holds adds its score and
+    feedback; otherwise its ``miss`` text (if any) is reported. Then hints
+    apply, ``success_min_score`` (if set) decides success, and ``failure``
+    is reported when the attempt did not succeed. Packs that test password
+    strength also return the estimate the conditions were decided on.
+    """
+
+    def __init__(self, spec, matcher, source):
+        self.spec = spec
+        self.matcher = matcher
+        self.max_score = spec.get('max_score', 100)
+        self.details = spec.get('details', {})
+        self.rules = spec.get('rules', [])
+        self.hints = spec.get('hints', [])
+        self.failure = spec.get('failure')
+        self.success_min_score = spec.get('success_min_score')
+        self._validate(source)
+        self.estimates_strength = any(
+            condition in STRENGTH_CONDITIONS for rule in self.rules for condition in rule['when'])
+
+    def _validate(self, source):
+        names = set(self.matcher.groups)
+        for rule in self.rules:
+            unknown = set(rule) - set(RULE_KEYS)
+            if unknown:
+                raise RulePackError(f'{source}: unknown rule keys {sorted(unknown)}')
+            when = rule.get('when')
+            if not isinstance(when, dict) or not when:
+                raise RulePackError(f'{source}: every rule needs a "when" condition')
+            for condition, arg in when.items():
+                if condition not in CONDITIONS:
+                    raise RulePackError(f'{source}: unknown condition "{condition}"')
+                if condition in ('any', 'all', 'none'):
+                    referenced = arg
+                elif condition == 'count_gt':
+                    referenced = list(arg)
+                elif condition == 'blocklisted' and not isinstance(arg, bool):
+                    raise RulePackError(f'{source}: "blocklisted" takes true or false')
+                elif condition in STRENGTH_CONDITIONS and arg not in range(5):
+                    raise RulePackError(f'{source}: "{condition}" takes a score from 0 to 4')
+                else:
+                    referenced = []
+                missing = set(referenced) - names
+                if missing:
+                    raise RulePackError(f'{source}: rule refers to unknown groups {sorted(missing)}')
+
+    @staticmethod
+    def _holds(when, hits, payload, estimate):
+        for condition, arg in when.items():
+            if condition == 'any':
+                ok = any(name in hits for name in arg)
+            elif condition == 'all':
+                ok = all(name in hits for name in arg)
+            elif condition == 'none':
+                ok = not any(name in hits for name in arg)
+            elif condition == 'count_gt':
+                ok = all(hits.get(name, 0) > limit for name, limit in arg.items())
+            elif condition == 'min_length':
+                ok = len(payload) >= arg
+            elif condition == 'strength_at_least':
+                ok = estimate['score'] >= arg
+            elif condition == 'strength_below':
+                ok = estimate['score'] < arg
+            else:  # blocklisted: whether the whole payload is a breached password
+                ok = (payload.text in password_blocklist) == arg
+            if not ok:
+                return False
+        return True
+
+    def apply(self, text, difficulty):
+        """
+        Score ``text`` (a str or Payload) and return a dict with ``score``,
+        ``success``, ``notes`` (``('feedback' | 'miss', text)`` pairs in rule
+        order), ``details`` (list of (key, value) tags), ``extract`` and
+        ``estimate`` (the password strength estimate, or None).
+        """
+        payload = as_payload(text)
+        hits = self.matcher.match(payload)
+        estimate = strength_estimator.estimate(payload.text) if self.estimates_strength else None
+        score = 0
+        success = False
+        notes = []
+        tags = []
+        extract = None
+
+        for rule in self.rules:
+            gate = rule.get('difficulty')
+            if gate and difficulty not in gate:
+                continue
+            if self._holds(rule['when'], hits, payload, estimate):
+                score += rule.get('score', 0)
+                if 'feedback' in rule:
+                    message = rule['feedback']
+                    notes.append(('feedback', message.format_map(hits) if rule.get('format') else message))
+                if rule.get('success'):
+                    success = True
+                if 'detail' in rule:
+                    tags.append(tuple(rule['detail']))
+                if 'extract' in rule:
+                    extract = rule['extract']
+            elif 'miss' in rule:
+                notes.append(('miss', rule['miss']))
+
+        for hint in self.hints:
+            if hint.get('difficulty') and difficulty not in hint['difficulty']:
+                continue
+            if 'score_below' in hint and score >= hint['score_below']:
+                continue
+            notes.append(('feedback', hint['feedback']))
+
+        if self.success_min_score is not None:
+            success = score >= self.success_min_score
+        if not success and self.failure:
+            notes.append(('miss', self.failure))
+
+        return {
+            'score': score,
+            'success': success,
+            'notes': notes,
+            'details': tags,
+            'extract': extract,
+            'estimate': estimate
+        }
+
+
+def _compile_patterns(patterns, source):
+    try:
+        return RuleTable({
+            name: (entry['pattern'], re.IGNORECASE if entry.get('ignore_case') else 0)
+            for name, entry in patterns.items()
+        })
+    except (KeyError, TypeError, re.error) as e:
+        raise RulePackError(f'{source}: bad pattern: {e}')
+
+
+def _compile_groups(spec, source):
+    groups = {}
+    for name, keywords in spec.get('groups', {}).items():
+        if isinstance(keywords, dict):
+            if keywords.get('view') not in VIEWS:
+                raise RulePackError(f'{source}: unknown view for group "{name}"')
+            keywords = (keywords['view'], keywords['keywords'])
+        groups[name] = keywords
+    return KeywordMatcher(groups, view=spec.get('view', 'lower'), counted=spec.get('counted', ()))
+
+
+class RulePackSet:
+    """An immutable, fully compiled snapshot of every pack on disk"""
+
+    def __init__(self, version, packs):
+        self.version = version
+        self._packs = packs  # (grader, challenge_type, role) -> RuleSet
+
+    def get(self, grader, challenge_type, role=None):
+        return self._packs.get((grader, challenge_type, role))
+
+
+def load_rule_packs(path=PACK_DIR):
+    """Read and compile every pack under ``path``; raise RulePackError on any problem"""
+    packs = {}
+    digest = hashlib.sha256()
+    for grader in GRADERS:
+        directory = os.path.join(path, grader)
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            source = f'{grader}/{filename}'
+            with open(os.path.join(directory, filename), 'rb') as f:
+                raw = f.read()
+            digest.update(source.encode('utf-8') + b'\0' + raw + b'\0')
+            try:
+                spec = json.loads(raw)
+            except ValueError as e:
+                raise RulePackError(f'{source}: invalid JSON: {e}')
+            challenge_type = spec.get('challenge_type') or filename[:-len('.json')]
+
+            if grader == 'engine':
+                for role, role_spec in spec.get('roles', {}).items():
+                    merged = dict(role_spec, max_score=spec.get('max_score', 100),
+                                  details=spec.get('details', {}))
+                    matcher = _compile_patterns(role_spec.get('patterns', {}), source)
+                    packs[(grader, challenge_type, role)] = RuleSet(merged, matcher, source)
+            else:
+                packs[(grader, challenge_type, None)] = RuleSet(spec, _compile_groups(spec, source), source)
+
+    return RulePackSet(digest.hexdigest()[:12], packs)
+
+
+class RulePackRegistry:
+    """
+    Holds the current RulePackSet and swaps in a new one when files change.
+
+    Graders call ``current()`` once per evaluation and use that snapshot
+    throughout, so a reload never mixes rules from two versions. A pack
+    that fails to load leaves the previous version in place.
+    """
+
+    def __init__(self, path=PACK_DIR, reload_interval=RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._current = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        stamp = []
+        for grader in GRADERS:
+            directory = os.path.join(self.path, grader)
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith('.json'):
+                    st = os.stat(os.path.join(directory, filename))
+                    stamp.append((grader, filename, st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def reload(self):
+        """Load the packs now; returns the active version"""
+        with self._lock:
+            stamp = self._file_stamp()
+            packs = load_rule_packs(self.path)
+            self._current, self._stamp = packs, stamp
+            self._checked_at = time.monotonic()
+        return packs.version
+
+    def current(self):
+        """The active RulePackSet, reloaded first if the files changed"""
+        if self._current is None:
+            self.reload()
+        elif time.monotonic() - self._checked_at >= self.reload_interval:
+            self._checked_at = time.monotonic()
+            try:
+                if self._file_stamp() != self._stamp:
+                    version = self.reload()
+                    print(f"✓ Rule packs reloaded (version {version})")
+            except (RulePackError, OSError) as e:
+                print(f"Rule pack reload failed, keeping version {self._current.version}: {e}")
+        return self._current
+
+    @property
+    def version(self):
+        return self.current().version
+
+
+# Global instance
+rule_packs = RulePackRegistry()
@@ -0,0 +1,201 @@
+"""
+SQL Sandbox
+Pool of in-memory SQLite databases pre-seeded with the fake users table that
+SQL injection payloads are run against. Connections are cloned from a
+template with the backup API, locked to read-only queries, and reused.
+Every query runs under a payload length cap, an instruction budget and a
+wall-clock budget so a hostile payload cannot pin the worker.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Longest payload accepted into a sandbox query (characters)
+MAX_PAYLOAD_LENGTH = 2000
+
+# SQLite VM instructions and seconds one query may use
+MAX_INSTRUCTIONS = 200000
+MAX_SECONDS = 0.05
+
+# Instructions between progress handler checks
+PROGRESS_STEP = 1000
+
+# Per-connection SQLite limits (largest string/blob, SQL text, compound SELECT)
+SQLITE_LIMITS = {
+    sqlite3.SQLITE_LIMIT_LENGTH: 100000,
+    sqlite3.SQLITE_LIMIT_SQL_LENGTH: MAX_PAYLOAD_LENGTH + 1000,
+    sqlite3.SQLITE_LIMIT_COMPOUND_SELECT: 50,
+}
+
+SANDBOX_SCHEMA = '''
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        password TEXT,
+        email TEXT,
+        is_admin INTEGER
+    )
+'''
+
+SANDBOX_USERS = [
+    (1, 'admin', 'admin123', 'admin@test.com', 1),
+    (2, 'user1', 'pass123', 'user1@test.com', 0),
+    (3, 'user2', 'secret456', 'user2@test.com', 0),
+]
+
+# Authorizer actions a payload may perform; everything else is denied
+_READ_ACTIONS = frozenset((
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+))
+
+
+def _authorize(action, arg1, arg2, db_name, trigger):
+    return sqlite3.SQLITE_OK if action in _READ_ACTIONS else sqlite3.SQLITE_DENY
+
+
+class SandboxLimitExceeded(Exception):
+    """A sandbox query was stopped for exceeding a resource limit"""
+
+    def __init__(self, reason):
+        super().__init__(f'Sandbox resource limit exceeded: {reason}')
+        self.reason = reason
+
+
+class SandboxPool:
+    """
+    Reusable read-only sandbox connections.
+
+    Borrowing never blocks: when every pooled connection is in use a new one
+    is cloned, and surplus connections are closed on release. That keeps the
+    pool safe under gevent, where a blocking wait would stall the hub. A
+    connection that somehow recorded changes is discarded instead of reused.
+    """
+
+    def __init__(self, size=8, max_payload_length=MAX_PAYLOAD_LENGTH,
+                 max_instructions=MAX_INSTRUCTIONS, max_seconds=MAX_SECONDS):
+        self.size = size
+        self.max_payload_length = max_payload_length
+        self.max_instructions = max_instructions
+        self.max_seconds = max_seconds
+        self._template = None
+        self._template_lock = threading.Lock()
+        self._idle = queue.LifoQueue()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.limit_breaches = {'payload_length': 0, 'instructions': 0, 'time': 0, 'size': 0}
+
+    def _get_template(self):
+        if self._template is None:
+            with self._template_lock:
+                if self._template is None:
+                    template = sqlite3.connect(':memory:', check_same_thread=False)
+                    template.execute(SANDBOX_SCHEMA)
+                    template.executemany('INSERT INTO users VALUES (?,?,?,?,?)', SANDBOX_USERS)
+                    template.commit()
+                    self._template = template
+        return self._template
+
+    def _clone(self):
+        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        template = self._get_template()
+        with self._template_lock:
+            template.backup(conn)
+        conn.execute('PRAGMA query_only = ON')
+        conn.set_authorizer(_authorize)
+        for limit, value in SQLITE_LIMITS.items():
+            conn.setlimit(limit, value)
+        self.created += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a sandbox connection for the duration of the block"""
+        try:
+            conn = self._idle.get_nowait()
+            self.reused += 1
+        except queue.Empty:
+            conn = self._clone()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def check_payload(self, payload):
+        """Raise SandboxLimitExceeded if ``payload`` is too long to run"""
+        if len(payload) > self.max_payload_length:
+            self._breach('payload_length')
+
+    def execute(self, sql):
+        """
+        Run one read-only statement and return all rows.
+
+        Raises SandboxLimitExceeded when the statement runs out of its
+        instruction or time budget or builds an oversized value; other
+        SQLite errors propagate unchanged.
+        """
+        with self.connection() as conn:
+            deadline = time.monotonic() + self.max_seconds
+            max_ticks = self.max_instructions // PROGRESS_STEP
+            state = {'ticks': 0, 'reason': None}
+
+            def check_budget():
+                state['ticks'] += 1
+                if state['ticks'] > max_ticks:
+                    state['reason'] = 'instructions'
+                elif time.monotonic() > deadline:
+                    state['reason'] = 'time'
+                return state['reason'] is not None
+
+            conn.set_progress_handler(check_budget, PROGRESS_STEP)
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql)
+                return cursor.fetchall()
+            except sqlite3.Error as e:
+                if state['reason']:
+                    self._breach(state['reason'])
+                if getattr(e, 'sqlite_errorname', None) == 'SQLITE_TOOBIG':
+                    self._breach('size')
+                raise
+            finally:
+                cursor.close()
+                conn.set_progress_handler(None, 0)
+
+    def _breach(self, reason):
+        self.limit_breaches[reason] += 1
+        print(f"Sandbox limit exceeded: {reason}")
+        raise SandboxLimitExceeded(reason)
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            clean = conn.total_changes == 0
+        except sqlite3.Error:
+            clean = False
+        if clean and self._idle.qsize() < self.size:
+            self._idle.put_nowait(conn)
+            return
+        if not clean:
+            self.discarded += 1
+        conn.close()
+
+    def stats(self):
+        return {
+            'idle': self._idle.qsize(),
+            'size': self.size,
+            'created': self.created,
+            'reused': self.reused,
+            'discarded': self.discarded,
+            'limit_breaches': dict(self.limit_breaches)
+        }
+
+
+# Global instance
+sandbox_pool = SandboxPool()
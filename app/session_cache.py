@@ -0,0 +1,177 @@
+"""
+Coop Session Cache
+Read-through cache of in-progress coop sessions, their challenge and a
+participant index, keyed by session code, so live gameplay events do not
+query the database. Entries are plain snapshots (not ORM objects) and are
+safe to use from any request or background task.
+
+Only in-progress sessions are cached: a running session's participants and
+challenge no longer change, so entries stay valid until it ends. Callers
+invalidate an entry whenever they change a session's status or
+participants, and ending a session evicts it. Entries also expire after
+COOP_SESSION_CACHE_TTL seconds as a safety net for changes made by other
+workers.
+"""
+import copy
+from sqlalchemy.orm import joinedload
+from app.cache import LRUCache
+from app.models import db, Challenge, CoopSession, User
+
+
+def participant_id(participant):
+    """The user id of a participants entry (stored as a dict or a raw id)"""
+    if isinstance(participant, dict):
+        return participant.get('user_id')
+    return participant
+
+
+def load_usernames(user_ids):
+    """{user_id: username} for ``user_ids`` in one query; bots and unknown ids map to themselves"""
+    ids = [str(uid) for uid in user_ids if uid is not None]
+    wanted = [uid for uid in ids if not uid.startswith('bot-')]
+    rows = db.session.query(User.id, User.username).filter(User.id.in_(wanted)).all() if wanted else []
+    found = {str(row.id): row.username for row in rows}
+    return {uid: found.get(uid, uid) for uid in ids}
+
+
+class ParticipantIndex:
+    """
+    A session's players by (string) user id with their team, username and
+    attempt id, plus each player's opponents, so gameplay looks them up in
+    constant time. Opponents are every other player not on the same team.
+    """
+
+    def __init__(self, participants, usernames, attempts=None):
+        self.players = {}
+        for participant in participants:
+            uid = str(participant_id(participant))
+            team = participant.get('team') if isinstance(participant, dict) else None
+            self.players[uid] = {
+                'team': team,
+                'username': usernames.get(uid, uid),
+                'attempt_id': (attempts or {}).get(uid)
+            }
+        self._build_targets()
+
+    @classmethod
+    def load(cls, participants, attempts=None):
+        """Index ``participants``, resolving every username in one query"""
+        return cls(participants, load_usernames(participant_id(p) for p in participants), attempts)
+
+    def _build_targets(self):
+        self.by_team = {}
+        for uid, player in self.players.items():
+            self.by_team.setdefault(player['team'], []).append(uid)
+        self._opponents = {
+            uid: [other for other, player in self.players.items()
+                  if other != uid and not (me['team'] and player['team'] == me['team'])]
+            for uid, me in self.players.items()
+        }
+
+    def add(self, uid, team=None, username=None):
+        """Add or update a player (on join)"""
+        uid = str(uid)
+        player = self.players.setdefault(uid, {'team': None, 'username': uid, 'attempt_id': None})
+        player['team'] = team
+        if username:
+            player['username'] = username
+        self._build_targets()
+
+    def set_attempt(self, uid, attempt_id):
+        self.players[str(uid)]['attempt_id'] = attempt_id
+
+    def __contains__(self, uid):
+        return str(uid) in self.players
+
+    def team(self, uid):
+        player = self.players.get(str(uid))
+        return player['team'] if player else None
+
+    def username(self, uid):
+        player = self.players.get(str(uid))
+        return player['username'] if player else str(uid)
+
+    def usernames(self):
+        return [player['username'] for player in self.players.values()]
+
+    def targets(self, actor_id, target_id=None):
+        """
+        Players hit by ``actor_id``: just ``target_id`` when given (if it is
+        another player), else the actor's opponents. An actor outside the
+        index (a bot) targets every player.
+        """
+        actor_id = str(actor_id)
+        if target_id:
+            target_id = str(target_id)
+            return [target_id] if target_id in self.players and target_id != actor_id else []
+        opponents = self._opponents.get(actor_id)
+        return list(self.players) if opponents is None else opponents
+
+
+class CachedChallenge:
+    """The challenge fields coop gameplay reads"""
+
+    def __init__(self, challenge):
+        self.id = challenge.id
+        self.title = challenge.title
+        self.category = challenge.category
+        self.difficulty = challenge.difficulty
+        self.challenge_type = challenge.challenge_type
+
+
+class CachedCoopSession:
+    """Snapshot of a CoopSession row, its resolved challenge and participant index"""
+
+    def __init__(self, coop_session, challenge, index):
+        self.id = coop_session.id
+        self.session_code = coop_session.session_code
+        self.creator_id = coop_session.creator_id
+        self.creator_team = coop_session.creator_team
+        self.challenge_id = coop_session.challenge_id
+        self.status = coop_session.status
+        self.participants = copy.deepcopy(coop_session.participants or [])
+        self.results = copy.deepcopy(coop_session.results or {})
+        self.challenge = CachedChallenge(challenge) if challenge is not None else None
+        self.index = index
+
+
+class CoopSessionCache:
+    """Session code -> CachedCoopSession for sessions in progress"""
+
+    def __init__(self, max_size=1024, ttl=300):
+        self._cache = LRUCache(max_size=max_size, ttl=ttl)
+
+    def init_app(self, app):
+        self._cache = LRUCache(max_size=app.config.get('COOP_SESSION_CACHE_SIZE', 1024),
+                               ttl=app.config.get('COOP_SESSION_CACHE_TTL', 300))
+
+    def get(self, session_code):
+        """The session with ``session_code`` (cached while in progress), or None"""
+        cached = self._cache.get(session_code)
+        if cached is not None:
+            return cached
+        coop_session = (CoopSession.query.options(joinedload(CoopSession.challenge))
+                        .filter_by(session_code=session_code).first())
+        if coop_session is None:
+            return None
+        return self.put(coop_session, ParticipantIndex.load(coop_session.participants or []))
+
+    def put(self, coop_session, index):
+        """Snapshot ``coop_session`` with ``index`` and cache it while in progress"""
+        # coop_session.challenge may be None if an invalid challenge_id was stored
+        challenge = coop_session.challenge or Challenge.query.get(coop_session.challenge_id)
+        cached = CachedCoopSession(coop_session, challenge, index)
+        if cached.status == 'in_progress':
+            self._cache.set(cached.session_code, cached)
+        return cached
+
+    def invalidate(self, session_code):
+        """Drop the entry after a status or participant change"""
+        self._cache.delete(session_code)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+# Global instance
+coop_sessions = CoopSessionCache()
@@ -0,0 +1,285 @@
+"""
+Session State Store
+Live state of coop sessions: running flag, scores, hp, cooldowns, results,
+a short action log and the sequence number of the last action. The
+in-process backend serves a single worker; with SESSION_STATE_URL (or
+REDIS_URL) set, the state lives in Redis and any worker can serve any
+session. Every update is one atomic step — hash increments and MULTI/EXEC
+transactions in Redis, uninterrupted code between greenlet switches in
+process — so concurrent actions never lose a write.
+
+HP is stored as damage taken (hp = MAX_HP - damage, never below 0), so
+damage is a plain increment and a missing player starts at full HP.
+"""
+import json
+import time
+from abc import ABC, abstractmethod
+from app.cache import get_redis_client
+
+MAX_HP = 100
+
+# Action records kept per session (oldest dropped first)
+LOG_LIMIT = 200
+
+
+class SessionStateStore(ABC):
+    """Interface shared by the state backends; player ids are strings"""
+
+    @abstractmethod
+    def start(self, code, player_ids, seed_results=None):
+        """Mark the session running and add players (existing values are kept)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stop(self, code):
+        raise NotImplementedError
+
+    @abstractmethod
+    def is_running(self, code):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_score(self, code, player_id, points):
+        """Add ``points`` to the player's score and return the new total"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply_action(self, code, actor_id, record, damage=None, cooldown_until=None,
+                     result=None, seed_results=None):
+        """
+        Log ``record``, deal ``damage`` ({player_id: hp}), store the
+        actor's cooldown and result and bump the session's sequence number
+        in one step; returns ``state(code)`` as of this action.
+        ``seed_results`` fills in results the store does not have yet.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim_cooldown(self, code, actor_id, seconds):
+        """
+        Start the actor's ``seconds`` cooldown and return True, or return
+        False while the previous one is still running; one atomic step, so
+        concurrent actions cannot both get through.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_result(self, code, player_id, result, seed_results=None):
+        """Store one player's result and return all results"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def state(self, code):
+        """{'seq', 'running', 'scores', 'hp_map', 'cooldowns', 'results'} of a session"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _hp_map(damage):
+        return {player_id: max(0, MAX_HP - taken) for player_id, taken in damage.items()}
+
+
+class LocalSessionStore(SessionStateStore):
+    """Session state in a per-process dict (single-worker deployments)"""
+
+    def __init__(self):
+        self._sessions = {}
+
+    @staticmethod
+    def _new_session():
+        return {
+            'seq': 0, 'running': False, 'scores': {}, 'damage': {}, 'cooldowns': {}, 'results': {}, 'log': [],
+            'claims': {}
+        }
+
+    def _session(self, code):
+        session = self._sessions.get(code)
+        if session is None:
+            session = self._sessions[code] = self._new_session()
+        return session
+
+    def start(self, code, player_ids, seed_results=None):
+        session = self._session(code)
+        session['running'] = True
+        for player_id in player_ids:
+            session['scores'].setdefault(player_id, 0)
+            session['damage'].setdefault(player_id, 0)
+        self._seed(session, seed_results)
+
+    def stop(self, code):
+        self._session(code)['running'] = False
+
+    def is_running(self, code):
+        session = self._sessions.get(code)
+        return bool(session and session['running'])
+
+    def add_score(self, code, player_id, points):
+        scores = self._session(code)['scores']
+        scores[player_id] = scores.get(player_id, 0) + points
+        return scores[player_id]
+
+    def apply_action(self, code, actor_id, record, damage=None, cooldown_until=None,
+                     result=None, seed_results=None):
+        session = self._session(code)
+        self._seed(session, seed_results)
+        session['log'].append(record)
+        del session['log'][:-LOG_LIMIT]
+        session['damage'].setdefault(actor_id, 0)
+        for player_id, amount in (damage or {}).items():
+            session['damage'][player_id] = session['damage'].get(player_id, 0) + amount
+        if cooldown_until is not None:
+            session['cooldowns'][actor_id] = cooldown_until
+        if result is not None:
+            session['results'][actor_id] = result
+        session['seq'] += 1
+        return self.state(code)
+
+    def claim_cooldown(self, code, actor_id, seconds):
+        claims = self._session(code)['claims']
+        now = time.time()
+        if claims.get(actor_id, 0) > now:
+            return False
+        claims[actor_id] = now + seconds
+        return True
+
+    def set_result(self, code, player_id, result, seed_results=None):
+        session = self._session(code)
+        self._seed(session, seed_results)
+        session['results'][player_id] = result
+        return dict(session['results'])
+
+    def state(self, code):
+        # A read never adds an entry, so asking about unknown codes does not grow the dict
+        session = self._sessions.get(code) or self._new_session()
+        # Copies, so callers never hold the live dicts
+        return {
+            'seq': session['seq'],
+            'running': session['running'],
+            'scores': dict(session['scores']),
+            'hp_map': self._hp_map(session['damage']),
+            'cooldowns': dict(session['cooldowns']),
+            'results': dict(session['results'])
+        }
+
+    @staticmethod
+    def _seed(session, seed_results):
+        for player_id, result in (seed_results or {}).items():
+            session['results'].setdefault(str(player_id), result)
+
+
+class RedisSessionStore(SessionStateStore):
+    """
+    Session state in Redis hashes shared by every worker. Keys share a
+    {session_code} hash tag, so one session's keys land on one cluster slot
+    and can be updated in one transaction; they expire ``ttl`` seconds
+    after the session's last update.
+    """
+
+    def __init__(self, client, prefix='coop:', ttl=6 * 3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, code, name):
+        return f'{self.prefix}{{{code}}}:{name}'
+
+    def _touch(self, pipe, code, *names):
+        for name in names:
+            pipe.expire(self._key(code, name), self.ttl)
+
+    def _seed(self, pipe, code, seed_results):
+        for player_id, result in (seed_results or {}).items():
+            pipe.hsetnx(self._key(code, 'results'), str(player_id), json.dumps(result))
+
+    def start(self, code, player_ids, seed_results=None):
+        pipe = self.client.pipeline()
+        pipe.set(self._key(code, 'running'), 1, ex=self.ttl)
+        for player_id in player_ids:
+            pipe.hsetnx(self._key(code, 'scores'), player_id, 0)
+            pipe.hsetnx(self._key(code, 'damage'), player_id, 0)
+        self._seed(pipe, code, seed_results)
+        self._touch(pipe, code, 'scores', 'damage', 'results')
+        pipe.execute()
+
+    def stop(self, code):
+        self.client.set(self._key(code, 'running'), 0, ex=self.ttl)
+
+    def is_running(self, code):
+        return _text(self.client.get(self._key(code, 'running'))) == '1'
+
+    def add_score(self, code, player_id, points):
+        pipe = self.client.pipeline()
+        pipe.hincrby(self._key(code, 'scores'), player_id, int(points))
+        self._touch(pipe, code, 'scores')
+        return int(pipe.execute()[0])
+
+    def apply_action(self, code, actor_id, record, damage=None, cooldown_until=None,
+                     result=None, seed_results=None):
+        pipe = self.client.pipeline()
+        self._seed(pipe, code, seed_results)
+        log_key = self._key(code, 'log')
+        pipe.rpush(log_key, json.dumps(record))
+        pipe.ltrim(log_key, -LOG_LIMIT, -1)
+        damage_key = self._key(code, 'damage')
+        pipe.hincrby(damage_key, actor_id, 0)
+        for player_id, amount in (damage or {}).items():
+            pipe.hincrby(damage_key, player_id, int(amount))
+        if cooldown_until is not None:
+            pipe.hset(self._key(code, 'cooldowns'), actor_id, int(cooldown_until))
+        if result is not None:
+            pipe.hset(self._key(code, 'results'), actor_id, json.dumps(result))
+        pipe.incr(self._key(code, 'seq'))
+        self._touch(pipe, code, 'log', 'damage', 'cooldowns', 'results', 'seq')
+        start = len(pipe)
+        self._read(pipe, code)
+        return self._state(pipe.execute()[start:])
+
+    def claim_cooldown(self, code, actor_id, seconds):
+        # A key per actor that expires with the cooldown; SET NX only
+        # succeeds when there is none
+        return bool(self.client.set(self._key(code, f'claim:{actor_id}'), 1, nx=True, px=int(seconds * 1000)))
+
+    def set_result(self, code, player_id, result, seed_results=None):
+        pipe = self.client.pipeline()
+        self._seed(pipe, code, seed_results)
+        pipe.hset(self._key(code, 'results'), player_id, json.dumps(result))
+        self._touch(pipe, code, 'results')
+        pipe.hgetall(self._key(code, 'results'))
+        return _decode_hash(pipe.execute()[-1], json.loads)
+
+    def state(self, code):
+        pipe = self.client.pipeline()
+        self._read(pipe, code)
+        return self._state(pipe.execute())
+
+    def _read(self, pipe, code):
+        pipe.get(self._key(code, 'seq'))
+        pipe.get(self._key(code, 'running'))
+        for name in ('scores', 'damage', 'cooldowns', 'results'):
+            pipe.hgetall(self._key(code, name))
+
+    def _state(self, replies):
+        seq, running, scores, damage, cooldowns, results = replies
+        return {
+            'seq': int(seq or 0),
+            'running': _text(running) == '1',
+            'scores': _decode_hash(scores, int),
+            'hp_map': self._hp_map(_decode_hash(damage, int)),
+            'cooldowns': _decode_hash(cooldowns, int),
+            'results': _decode_hash(results, json.loads)
+        }
+
+
+def _text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _decode_hash(mapping, convert):
+    return {_text(field): convert(_text(value)) for field, value in mapping.items()}
+
+
+def open_session_store(url=None, ttl=6 * 3600):
+    """A Redis store for ``url``, or the in-process store without one"""
+    client = get_redis_client(url)
+    if client is None:
+        return LocalSessionStore()
+    return RedisSessionStore(client, ttl=ttl)
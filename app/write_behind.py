@@ -0,0 +1,200 @@
+"""
+Write-Behind Buffer
+Coop gameplay keeps its authoritative state in memory and queues the
+database writes here: completed attempts, and the latest hp_map /
+cooldowns / results / status of each session. A background task writes
+everything queued in one transaction every COOP_FLUSH_INTERVAL seconds, or
+as soon as COOP_FLUSH_MAX_RECORDS attempts are waiting, so broadcasting an
+action never waits on a database round-trip.
+
+Durability:
+- Players see an action's result before it is stored. If the process dies,
+  up to one flush interval of attempts and session state is lost; the
+  sessions themselves and their participants are always committed directly.
+- Ending a session (explicitly or when a player reaches 0 HP) flushes
+  synchronously before 'session_ended' is sent, so a finished session is
+  fully stored by the time players see its result. Pending writes are also
+  flushed when the process exits normally.
+- Every attempt and session state is written in its own savepoint, so a
+  row the database rejects does not sink the rest of the batch. Rejected
+  rows, or the whole batch when the commit fails, are retried with the
+  next flush; after MAX_FLUSH_ATTEMPTS failures a row is dropped and
+  logged. Bot attempts are never queued (bots have no user row).
+- Buffers are per process. With a shared session store several workers
+  may queue snapshots of one session; each stores the state as that worker
+  last saw it, and ending the session writes the store's final state.
+"""
+import atexit
+import copy
+from flask import current_app
+from app.models import db, ChallengeAttempt, CoopSession
+from app.leaderboard import record_completed_attempt, is_bot_id
+
+# Session columns a snapshot may carry
+SNAPSHOT_FIELDS = ('hp_map', 'cooldowns', 'results', 'status', 'completed_at')
+
+# Failed flushes a batch survives before its writes are dropped
+MAX_FLUSH_ATTEMPTS = 3
+
+
+class WriteBehindBuffer:
+    """Queues coop attempts and session snapshots and commits them in batches"""
+
+    def __init__(self, interval=0.25, max_records=50):
+        self.interval = interval
+        self.max_records = max_records
+        self.socketio = None
+        self._app = None
+        self._attempts = []  # (ChallengeAttempt kwargs, challenge category, failed flushes)
+        self._snapshots = {}  # session_code -> {field: value}, latest wins
+        self._snapshot_failures = {}  # session_code -> failed flushes of its queued state
+        self._scheduled = False
+        self.flushes = 0
+        self.written_attempts = 0
+        self.dropped = 0
+        self.dropped_snapshots = 0
+        self._exit_flush_registered = False
+
+    def init_app(self, app):
+        self._app = app
+        self.interval = app.config.get('COOP_FLUSH_INTERVAL', self.interval)
+        self.max_records = app.config.get('COOP_FLUSH_MAX_RECORDS', self.max_records)
+        # create_app may run more than once per process; flush once at exit
+        if not self._exit_flush_registered:
+            self._exit_flush_registered = True
+            atexit.register(self.flush)
+
+    def init_socketio(self, socketio):
+        self.socketio = socketio
+
+    def add_attempt(self, category, **fields):
+        """Queue a completed ChallengeAttempt built from ``fields`` (ignored for bots)"""
+        if is_bot_id(fields.get('user_id')):
+            return
+        self._attempts.append((fields, category, 0))
+        self._schedule(now=len(self._attempts) >= self.max_records)
+
+    def snapshot(self, session_code, **fields):
+        """
+        Queue the session's current state. Mutable values are copied when
+        flushed, so passing the live in-memory dicts stores their latest
+        contents.
+        """
+        unknown = set(fields) - set(SNAPSHOT_FIELDS)
+        if unknown:
+            raise ValueError(f'Unknown session fields: {sorted(unknown)}')
+        self._snapshots.setdefault(session_code, {}).update(fields)
+        self._schedule()
+
+    def _schedule(self, now=False):
+        if self._app is None:
+            self._app = current_app._get_current_object()
+        if self.socketio is None:
+            # No background tasks available; write through
+            self.flush()
+            return
+        if now:
+            self.socketio.start_background_task(self.flush)
+        elif not self._scheduled:
+            self._scheduled = True
+            self.socketio.start_background_task(self._flush_later)
+
+    def _flush_later(self):
+        self.socketio.sleep(self.interval)
+        self._scheduled = False
+        self.flush()
+
+    def flush(self):
+        """Write everything queued in one transaction; returns the attempts written"""
+        attempts, self._attempts = self._attempts, []
+        snapshots, self._snapshots = self._snapshots, {}
+        if not attempts and not snapshots:
+            return 0
+        # Copy now: the live state may change while the transaction runs
+        snapshots = {code: {field: copy.deepcopy(value) for field, value in fields.items()}
+                     for code, fields in snapshots.items()}
+        try:
+            with self._app.app_context():
+                failed_attempts, failed_snapshots = self._write(attempts, snapshots)
+        except Exception as e:
+            self._app.logger.warning(f"Coop write-behind flush failed: {e}")
+            self._requeue(attempts, snapshots)
+            return 0
+        written = len(attempts) - len(failed_attempts)
+        for code in snapshots:
+            if code not in failed_snapshots:
+                self._snapshot_failures.pop(code, None)
+        self._requeue(failed_attempts, failed_snapshots)
+        self.flushes += 1
+        self.written_attempts += written
+        return written
+
+    def _write(self, attempts, snapshots):
+        """
+        Write one batch. Each row goes through its own savepoint, so a row
+        the database rejects is rolled back alone; returns the rejected
+        ``(attempts, snapshots)``.
+        """
+        failed_attempts, failed_snapshots = [], {}
+        try:
+            for entry in attempts:
+                fields, category, _ = entry
+                attempt = ChallengeAttempt(**fields)
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(attempt)
+                except Exception as e:
+                    self._app.logger.warning(f"Coop write-behind rejected an attempt by {fields.get('user_id')}: {e}")
+                    failed_attempts.append(entry)
+                    continue
+                record_completed_attempt(attempt, category)
+            if snapshots:
+                sessions = CoopSession.query.filter(CoopSession.session_code.in_(list(snapshots))).all()
+                for coop_session in sessions:
+                    code = coop_session.session_code
+                    try:
+                        with db.session.begin_nested():
+                            for field, value in snapshots[code].items():
+                                setattr(coop_session, field, value)
+                    except Exception as e:
+                        self._app.logger.warning(f"Coop write-behind rejected the state of session {code}: {e}")
+                        failed_snapshots[code] = snapshots[code]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return failed_attempts, failed_snapshots
+
+    def _requeue(self, attempts, snapshots):
+        retry = [(fields, category, failures + 1) for fields, category, failures in attempts
+                 if failures + 1 < MAX_FLUSH_ATTEMPTS]
+        dropped = len(attempts) - len(retry)
+        if dropped:
+            self.dropped += dropped
+            self._app.logger.error(f"Coop write-behind dropped {dropped} attempt(s) after "
+                                   f"{MAX_FLUSH_ATTEMPTS} failed flushes")
+        # Older writes go first; newer snapshot fields win
+        self._attempts = retry + self._attempts
+        for code, fields in snapshots.items():
+            failures = self._snapshot_failures.get(code, 0) + 1
+            if failures >= MAX_FLUSH_ATTEMPTS:
+                self._snapshot_failures.pop(code, None)
+                self.dropped_snapshots += 1
+                self._app.logger.error(f"Coop write-behind dropped the state of session {code} after "
+                                       f"{MAX_FLUSH_ATTEMPTS} failed flushes")
+                continue
+            self._snapshot_failures[code] = failures
+            self._snapshots[code] = dict(fields, **self._snapshots.get(code, {}))
+        if self._attempts or self._snapshots:
+            self._schedule()
+
+    def pending(self):
+        return {'attempts': len(self._attempts), 'sessions': len(self._snapshots)}
+
+    def stats(self):
+        return dict(self.pending(), flushes=self.flushes, written_attempts=self.written_attempts,
+                    dropped=self.dropped, dropped_snapshots=self.dropped_snapshots)
+
+
+# Global instance
+write_behind = WriteBehindBuffer()
@@ -30,6 +30,58 @@ class Config:
     
     # WebSocket / Socket.IO message queue (use REDIS_URL or SOCKETIO_MESSAGE_QUEUE)
     SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or os.environ.get('REDIS_URL')
+    
+    # Redis (optional): shared cache backend and Socket.IO message queue
+    REDIS_URL = os.environ.get('REDIS_URL')
+    
+    # Leaderboard page cache: seconds before a cached page expires even
+    # without a score change, and max pages kept by the in-process LRU
+    LEADERBOARD_CACHE_TTL = int(os.environ.get('LEADERBOARD_CACHE_TTL', 30))
+    LEADERBOARD_CACHE_SIZE = 256
+    
+    # Seconds over which score changes are coalesced into one live
+    # 'leaderboard_delta' Socket.IO message
+    LEADERBOARD_PUSH_INTERVAL = 1.0
+    
+    # Coop actions are stored write-behind: seconds between batched commits
+    # of queued attempts and session state, and queued attempts that
+    # trigger a commit straight away
+    COOP_FLUSH_INTERVAL = 0.25
+    COOP_FLUSH_MAX_RECORDS = 50
+    
+    # In-progress coop sessions cached by session code (entries are
+    # invalidated on changes; the TTL covers changes made by other workers)
+    COOP_SESSION_CACHE_SIZE = 1024
+    COOP_SESSION_CACHE_TTL = 300
+    
+    # Longest the bot scheduler sleeps between checks for due bot turns
+    # (a newly added bot waits at most this long past its first delay)
+    BOT_SCHEDULER_TICK = 0.5
+    
+    # Live coop session state (scores, hp, cooldowns, results). With a Redis
+    # URL (defaults to REDIS_URL) it is shared, so any worker can serve any
+    # session; keys expire SESSION_STATE_TTL seconds after the last update
+    SESSION_STATE_URL = os.environ.get('SESSION_STATE_URL')
+    SESSION_STATE_TTL = 6 * 3600
+
+    # Worker processes for CPU-heavy grading and password hashing (0 runs
+    # them inline), how many calls may be queued or running before new ones
+    # are refused as busy, and seconds to wait for one result
+    EVALUATION_WORKERS = int(os.environ.get('EVALUATION_WORKERS', 2))
+    EVALUATION_MAX_PENDING = int(os.environ.get('EVALUATION_MAX_PENDING', 32))
+    EVALUATION_TIMEOUT = 10
+    
+    # Bloom filter of breached/common passwords checked by the password
+    # evaluators (build with tools/build_password_blocklist.py); without
+    # the file only a short built-in list is blocked
+    PASSWORD_BLOCKLIST_PATH = os.environ.get('PASSWORD_BLOCKLIST_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'instance', 'password_blocklist.bloom')
+
+    # Frequency-ranked dictionaries used by the password strength estimator
+    # (build with tools/build_password_dictionaries.py); without the file
+    # the bundled wordlists in app/password_data are used
+    PASSWORD_DICTIONARIES_PATH = os.environ.get('PASSWORD_DICTIONARIES_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'instance', 'password_dictionaries.pickle')
 
     # SQLAlchemy engine options: use NullPool in this app to avoid
     # threading/Condition errors when running under eventlet (Gunicorn
@@ -63,6 +115,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    EVALUATION_WORKERS = 0
 
 # Configuration dictionary
 config = {
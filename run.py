@@ -7,6 +7,7 @@ Local / Development Entrypoint
 import os
 from app import create_app, socketio
 from app.models import db, User, Challenge
+from app.executor import in_pool_worker
 from app.init_challenges import get_challenges
 
 # إنشاء التطبيق
@@ -36,7 +37,9 @@ def init_database():
             print("✓ Database already initialized — skipping")
 
 # تهيئة قاعدة البيانات عند التشغيل المحلي
-init_database()
+# (grading pool workers re-import this module; they must not do it again)
+if not in_pool_worker():
+    init_database()
 
 # تشغيل محلي باستخدام socketio.run
 if __name__ == "__main__":
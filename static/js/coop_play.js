@@ -254,6 +254,9 @@
             addEvent('Connected to server', 'System');
             console.log('[coop] socket connected');
             socket.emit('join_coop_session', { session_code: sessionCode });
+            // A request sent before a reconnect may never be answered
+            snapshotPending = false;
+            requestState();
         });
 
     socket.on('connect_response', (d)=>{
@@ -276,6 +279,7 @@
     socket.on('session_started', (data)=>{
         addEvent('Session started. Preparing challenge...', 'System');
         console.log('[coop] session_started', data);
+        requestState();
         // store participant id -> username mapping if provided
         if(data && data.participants){
             window.coop_results_map = Object.assign(window.coop_results_map || {}, data.participants || {});
@@ -296,29 +300,94 @@
         }catch(e){/*ignore*/}
     });
 
-    socket.on('action_result', (data)=>{
+    // Live state is versioned: 'state_snapshot' carries everything with the
+    // seq of the last action, each 'state_delta' only what one action changed
+    let stateSeq = null;
+    // While a snapshot is on its way, deltas are held here instead of
+    // triggering more requests, then applied on top of the snapshot
+    let snapshotPending = false;
+    let heldDeltas = [];
+
+    function requestState(){
+        if(snapshotPending) return;
+        snapshotPending = true;
+        socket.emit('request_state', { session_code: sessionCode });
+    }
+
+    // Merge held deltas that directly follow the current seq; a remaining
+    // gap needs another snapshot
+    function applyHeldDeltas(){
+        const held = heldDeltas.sort((a, b)=> a.seq - b.seq);
+        heldDeltas = [];
+        for(let i = 0; i < held.length; i++){
+            const data = held[i];
+            if(data.seq <= stateSeq) continue;  // already in the snapshot
+            if(data.seq !== stateSeq + 1){
+                heldDeltas = held.slice(i);
+                requestState();
+                return;
+            }
+            stateSeq = data.seq;
+            mergeState(data);
+        }
+    }
+
+    function mergeState(data){
+        window.coop_scores = Object.assign(window.coop_scores || {}, data.scores || {});
+        window.coop_results_map = Object.assign(window.coop_results_map || {}, data.results || {});
+        window.coop_hp_map = Object.assign(window.coop_hp_map || {}, data.hp_map || {});
+        window.coop_cooldowns = Object.assign(window.coop_cooldowns || {}, data.cooldowns || {});
+    }
+
+    function renderState(){
+        updateScoreboard(window.coop_scores || buildScoresFromResults(window.coop_results_map));
+        // update participant panels (hp etc)
+        try{ updateParticipantPanels(window.coop_results_map || {}, window.coop_hp_map || {}, window.coop_cooldowns || {}); }catch(e){}
+        // If any player's HP reached zero, show final results overlay once
+        try{
+            if(!window._coopResultsShown){
+                const hpMap = window.coop_hp_map || {};
+                const anyDead = Object.keys(hpMap).some(k=> Number(hpMap[k]) <= 0);
+                if(anyDead){
+                    // mark shown to avoid repeated overlays
+                    window._coopResultsShown = true;
+                    try{ showResults(window.coop_results_map || {}); }catch(e){}
+                }
+            }
+        }catch(e){}
+    }
+
+    socket.on('state_snapshot', (data)=>{
+        console.log('[coop] state_snapshot', data);
+        snapshotPending = false;
+        stateSeq = data.seq;
+        mergeState(data);
+        applyHeldDeltas();
+        renderState();
+    });
+
+    socket.on('state_delta', (data)=>{
         const rec = data.record || {};
+        console.log('[coop] state_delta', data);
+        addEvent(`(debug) state_delta seq=${data.seq} actor=${rec.actor_id} target=${rec.target_id || '-'} score=${rec.score}`, 'Debug');
+        // The action is logged even when its state is already in a snapshot
+        showAction(rec);
+        if(stateSeq !== null && data.seq <= stateSeq) return;  // already in the snapshot
+        if(snapshotPending || stateSeq === null || data.seq !== stateSeq + 1){
+            // A gap means a delta was missed: hold this one until a fresh snapshot arrives
+            heldDeltas.push(data);
+            requestState();
+            return;
+        }
+        stateSeq = data.seq;
+        mergeState(data);
+        renderState();
+    });
+
+    // Log the action and play its sound and animations
+    function showAction(rec){
         const actor = rec.actor_name || rec.actor_id || 'Unknown';
         addEvent(`${rec.feedback || rec.payload} (score ${rec.score})`, actor);
-        console.log('[coop] action_result', data);
-        addEvent(`(debug) action_result actor=${rec.actor_id} target=${rec.target_id || '-'} score=${rec.score}`, 'Debug');
-        // update local results map if server sent results
-        if(data.results) window.coop_results_map = Object.assign(window.coop_results_map || {}, data.results || {});
-        // authoritative hp and cooldowns if provided
-        if(data.hp_map) window.coop_hp_map = Object.assign(window.coop_hp_map || {}, data.hp_map || {});
-        if(data.cooldowns) window.coop_cooldowns = Object.assign(window.coop_cooldowns || {}, data.cooldowns || {});
-        // update scoreboard if present
-        updateScoreboard(data.scores || buildScoresFromResults(window.coop_results_map));
-
-        // update HP map (simple heuristic): ensure every participant starts with 100
-        window.coop_hp_map = window.coop_hp_map || {}; 
-        if(rec && rec.actor_id){
-            const id = String(rec.actor_id);
-            if(typeof window.coop_hp_map[id] === 'undefined') window.coop_hp_map[id] = 100;
-            // scoring heuristic: failures reduce HP, successes heal a bit
-            if(rec.is_correct) window.coop_hp_map[id] = Math.min(100, window.coop_hp_map[id] + (rec.score? Math.min(6, rec.score):3));
-            else window.coop_hp_map[id] = Math.max(0, window.coop_hp_map[id] - (rec.score? Math.min(12, Math.abs(rec.score)):10));
-        }
 
         // play sound based on correctness
         try{ if(rec.is_correct) audioEngine.playSuccess(); else audioEngine.playFail(); }catch(e){}
@@ -471,35 +540,7 @@
                 targets.forEach(tid=> animateDefendOn(tid));
             }
         }catch(e){/*ignore*/}
-    });
-
-    socket.on('session_update', (data)=>{
-        console.log('[coop] session_update', data);
-        if(data && data.results) window.coop_results_map = Object.assign(window.coop_results_map || {}, data.results || {});
-        if(data && data.hp_map) window.coop_hp_map = Object.assign(window.coop_hp_map || {}, data.hp_map || {});
-        if(data && data.cooldowns) window.coop_cooldowns = Object.assign(window.coop_cooldowns || {}, data.cooldowns || {});
-        if(data && data.scores) updateScoreboard(data.scores);
-        else updateScoreboard(buildScoresFromResults(window.coop_results_map));
-        if(data && data.recent){
-            const r = data.recent;
-            addEvent(`${r.feedback || r.payload} (score ${r.score})`, r.actor_name || r.actor_id);
-        }
-        // update participant panels (hp etc)
-        try{ updateParticipantPanels(window.coop_results_map || {}, window.coop_hp_map || {}, window.coop_cooldowns || {}); }catch(e){}
-        // If any player's HP reached zero, show final results overlay once
-        try{
-            if(!window._coopResultsShown){
-                const hpMap = window.coop_hp_map || {};
-                const anyDead = Object.keys(hpMap).some(k=> Number(hpMap[k]) <= 0);
-                if(anyDead){
-                    // mark shown to avoid repeated overlays
-                    window._coopResultsShown = true;
-                    try{ showResults(window.coop_results_map || {}); }catch(e){}
-                }
-            }
-        }catch(e){}
-        try{ addEvent(`(debug) session_update: scores=${Object.keys(data.scores||{}).join(', ')}`, 'Debug'); }catch(e){}
-    });
+    }
 
     socket.on('solution_submitted', (d)=>{
         addEvent(`${d.username} submitted a solution — score ${d.score}`, 'System');
@@ -0,0 +1,75 @@
+// Leaderboard Page JavaScript - live updates over Socket.IO
+
+(function(){
+    const ctxEl = document.getElementById('leaderboard-context');
+    const body = document.getElementById('leaderboard-body');
+    if (!ctxEl || !body || typeof io === 'undefined') return;
+
+    const ctx = JSON.parse(ctxEl.textContent || '{}');
+    const limit = ctx.limit || 50;
+    let entries = [];
+    let seq = null;
+
+    function escapeHtml(s){
+        return String(s).replace(/[&<>"']/g, c => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[c]));
+    }
+
+    function rankClass(rank){
+        if (rank === 1) return 'rank-gold';
+        if (rank === 2) return 'rank-silver';
+        if (rank === 3) return 'rank-bronze';
+        return 'rank-other';
+    }
+
+    function statusCell(rank){
+        if (rank <= 3) return '<span style="color: #FFD700;">🏆</span>';
+        if (rank <= 10) return '<span style="color: #C0C0C0;">⭐</span>';
+        return '<span style="color: rgba(255,255,255,0.5);">-</span>';
+    }
+
+    function render(){
+        entries.sort((a, b) => (b.score - a.score) || (a.user_id < b.user_id ? -1 : a.user_id > b.user_id ? 1 : 0));
+        const visible = entries.filter(e => e.score > 0).slice(0, limit);
+        if (!visible.length) return;
+        body.innerHTML = visible.map((e, i) => {
+            const rank = i + 1;
+            const mine = e.user_id === ctx.current_user_id ? ' style="background: rgba(124, 92, 219, 0.2);"' : '';
+            return `<tr${mine}>
+                <td><strong class="rank-highlight ${rankClass(rank)}">#${rank}</strong></td>
+                <td><strong>${escapeHtml(e.username)}</strong>${e.is_admin ? '<span style="color: #7c5cdb; font-size: 0.8rem;"> [ADMIN]</span>' : ''}</td>
+                <td><strong style="color: #7c5cdb;">${e.score}</strong></td>
+                <td>${statusCell(rank)}</td>
+            </tr>`;
+        }).join('');
+    }
+
+    const socket = io();
+
+    socket.on('connect', () => socket.emit('join_leaderboard', {}));
+
+    socket.on('leaderboard_snapshot', (data) => {
+        entries = data.entries || [];
+        seq = data.seq;
+        render();
+    });
+
+    socket.on('leaderboard_delta', (data) => {
+        // A gap means a delta was missed: start again from a fresh snapshot
+        if (seq === null || data.seq !== seq + 1) {
+            socket.emit('join_leaderboard', {});
+            return;
+        }
+        seq = data.seq;
+        (data.changes || []).forEach(change => {
+            const existing = entries.find(e => e.user_id === change.user_id);
+            if (existing) {
+                existing.score = change.score;
+                existing.username = change.username;
+                existing.is_admin = change.is_admin;
+            } else {
+                entries.push({ user_id: change.user_id, username: change.username, is_admin: change.is_admin, score: change.score });
+            }
+        });
+        render();
+    });
+})();
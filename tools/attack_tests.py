@@ -47,11 +47,12 @@ def run_attack_tests(difficulty='medium'):
         print(f"\n== {challenge_type.upper()} ==")
         bot = BotAI(difficulty=difficulty, role='defender')
 
-        for p_idx, payload in enumerate(payloads):
+        # Evaluate every payload with challenge engine as attacker in one batch
+        results = challenge_engine.evaluate_many(challenge_type, payloads, difficulty, role='attacker')
+
+        for p_idx, (payload, result) in enumerate(zip(payloads, results)):
             print(f"\nPayload #{p_idx+1}: {payload}")
 
-            # Evaluate with challenge engine as attacker
-            result = challenge_engine.evaluate_challenge(challenge_type, payload, difficulty, role='attacker')
             print("Engine result:")
             print("  success:", result.get('success'))
             print("  score:", result.get('score'))
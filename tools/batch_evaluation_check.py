@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Check that batch evaluation grades a whole batch against one rule pack
+snapshot.
+
+Copies the rule packs to a temporary directory, starts a batch through
+both graders, edits a pack on disk half way through (with hot reload
+checking on every evaluation) and checks that every result of the batch
+carries the same rule_pack_version, that the snapshot was taken once, and
+that the next batch picks up the edited packs.
+
+Run from the project root:
+    PYTHONPATH=. python tools/batch_evaluation_check.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+from app.challenge_engine import challenge_engine
+from app.challenge_simulator import challenge_simulator
+from app.rule_packs import rule_packs
+
+BATCHES = {
+    'engine': lambda payloads: challenge_engine.iter_evaluate('xss', payloads, 'easy'),
+    'simulator': lambda payloads: challenge_simulator.iter_evaluate('sql_injection', payloads, 'easy'),
+}
+
+
+def touch_pack(path):
+    """Change a pack's bytes (not its rules) so the packs get a new version"""
+    with open(path, 'a') as f:
+        f.write('\n')
+
+
+def check(grader, batch, pack_path):
+    snapshots = []
+    current = rule_packs.current
+
+    def counting_current():
+        snapshots.append(current())
+        return snapshots[-1]
+
+    rule_packs.current = counting_current
+    try:
+        payloads = [f"<script>alert({n})</script>' OR '1'='1" for n in range(5)]
+        versions = []
+        for n, result in enumerate(batch(payloads)):
+            versions.append(result['rule_pack_version'])
+            if n == 1:
+                touch_pack(pack_path)
+        after = next(batch(['<img src=x onerror=alert(1)>']))['rule_pack_version']
+    finally:
+        rule_packs.current = current
+
+    if len(set(versions)) != 1 or len(versions) != len(payloads):
+        sys.exit(f'✗ {grader} batch mixed rule pack versions: {versions}')
+    if after == versions[0]:
+        sys.exit(f'✗ {grader}: the next batch did not pick up the edited packs')
+    # One snapshot for the batch, one for the batch after it
+    assert len(snapshots) == 2, snapshots
+    print(f'✓ {grader}: {len(payloads)} payloads graded with rule packs {versions[0]}, next batch {after}')
+
+
+def main():
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, 'packs')
+        shutil.copytree(rule_packs.path, path, ignore=shutil.ignore_patterns('__pycache__', '*.py'))
+        rule_packs.path = path
+        rule_packs.reload_interval = 0
+        rule_packs.reload()
+        check('engine', BATCHES['engine'], os.path.join(path, 'engine', 'xss.json'))
+        check('simulator', BATCHES['simulator'], os.path.join(path, 'simulator', 'sql_injection.json'))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
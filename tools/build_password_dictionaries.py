@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Build the password strength estimator's dictionary lookup table.
+
+Each dictionary is a plain-text wordlist ranked by frequency, most common
+first, one word per line. The lists are merged into a single table of
+word -> (rank, dictionary) keeping each word's best rank and pickled, so
+the estimator loads it without parsing any text. Without arguments the
+bundled lists in app/password_data are compiled.
+
+Run from the project root:
+    PYTHONPATH=. python tools/build_password_dictionaries.py [name=wordlist.txt ...]
+        [--output instance/password_dictionaries.pickle] [--limit 30000]
+"""
+import argparse
+import os
+import pickle
+import time
+
+from app.password_strength import DEFAULT_TABLE_PATH, bundled_dictionaries, compile_table, read_wordlist
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the password dictionary lookup table')
+    parser.add_argument('wordlists', nargs='*', metavar='NAME=PATH',
+                        help='ranked wordlists, e.g. passwords=top-passwords.txt (default: bundled lists)')
+    parser.add_argument('--output', default=DEFAULT_TABLE_PATH)
+    parser.add_argument('--limit', type=int, default=30000,
+                        help='keep only the most common words of each list (default 30000)')
+    args = parser.parse_args()
+
+    started = time.time()
+    if args.wordlists:
+        dictionaries = {}
+        for entry in args.wordlists:
+            name, _, path = entry.partition('=')
+            if not path:
+                parser.error(f'expected NAME=PATH, got {entry!r}')
+            dictionaries[name] = read_wordlist(path)
+    else:
+        dictionaries = bundled_dictionaries()
+    table = compile_table(dictionaries, args.limit)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    tmp_path = args.output + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, args.output)
+    print(f"✓ Wrote {len(table['words'])} words from {len(dictionaries)} dictionaries "
+          f"to {args.output} in {time.time() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
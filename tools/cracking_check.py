@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Check that every built-in cracking target is crackable within its budget.
+
+Runs the strategy each difficulty's hint points to against that
+difficulty's target hash and checks the run cracks it inside the guess
+budget (and the time budget, so a slow machine can fail it too). Also
+checks that pasting the hash of an easy password of one's own does not
+replace the target, so it cannot pass the challenge.
+
+Run from the project root:
+    PYTHONPATH=. python tools/cracking_check.py
+"""
+import hashlib
+import sys
+
+from app.challenge_simulator import challenge_simulator
+from app.cracking import simulate, GUESS_BUDGETS, TARGET_PASSWORDS
+
+# The strategy each difficulty's hint (PASSWORD_CRACKING_HINTS) points to
+STRATEGIES = {
+    'easy': 'dictionary attack with the common passwords wordlist',
+    'medium': 'wordlist attack with best64 mangling rules',
+    'hard': 'mask attack ?d?d?d?d?d?d',
+}
+
+
+def main():
+    failures = []
+    for difficulty, strategy in STRATEGIES.items():
+        run = simulate(strategy, difficulty)
+        expected = TARGET_PASSWORDS[difficulty][1]
+        budget = GUESS_BUDGETS[difficulty]
+        if run is None or not run['cracked'] or run['password'] != expected:
+            failures.append(f'{difficulty}: {expected!r} not cracked ({run and run["stopped"]})')
+        else:
+            print(f'✓ {difficulty}: {expected!r} cracked by {run["attack"]} '
+                  f'in {run["guesses"]} of {budget} guesses ({run["seconds"]}s)')
+
+    own_hash = hashlib.sha256(b'a').hexdigest()
+    result = challenge_simulator.evaluate_challenge('password_cracking', f'brute force {own_hash}', 'hard')
+    run = result['details']['cracking']
+    if result['success'] or run['cracked'] or run['ignored_hash'] != own_hash:
+        failures.append(f'a pasted hash of the player\'s own password was attacked instead of the target: {run}')
+    else:
+        print(f'✓ a pasted hash is ignored; the target survived {run["guesses"]} brute-force guesses')
+    if failures:
+        sys.exit('✗ ' + '\n✗ '.join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,7 @@ It will:
  - Participant joins using the session_code
  - Creator starts the session
  - Participant sends a 'play_action'
- - Both clients listen for 'action_result' and 'session_ended'
+ - Both clients listen for 'state_delta' and 'session_ended'
 
 Run example (PowerShell):
  $env:PYTHONPATH = 'C:\cybersecurity_simulator'; .\venv\Scripts\python.exe .\tools\e2e_coop_test.py
@@ -63,9 +63,9 @@ class TestClient:
             print(f'[{self.name}] session_started:', d)
             self.attempts = d.get('attempts')
 
-        @self.sio.on('action_result')
-        def on_action_result(d):
-            print(f'[{self.name}] action_result:', d)
+        @self.sio.on('state_delta')
+        def on_state_delta(d):
+            print(f'[{self.name}] state_delta:', d)
             self.events.append(d)
 
         @self.sio.on('session_ended')
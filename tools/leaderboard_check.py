@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Check that incremental leaderboard updates agree with a full rebuild.
+
+Completes and re-grades attempts in an in-memory database, including a
+re-grade that moves an attempt into a later day, week and month bucket,
+then deletes one challenge, and after each step compares the
+UserScore/ScoreBucket rows against what rebuild_user_scores() computes
+from the attempts.
+
+Run from the project root:
+    PYTHONPATH=. python tools/leaderboard_check.py
+"""
+import sys
+from datetime import datetime
+
+from app import create_app
+from app.models import db, User, Challenge, ChallengeAttempt, UserScore, ScoreBucket
+from app.leaderboard import record_completed_attempt, rebuild_user_scores, remove_challenge_scores
+
+
+def snapshot():
+    """Every aggregate and rollup row as comparable tuples"""
+    totals = {(row.user_id, row.category): (row.score, row.attempts_completed)
+              for row in UserScore.query.all()}
+    buckets = {(row.user_id, row.category, row.period, row.bucket_start): (row.score, row.attempts_completed)
+               for row in ScoreBucket.query.all()}
+    return totals, buckets
+
+
+def complete(attempt, score, when):
+    """Grade ``attempt`` the way routes.submit_solution does"""
+    previous_score = attempt.score if attempt.is_completed else None
+    previous_completed_at = attempt.completed_at if attempt.is_completed else None
+    attempt.score = score
+    attempt.is_completed = True
+    attempt.completed_at = when
+    record_completed_attempt(attempt, None, previous_score, previous_completed_at)
+    db.session.commit()
+
+
+def main():
+    app = create_app('testing')
+    with app.app_context():
+        user = User(username='checker', email='checker@example.com', password_hash='-')
+        challenge = Challenge(title='Check', description='-', category='red',
+                              difficulty='easy', challenge_type='xss')
+        db.session.add_all([user, challenge])
+        db.session.commit()
+
+        first = ChallengeAttempt(user_id=user.id, challenge_id=challenge.id)
+        second = ChallengeAttempt(user_id=user.id, challenge_id=challenge.id)
+        db.session.add_all([first, second])
+        db.session.commit()
+
+        # Completed on the last day of a month, which is a Sunday
+        complete(first, 60, datetime(2024, 3, 31, 23, 0))
+        complete(second, 30, datetime(2024, 3, 31, 12, 0))
+        # Re-graded within the same buckets, then across day/week/month
+        complete(second, 45, datetime(2024, 3, 31, 23, 30))
+        complete(first, 20, datetime(2024, 4, 1, 9, 0))
+
+        check('re-grades')
+        totals, buckets = snapshot()
+        assert totals[(user.id, 'all')] == (65, 2), totals
+        assert all(score >= 0 for score, _ in buckets.values()), buckets
+
+        # Deleting a challenge deletes its attempts (and their points)
+        other = Challenge(title='Other', description='-', category='blue',
+                          difficulty='easy', challenge_type='dos')
+        third = ChallengeAttempt(user_id=user.id, challenge=other)
+        db.session.add_all([other, third])
+        db.session.commit()
+        complete(third, 30, datetime(2024, 4, 2, 9, 0))
+        remove_challenge_scores(challenge)
+        db.session.delete(challenge)
+        db.session.commit()
+        check('challenge deletion')
+        totals, _ = snapshot()
+        assert totals[(user.id, 'all')] == (30, 1), totals
+
+
+def check(step):
+    """Compare the incrementally maintained rows with a rebuild"""
+    incremental = snapshot()
+    rebuild_user_scores()
+    rebuilt = snapshot()
+    # A rebuild has no rows for users or buckets whose points all left
+    incremental = tuple({key: value for key, value in table.items() if value != (0, 0)}
+                        for table in incremental)
+    if incremental != rebuilt:
+        sys.exit(f'✗ Aggregates after {step} differ from a rebuild:\n{incremental}\n{rebuilt}')
+    totals, buckets = rebuilt
+    print(f'✓ after {step}: {len(totals)} totals and {len(buckets)} buckets match a rebuild')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Migration helper: add the `rule_pack_version` column to the challenge_attempt table
+
+Works on any database the app is configured for (DATABASE_URL, SQLite or
+PostgreSQL) and is idempotent. The app adds the column itself at startup
+(app.models.add_missing_columns), so this is only needed to migrate
+without starting it, e.g. from the Render shell before a deploy.
+
+Existing attempts keep a NULL version (graded before rule packs were versioned).
+
+Run from the project root: python tools/migrate_add_rule_pack_version.py
+"""
+from sqlalchemy import inspect
+
+from app import create_app
+from app.models import db, add_missing_columns
+
+app = create_app()
+
+with app.app_context():
+    added = add_missing_columns()
+    print(f"Added columns: {', '.join(added)}" if added else "No columns to add. Migration not required.")
+    columns = [column['name'] for column in inspect(db.engine).get_columns('challenge_attempt')]
+    print("✓ challenge_attempt columns:", columns)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Check the password strength estimator on long and padded inputs.
+
+Passwords longer than the pattern-matching window must not look strong
+just because they are long: repeating a weak password or padding it with
+a repeated character keeps it weak, while long random passwords stay
+strong. The engine's and the simulator's password graders, both scored
+from the estimate, must give the same score and verdict.
+
+Run from the project root:
+    PYTHONPATH=. python tools/password_strength_check.py
+"""
+import random
+import string
+import sys
+
+from app.challenge_engine import challenge_engine
+from app.challenge_simulator import challenge_simulator
+from app.password_strength import strength_estimator, MAX_MATCH_LENGTH
+
+rng = random.Random(7)
+RANDOM = ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(300))
+
+# (password, highest acceptable score) for weak inputs
+WEAK = [
+    ('a' * 200, 1),
+    ('1' * 80, 1),
+    ('password' * 9, 1),
+    ('password' * 500, 1),
+    ('Password1' + '!' * 120, 2),
+    ('abcdefghijklmnopqrstuvwxyz' * 4, 1),
+    ('0123456789' * 30, 1),
+    ('qwerty' * 40, 1),
+    (('a' * MAX_MATCH_LENGTH + 'b' * MAX_MATCH_LENGTH) * 5, 2),
+    ('a' * 100000, 1),
+]
+
+# (password, lowest acceptable score) for strong inputs
+STRONG = [
+    (RANDOM, 4),
+    (RANDOM[:MAX_MATCH_LENGTH] + 'a' * 150, 4),
+    (RANDOM[:20] + 'password' * 12, 4),
+]
+
+# Graded by both graders at every difficulty
+GRADED = ['correct-horse-battery-staple-9', 'Password1!', 'Tr0ub4dor&3', 'letmein', RANDOM[:16]]
+
+
+def main():
+    failures = []
+    for password, highest in WEAK:
+        score = strength_estimator.estimate(password)['score']
+        if score > highest:
+            failures.append(f'{password[:24]}... ({len(password)} chars) scored {score}, expected at most {highest}')
+    for password, lowest in STRONG:
+        score = strength_estimator.estimate(password)['score']
+        if score < lowest:
+            failures.append(f'{password[:24]}... ({len(password)} chars) scored {score}, expected at least {lowest}')
+    for password in GRADED:
+        for difficulty in ('easy', 'medium', 'hard'):
+            engine = challenge_engine.evaluate_challenge('password_strength', password, difficulty, 'defender')
+            simulator = challenge_simulator.evaluate_challenge('password_check', password, difficulty)
+            graded = [(result['score'], result['success']) for result in (engine, simulator)]
+            if graded[0] != graded[1]:
+                failures.append(f'{password!r} ({difficulty}): engine {graded[0]}, simulator {graded[1]}')
+    if failures:
+        sys.exit('✗ ' + '\n✗ '.join(failures))
+    print(f'✓ {len(WEAK)} weak and {len(STRONG)} strong long passwords scored as expected')
+    print(f'✓ engine and simulator agree on {len(GRADED)} passwords at every difficulty')
+
+
+if __name__ == '__main__':
+    main()
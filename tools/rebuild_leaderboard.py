@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Rebuild the UserScore leaderboard aggregates from ChallengeAttempt.
+
+Use after importing attempts directly into the database, or if the
+aggregates are ever suspected to have drifted. Safe to run repeatedly.
+
+Run from the project root: python tools/rebuild_leaderboard.py
+"""
+from app import create_app
+from app.leaderboard import rebuild_user_scores
+
+app = create_app()
+
+with app.app_context():
+    written = rebuild_user_scores()
+    print(f"✓ Rebuilt {written} leaderboard aggregate and rollup rows")
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Check the coop session state backends against each other.
+
+Plays the same scripted session (players joining, scoring, dealing damage,
+cooldowns and cooldown claims, results, concurrent score updates from
+several threads) through the in-process store and the Redis store and
+compares what they report.
+Without --url the Redis store talks to a small Redis-protocol stand-in
+started in this process, so no Redis server is needed; pass --url to check
+against a real server (its coop:{check-...} keys are used).
+
+Needs the ``redis`` package for the Redis store.
+
+Run from the project root:
+    PYTHONPATH=. python tools/session_store_check.py [--url redis://localhost:6379/0]
+"""
+import argparse
+import fnmatch
+import socketserver
+import sys
+import threading
+import time
+import uuid
+
+from app.cache import get_redis_client
+from app.session_state import LocalSessionStore, RedisSessionStore, MAX_HP, LOG_LIMIT
+
+
+class StandInStore:
+    """Strings, hashes and lists for the stand-in server (expiry is ignored)"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def run(self, command, args):
+        with self.lock:
+            return self.call(command, args)
+
+    def call(self, command, args):
+        handler = getattr(self, 'cmd_' + command.lower(), None)
+        if handler is None:
+            return Error(f"ERR unknown command '{command}'")
+        return handler(*args)
+
+    def cmd_ping(self, *args):
+        return Status('PONG')
+
+    def cmd_client(self, *args):
+        return Status('OK')
+
+    def cmd_select(self, *args):
+        return Status('OK')
+
+    def cmd_get(self, key):
+        return self.data.get(key)
+
+    def cmd_set(self, key, value, *options):
+        if b'NX' in (option.upper() for option in options) and key in self.data:
+            return None
+        self.data[key] = value
+        return Status('OK')
+
+    def cmd_incrby(self, key, amount):
+        total = int(self.data.get(key, b'0')) + int(amount)
+        self.data[key] = str(total).encode()
+        return total
+
+    def cmd_expire(self, key, seconds):
+        return int(key in self.data)
+
+    def cmd_del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def cmd_keys(self, pattern):
+        return [key for key in self.data if fnmatch.fnmatchcase(key, pattern)]
+
+    def cmd_hset(self, key, *pairs):
+        mapping = self.data.setdefault(key, {})
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in mapping
+            mapping[field] = value
+        return added
+
+    def cmd_hsetnx(self, key, field, value):
+        mapping = self.data.setdefault(key, {})
+        if field in mapping:
+            return 0
+        mapping[field] = value
+        return 1
+
+    def cmd_hincrby(self, key, field, amount):
+        mapping = self.data.setdefault(key, {})
+        total = int(mapping.get(field, b'0')) + int(amount)
+        mapping[field] = str(total).encode()
+        return total
+
+    def cmd_hgetall(self, key):
+        flat = []
+        for field, value in self.data.get(key, {}).items():
+            flat += [field, value]
+        return flat
+
+    def cmd_rpush(self, key, *values):
+        items = self.data.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    def cmd_ltrim(self, key, start, stop):
+        items = self.data.get(key, [])
+        start, stop = int(start), int(stop)
+        size = len(items)
+        start = max(0, start + size if start < 0 else start)
+        stop = stop + size if stop < 0 else stop
+        self.data[key] = items[start:stop + 1]
+        return Status('OK')
+
+    def cmd_lrange(self, key, start, stop):
+        items = self.data.get(key, [])
+        stop = int(stop)
+        return items[int(start):None if stop == -1 else stop + 1]
+
+
+class Status(str):
+    pass
+
+
+class Error(str):
+    pass
+
+
+def encode(reply):
+    if isinstance(reply, Error):
+        return b'-' + reply.encode() + b'\r\n'
+    if isinstance(reply, Status):
+        return b'+' + reply.encode() + b'\r\n'
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    if isinstance(reply, str):
+        return encode(reply.encode())
+    return b'*%d\r\n' % len(reply) + b''.join(encode(item) for item in reply)
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """Speaks enough RESP for the session store, including MULTI/EXEC"""
+
+    disable_nagle_algorithm = True
+
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        count = int(header[1:])
+        parts = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:])
+            parts.append(self.rfile.read(length + 2)[:-2])
+        return parts
+
+    def handle(self):
+        queued = None
+        while True:
+            parts = self.read_command()
+            if parts is None:
+                return
+            command, args = parts[0].decode(), parts[1:]
+            if command.upper() == 'MULTI':
+                queued = []
+                reply = Status('OK')
+            elif command.upper() == 'EXEC':
+                # The whole transaction runs under the store lock
+                with self.server.store.lock:
+                    replies = []
+                    for queued_command, queued_args in queued:
+                        replies.append(self.server.store.call(queued_command, queued_args))
+                queued = None
+                reply = replies
+            elif queued is not None:
+                queued.append((command, args))
+                reply = Status('QUEUED')
+            else:
+                reply = self.server.store.run(command, args)
+            self.wfile.write(encode(reply))
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.store = StandInStore()
+
+
+def play(store, code):
+    """Run the scripted session; returns the final state"""
+    store.start(code, ['alice', 'bob'], seed_results={'carol': {'username': 'carol', 'score': 5}})
+    assert store.is_running(code)
+    assert store.add_score(code, 'alice', 30) == 30
+    state = store.apply_action(code, 'alice', {'actor_id': 'alice', 'n': 0}, damage={'bob': 20},
+                               cooldown_until=1000, result={'username': 'alice', 'score': 30})
+    assert state['hp_map'] == {'alice': MAX_HP, 'bob': MAX_HP - 20}, state
+    state = store.apply_action(code, 'bob', {'actor_id': 'bob', 'n': 1}, damage={'bob': 8})
+    assert state['hp_map']['bob'] == MAX_HP - 28, state
+    for n in range(6):
+        store.apply_action(code, 'alice', {'actor_id': 'alice', 'n': 2 + n}, damage={'bob': 20})
+    assert store.state(code)['hp_map']['bob'] == 0, 'hp is clamped at 0'
+    assert store.state(code)['seq'] == 8, 'every action gets the next sequence number'
+    assert store.claim_cooldown(code, 'alice', 60)
+    assert not store.claim_cooldown(code, 'alice', 60), 'a running cooldown blocks the next action'
+    assert store.claim_cooldown(code, 'bob', 60), 'cooldowns are per actor'
+    results = store.set_result(code, 'bob', {'username': 'bob', 'score': 0})
+    assert set(results) == {'alice', 'bob', 'carol'}, results
+
+    # Concurrent increments from several threads must all land
+    def score_many():
+        for _ in range(200):
+            store.add_score(code, 'bob', 1)
+    threads = [threading.Thread(target=score_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.state(code)['scores']['bob'] == 800, store.state(code)['scores']
+
+    store.stop(code)
+    assert not store.is_running(code)
+    return store.state(code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the session state backends')
+    parser.add_argument('--url', help='Redis server to check (default: in-process stand-in)')
+    args = parser.parse_args()
+
+    code = f'check-{uuid.uuid4().hex[:8]}'
+    local = play(LocalSessionStore(), code)
+    print('✓ in-process store')
+
+    server = None
+    url = args.url
+    if not url:
+        server = StandInServer()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        # The stand-in speaks RESP2 only
+        url = 'redis://%s:%d/0?protocol=2' % server.server_address
+    client = get_redis_client(url)
+    if client is None:
+        sys.exit('The redis package is needed to check the Redis store')
+
+    started = time.perf_counter()
+    shared = play(RedisSessionStore(client), code)
+    if shared != local:
+        sys.exit(f'✗ Redis store disagrees with the in-process store:\n{shared}\n{local}')
+    log = client.lrange(f'coop:{{{code}}}:log', 0, -1)
+    assert len(log) == min(8, LOG_LIMIT), log
+    print(f'✓ Redis store at {url} ({time.perf_counter() - started:.2f}s)')
+    client.delete(*client.keys(f'coop:{{{code}}}:*'))
+    if server:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()